@@ -1,6 +1,11 @@
 # This is the main Python file that launches the GUI for the video converter application.
 # It adds the current directory to the system path and imports the VideoConverterApp class from the GUI module.
 # It then creates an instance of the VideoConverterApp class and starts the main event loop.
+# The log history and ffmpeg capabilities load in the background, so the window is usable right away;
+# with debug enabled in the settings, the time until the window is first idle is printed.
+import time
+start = time.perf_counter()
+
 import tkinter as tk
 import sys
 import os
@@ -10,5 +15,7 @@ if __name__ == "__main__":
     root = tk.Tk()
     from modules.gui.gui import VideoConverterApp
     app = VideoConverterApp(root)
+    if app.settings.debug:
+        root.after_idle(lambda: print(f"Window ready in {(time.perf_counter() - start) * 1000:.0f} ms"))
 
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
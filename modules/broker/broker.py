@@ -0,0 +1,398 @@
+# broker.py
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+
+class JobBroker:
+    """
+    A job queue stored in an SQLite database on shared storage. The coordinator submits job specs
+    and collects results; workers on any machine that can open the database claim jobs with a
+    time-limited lease and renew it while they work. If a worker dies its lease runs out and the job
+    is queued again, up to `max_attempts` times.
+
+    Jobs only reference their input files by path, so inputs must live on storage every worker
+    sees under the same path.
+
+    Methods:
+    - submit(job_spec): Queues a job and returns its id.
+    - claim(worker_id, lease_seconds): Claims the oldest queued job and returns how long it waited.
+    - heartbeat(job_id, worker_id, progress, status, lease_seconds): Renews a lease and reports progress.
+    - complete(job_id, worker_id, result): Marks a job as done.
+    - fail(job_id, worker_id, error): Marks a job as failed.
+    - requeue_expired(): Requeues jobs whose lease has run out.
+    - fetch_results(): Returns finished jobs the coordinator has not seen yet.
+    - counts(): Returns the number of jobs in each state.
+    """
+    def __init__(self, db_path, max_attempts=3):
+        """
+        Opens the broker database, creating it if needed.
+
+        Parameters:
+        - db_path (str): Path to the SQLite database file.
+        - max_attempts (int): How many times a job is handed out before it is marked as failed.
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    spec TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT '',
+                    result TEXT,
+                    reported INTEGER NOT NULL DEFAULT 0,
+                    submitted REAL NOT NULL,
+                    updated REAL NOT NULL
+                )""")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        finally:
+            connection.close()
+
+    def _connect(self):
+        # Rollback journal rather than WAL: WAL needs shared memory, which network filesystems lack
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _transaction(self, work):
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            result = work(connection)
+            connection.execute("COMMIT")
+            return result
+        except BaseException:
+            # BEGIN itself fails when the database stays locked; rolling back then would hide that error
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def submit(self, job_spec):
+        """
+        Queues a job.
+
+        Parameters:
+        - job_spec (dict): A JSON-serialisable job description, see `VideoSettings.to_job_spec`.
+
+        Returns:
+        int: The job id.
+        """
+        now = time.time()
+        return self._transaction(lambda connection: connection.execute(
+            "INSERT INTO jobs (spec, submitted, updated) VALUES (?, ?, ?)", (json.dumps(job_spec), now, now)).lastrowid)
+
+    def claim(self, worker_id, lease_seconds=60):
+        """
+        Claims the oldest queued job for a worker. Expired leases are requeued first.
+
+        Returns:
+        A (job_id, job_spec, queued_seconds) tuple, where queued_seconds is the time since the job was
+        submitted, or None if no job is queued.
+        """
+        def work(connection):
+            now = time.time()
+            self._requeue_expired(connection, now)
+            row = connection.execute("SELECT id, spec, submitted FROM jobs WHERE state = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "progress = 0, status = 'Claimed', updated = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"]))
+            return row["id"], json.loads(row["spec"]), max(0.0, now - row["submitted"])
+        return self._transaction(work)
+
+    def heartbeat(self, job_id, worker_id, progress=None, status=None, lease_seconds=60):
+        """
+        Renews a worker's lease on a job and records its progress.
+
+        Returns:
+        bool: False if the worker no longer holds the job, in which case it should stop working on it.
+        """
+        def work(connection):
+            now = time.time()
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires = ?, progress = COALESCE(?, progress), status = COALESCE(?, status), "
+                "updated = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                (now + lease_seconds, progress, status, now, job_id, worker_id))
+            return cursor.rowcount == 1
+        return self._transaction(work)
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Marks a job as done with its result (e.g. a conversion log entry).
+
+        Returns:
+        bool: False if the worker no longer held the job, in which case the result is discarded.
+        """
+        return self._finish(job_id, worker_id, "done", result)
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Marks a job as failed with an error message.
+
+        Returns:
+        bool: False if the worker no longer held the job.
+        """
+        return self._finish(job_id, worker_id, "failed", {"error": error})
+
+    def _finish(self, job_id, worker_id, state, result):
+        def work(connection):
+            cursor = connection.execute(
+                "UPDATE jobs SET state = ?, result = ?, progress = 100, lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND state = 'running'",
+                (state, json.dumps(result), time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+        return self._transaction(work)
+
+    def requeue_expired(self):
+        """
+        Requeues running jobs whose lease has expired, or fails them once they reach `max_attempts`.
+
+        Returns:
+        int: The number of jobs that were requeued.
+        """
+        return self._transaction(lambda connection: self._requeue_expired(connection, time.time()))
+
+    def _requeue_expired(self, connection, now):
+        expired = "state = 'running' AND lease_expires < ?"
+        connection.execute(
+            f"UPDATE jobs SET state = 'failed', result = ?, updated = ? WHERE {expired} AND attempts >= ?",
+            (json.dumps({"error": "Worker lease expired too many times"}), now, now, self.max_attempts))
+        cursor = connection.execute(
+            f"UPDATE jobs SET state = 'queued', worker = NULL, lease_expires = NULL, status = 'Requeued', updated = ? "
+            f"WHERE {expired}", (now, now))
+        return cursor.rowcount
+
+    def fetch_results(self):
+        """
+        Returns the jobs that finished since the last call and marks them as reported.
+
+        Returns:
+        A list of dictionaries with "id", "state", "worker", "spec" and "result" keys.
+        """
+        def work(connection):
+            rows = connection.execute(
+                "SELECT id, state, worker, spec, result FROM jobs WHERE state IN ('done', 'failed') AND reported = 0 ORDER BY id").fetchall()
+            connection.executemany("UPDATE jobs SET reported = 1 WHERE id = ?", [(row["id"],) for row in rows])
+            return [{"id": row["id"], "state": row["state"], "worker": row["worker"],
+                     "spec": json.loads(row["spec"]), "result": json.loads(row["result"] or "null")} for row in rows]
+        return self._transaction(work)
+
+    def counts(self):
+        """
+        Returns a dictionary mapping each job state to the number of jobs in it.
+        """
+        connection = self._connect()
+        try:
+            return {row["state"]: row["count"] for row in connection.execute("SELECT state, COUNT(*) AS count FROM jobs GROUP BY state")}
+        finally:
+            connection.close()
+
+
+def load_capabilities():
+    """
+    Probes the configured ffmpeg (or reads the probe cache) so jobs can fall back to an available encoder.
+    """
+    from modules.settings.settings import Settings
+    from modules.capabilities.capabilities import FFmpegCapabilities
+    settings = Settings()
+    return FFmpegCapabilities(settings.ffmpeg_path, settings.cache_folder).load()
+
+
+def convert_job(job_spec, report, cancelled=None, capabilities=None, queued_seconds=None):
+    """
+    Runs one conversion job with the headless VideoProcessor path.
+
+    Parameters:
+    - job_spec (dict): The job spec with "settings" (see `VideoSettings.to_job_spec`) and "options"
+                       (overwrite_file, overwrite_fps and use_start_stop flags).
+    - report: A function called with (progress, status) while the job runs.
+    - cancelled (threading.Event): Set when the job must stop, e.g. because the lease was lost. ffmpeg
+                                   is then terminated.
+    - capabilities: The FFmpegCapabilities used to pick an available encoder.
+    - queued_seconds (float): How long the job waited in the broker queue, recorded as its
+                              "queue_wait" stage.
+
+    Returns:
+    The conversion log entry for the job.
+
+    Raises:
+    - RuntimeError: If the conversion was skipped or failed
+    """
+    # Imported here so the broker can be used (e.g. by tests) without the processing dependencies
+    from modules.processing.processing import VideoProcessor, HeadlessApp
+    from modules.video_settings.video_settings import VideoSettings
+
+    settings = VideoSettings()
+    settings.apply_job_spec(job_spec["settings"])
+    settings.error = None
+    options = job_spec.get("options", {})
+    last_status = [""]
+
+    def on_status(status):
+        last_status[0] = status
+        report(None, status)
+
+    app = HeadlessApp(
+        overwrite_file=options.get("overwrite_file", False),
+        overwrite_fps=options.get("overwrite_fps", False),
+        use_start_stop=options.get("use_start_stop", False),
+        on_progress=lambda progress: report(progress, None),
+        on_status=on_status,
+        cancelled=cancelled,
+    )
+    processor = VideoProcessor()
+    processor.capabilities = capabilities
+    if queued_seconds is not None:
+        processor.instrumentation.record("queue_wait", file=os.path.basename(settings.file_path), wall_seconds=queued_seconds)
+    try:
+        result = processor.convert_video(settings, app)
+        move_errors = processor.output_mover.wait()  # Outputs written to scratch storage must be in place before reporting
+    finally:
+        processor.instrumentation.export()
+    if move_errors:
+        raise RuntimeError(f"Failed to move output to {move_errors[0][0]}: {move_errors[0][1]}")
+    if cancelled is not None and cancelled.is_set():
+        raise RuntimeError("Conversion cancelled")
+    if result == "SKIPPED" or settings.error is not None:
+        raise RuntimeError(settings.error or last_status[0] or "Conversion skipped")
+    return settings.to_log_entry()
+
+
+class Worker:
+    """
+    Claims jobs from a JobBroker and runs them until stopped. A background thread renews the lease
+    while a job runs, so long encodes keep their lease as long as the worker process is alive. If the
+    broker refuses a renewal, the job has been given to another worker, so it is cancelled here.
+
+    Methods:
+    - run_once(): Claims and runs a single job.
+    - run(idle_exit): Runs jobs until `stop` is called, or until the queue is empty if `idle_exit` is set.
+    - stop(): Asks the worker to stop after the current job.
+    """
+    def __init__(self, broker, worker_id=None, lease_seconds=60, poll_seconds=2, run_job=convert_job, capabilities=None):
+        """
+        Parameters:
+        - broker (JobBroker): The broker to claim jobs from.
+        - worker_id (str): Name reported to the coordinator. Defaults to "<hostname>-<pid>".
+        - lease_seconds (float): How long a claim lasts without a heartbeat.
+        - poll_seconds (float): How long to wait before checking an empty queue again.
+        - run_job: Function called with (job_spec, report, cancelled=Event, capabilities=...,
+                   queued_seconds=...) that runs a job and returns its result.
+        - capabilities: The FFmpegCapabilities passed to every job. With the default run_job they
+                        are loaded once, before the first job, if not given.
+        """
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.run_job = run_job
+        self.capabilities = capabilities
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, idle_exit=False):
+        while not self.stopping.is_set():
+            if not self.run_once():
+                if idle_exit:
+                    return
+                self.stopping.wait(self.poll_seconds)
+
+    def run_once(self):
+        """
+        Claims one job and runs it.
+
+        Returns:
+        bool: False if there was no job to run.
+        """
+        claimed = self.broker.claim(self.worker_id, self.lease_seconds)
+        if claimed is None:
+            return False
+        job_id, job_spec, queued_seconds = claimed
+        if self.capabilities is None and self.run_job is convert_job:
+            self.capabilities = load_capabilities()
+
+        latest = {"progress": 0, "status": "Running"}
+        finished = threading.Event()
+        lease_lost = threading.Event()
+
+        def report(progress, status):
+            if progress is not None:
+                latest["progress"] = progress
+            if status is not None:
+                latest["status"] = status
+
+        def keep_lease():
+            while not finished.wait(self.lease_seconds / 3):
+                try:
+                    renewed = self.broker.heartbeat(job_id, self.worker_id, latest["progress"], latest["status"], self.lease_seconds)
+                except sqlite3.Error as e:
+                    # The shared database may be locked or briefly unreachable; try again on the next tick
+                    print(f"Error renewing the lease on job {job_id}: {e}")
+                    continue
+                if not renewed:
+                    print(f"Lost the lease on job {job_id}, cancelling it")
+                    lease_lost.set()
+                    return
+
+        heartbeat_thread = threading.Thread(target=keep_lease, daemon=True)
+        heartbeat_thread.start()
+        try:
+            result = self.run_job(job_spec, report, cancelled=lease_lost, capabilities=self.capabilities, queued_seconds=queued_seconds)
+        except Exception as e:
+            finished.set()
+            heartbeat_thread.join()
+            self.broker.fail(job_id, self.worker_id, str(e))
+        else:
+            finished.set()
+            heartbeat_thread.join()
+            self.broker.complete(job_id, self.worker_id, result)
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed video conversion via a shared SQLite job broker.")
+    parser.add_argument("--broker", required=True, help="Path to the broker database on shared storage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = commands.add_parser("worker", help="Claim and convert jobs")
+    worker_parser.add_argument("--id", help="Worker name, defaults to <hostname>-<pid>")
+    worker_parser.add_argument("--lease", type=float, default=60, help="Lease length in seconds")
+    worker_parser.add_argument("--idle-exit", action="store_true", help="Exit when the queue is empty")
+
+    commands.add_parser("status", help="Show the number of jobs in each state")
+
+    args = parser.parse_args(argv)
+    broker = JobBroker(args.broker)
+    if args.command == "worker":
+        worker = Worker(broker, args.id, args.lease)
+        print(f"Worker {worker.worker_id} waiting for jobs in {args.broker}")
+        try:
+            worker.run(idle_exit=args.idle_exit)
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(broker.counts(), indent=4))
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    main()
@@ -0,0 +1,170 @@
+# capabilities.py
+import os
+import re
+import json
+import subprocess
+import threading
+
+encoder_pattern = re.compile(r"^\s*([VAS][.A-Z]{5})\s+(\S+)\s+(.*)$")
+filter_pattern = re.compile(r"^\s*([.TSC]{2,3})\s+(\S+)\s+(\S*->\S*)\s")
+pixel_format_pattern = re.compile(r"^\s*([.IOHPB]{5})\s+(\S+)\s+\d+\s+\d+")
+version_pattern = re.compile(r"ffmpeg version (\S+)")
+
+class FFmpegCapabilities:
+    """
+    Discovers what the installed ffmpeg binary can do: its version and the encoders, filters and
+    pixel formats it was built with. Probing runs ffmpeg four times, so the results are cached to
+    disk and only refreshed when the binary's modification time changes.
+
+    Attributes:
+    - ffmpeg_path (str): Path to the ffmpeg executable that was probed.
+    - available (bool): Whether ffmpeg could be run at all.
+    - version (str): The ffmpeg version string.
+    - encoders (dict): Encoder names mapped to their descriptions.
+    - filters (list): Names of the available filters.
+    - pixel_formats (list): Names of the pixel formats that can be used for output.
+
+    Methods:
+    - load(): Loads the capabilities from the cache or by probing ffmpeg.
+    - load_async(callback): Loads the capabilities on a background thread.
+    - has_encoder(name): Returns whether an encoder is available.
+    - has_filter(name): Returns whether a filter is available.
+    """
+    cache_file_name = "ffmpeg_capabilities.json"
+
+    def __init__(self, ffmpeg_path, cache_folder="cache"):
+        """
+        Initializes an empty set of capabilities. Call `load` or `load_async` to populate it.
+
+        Parameters:
+        - ffmpeg_path (str): Path to the ffmpeg executable.
+        - cache_folder (str): Directory the probe results are cached in.
+        """
+        self.ffmpeg_path = str(ffmpeg_path)
+        self.cache_folder = cache_folder
+        self.available = False
+        self.version = ""
+        self.encoders = {}
+        self.filters = []
+        self.pixel_formats = []
+
+    def load(self):
+        """
+        Loads the capabilities from the cache if it matches the current binary, otherwise probes ffmpeg
+        and rewrites the cache. If ffmpeg cannot be run, `available` stays False.
+
+        Returns:
+        The FFmpegCapabilities instance itself.
+        """
+        try:
+            mtime = os.path.getmtime(self.ffmpeg_path)
+        except OSError:
+            return self
+
+        cache_path = os.path.join(self.cache_folder, self.cache_file_name)
+        cached = self._read_cache(cache_path)
+        if cached and cached.get("ffmpeg_path") == self.ffmpeg_path and cached.get("mtime") == mtime:
+            self._apply(cached)
+            return self
+
+        try:
+            data = self.probe()
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error probing ffmpeg capabilities: {e}")
+            return self
+
+        data["ffmpeg_path"] = self.ffmpeg_path
+        data["mtime"] = mtime
+        self._apply(data)
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            with open(cache_path, "w") as cache_file:
+                json.dump(data, cache_file, indent=4)
+        except OSError as e:
+            print(f"Error writing capabilities cache: {e}")
+        return self
+
+    def load_async(self, callback=None):
+        """
+        Loads the capabilities on a daemon thread so the caller is not blocked by ffmpeg start-up.
+
+        Parameters:
+        - callback: Optional function called with this instance once loading has finished. It runs on
+                    the background thread, so GUI callers should hand the work back with `root.after`.
+
+        Returns:
+        The started thread.
+        """
+        def run():
+            self.load()
+            if callback:
+                callback(self)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def probe(self):
+        """
+        Runs ffmpeg to list its version, encoders, filters and pixel formats.
+
+        Returns:
+        A dictionary with "version", "encoders", "filters" and "pixel_formats" keys.
+
+        Raises:
+        - OSError: If the ffmpeg executable cannot be started
+        - subprocess.CalledProcessError: If ffmpeg exits with an error
+        """
+        version_output = self._run("-version")
+        match = version_pattern.search(version_output)
+
+        encoders = {}
+        for line in self._run("-encoders").splitlines():
+            match_encoder = encoder_pattern.match(line)
+            if match_encoder and match_encoder.group(2) != "=":
+                encoders[match_encoder.group(2)] = match_encoder.group(3).strip()
+
+        filters = []
+        for line in self._run("-filters").splitlines():
+            match_filter = filter_pattern.match(line)
+            if match_filter:
+                filters.append(match_filter.group(2))
+
+        pixel_formats = []
+        for line in self._run("-pix_fmts").splitlines():
+            match_format = pixel_format_pattern.match(line)
+            if match_format and match_format.group(1)[1] == "O":
+                pixel_formats.append(match_format.group(2))
+
+        return {
+            "version": match.group(1) if match else "",
+            "encoders": encoders,
+            "filters": filters,
+            "pixel_formats": pixel_formats,
+        }
+
+    def has_encoder(self, name):
+        return name in self.encoders
+
+    def has_filter(self, name):
+        return name in self.filters
+
+    def _run(self, option):
+        result = subprocess.run([self.ffmpeg_path, "-hide_banner", option], capture_output=True, text=True, check=True)
+        return result.stdout
+
+    def _apply(self, data):
+        self.version = data.get("version", "")
+        self.encoders = data.get("encoders", {})
+        self.filters = data.get("filters", [])
+        self.pixel_formats = data.get("pixel_formats", [])
+        # Set last: other threads check `available` before reading the lists
+        self.available = True
+
+    @staticmethod
+    def _read_cache(cache_path):
+        try:
+            with open(cache_path, "r") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,624 @@
+# command_builder.py
+import os
+import math
+
+# Filters are always emitted in this order, whatever order they were added in. Deinterlacing comes
+# first: it needs the source's field lines and neighbouring frames, and a crop with an odd offset or
+# height (or dropped frames) would swap or mix up the fields it sees. After it, cheap filters that
+# reduce the amount of work (crop, fps) run before scaling, and the single pixel format conversion
+# runs last.
+filter_order = ("yadif", "crop", "fps", "scale", "format")
+
+# Thumbnail outputs: poster frame and contact sheet tile widths, contact sheet layout and preview height
+poster_width = 320
+contact_sheet_tile_width = 160
+contact_sheet_layout = (4, 4)
+preview_height = 240
+
+def output_dimensions(video_settings):
+    """
+    Returns the output frame size after scaling, or (0, 0) if the input size is unknown.
+    """
+    width = int(float(video_settings.input_width or 0) * float(video_settings.scale_width))
+    height = int(float(video_settings.input_height or 0) * float(video_settings.scale_height))
+    return width, height
+
+
+def encoder_threads(video_settings):
+    """
+    Returns the number of threads an encoder may use: `video_settings.threads` if set, otherwise
+    every logical core.
+    """
+    threads = int(getattr(video_settings, "threads", 0) or 0)
+    return threads if threads > 0 else (os.cpu_count() or 1)
+
+
+def av1_tile_layout(width, height, threads):
+    """
+    Chooses an AV1 tile layout for a frame size and thread budget. Tiles cost a little compression
+    efficiency, so columns are only added while each tile stays at least 640 pixels wide and there
+    are threads to run them, and rows are only added once the columns cannot use all the threads.
+
+    Parameters:
+    - width: Output frame width in pixels (0 if unknown)
+    - height: Output frame height in pixels (0 if unknown)
+    - threads: Number of threads available to the encoder
+
+    Returns:
+    A tuple of (log2 tile columns, log2 tile rows).
+    """
+    max_columns_log2 = int(math.log2(max(1, width // 640)))
+    column_log2 = min(max_columns_log2, int(math.log2(max(1, threads))), 4)
+
+    remaining_threads = threads // (1 << column_log2)
+    max_rows_log2 = int(math.log2(max(1, height // 720)))
+    row_log2 = min(max_rows_log2, int(math.log2(max(1, remaining_threads // 2))), 4)
+    return column_log2, row_log2
+
+
+def svtav1_tuning(video_settings):
+    """
+    SVT-AV1 parallelism: "lp" caps the logical processors used and the tiles follow the frame size.
+    """
+    threads = encoder_threads(video_settings)
+    column_log2, row_log2 = av1_tile_layout(*output_dimensions(video_settings), threads)
+    return [("-svtav1-params", f"lp={threads}:tile-columns={column_log2}:tile-rows={row_log2}")]
+
+
+def libaom_tuning(video_settings):
+    """
+    libaom parallelism: row based multithreading plus explicit thread and tile counts.
+    """
+    threads = encoder_threads(video_settings)
+    column_log2, row_log2 = av1_tile_layout(*output_dimensions(video_settings), threads)
+    return [("-threads", threads), ("-tiles", f"{1 << column_log2}x{1 << row_log2}")]
+
+
+# Encoder profiles keyed by the output codec names used in the GUI. Each profile lists its encoders
+# in order of preference; the first one the installed ffmpeg supports is used. "pixel_format" is
+# applied as the final format= filter unless the video settings ask for a specific pixel format. An
+# optional "tuning" function adds options that depend on the job, such as thread and tile layout.
+# "two_pass" says how the encoder runs two-pass encodes ("pass" for ffmpeg's -pass/-passlogfile,
+# "x265" for x265-params); encoders without it fall back to single pass ABR. "first_pass_options"
+# replace the normal options on the analysis pass to make it faster.
+encoder_profiles = {
+    "ffv1": {
+        "pixel_format": "",
+        "encoders": [
+            {"encoder": "ffv1", "options": [("-level", "3"), ("-coder", "1"), ("-context", "1")], "crf": False},
+        ],
+    },
+    "h264": {
+        "pixel_format": "",
+        "encoders": [
+            {"encoder": "libx264", "options": [("-preset", "medium")], "crf": True, "two_pass": "pass"},
+        ],
+    },
+    "h265": {
+        "pixel_format": "",
+        "encoders": [
+            {"encoder": "libx265", "options": [("-preset", "medium")], "crf": True, "two_pass": "x265"},
+        ],
+    },
+    "vp9": {
+        "pixel_format": "",
+        "encoders": [
+            # libvpx and libaom cap a CRF encode through -b:v (constrained quality) rather than VBV
+            {"encoder": "libvpx-vp9", "options": [("-b:v", "0"), ("-row-mt", "1"), ("-deadline", "good")], "crf": True,
+             "constrained_quality": True, "two_pass": "pass", "first_pass_options": [("-speed", "4")]},
+        ],
+    },
+    "av1": {
+        "pixel_format": "",
+        "encoders": [
+            # Preset 8 is faster than x265 medium while still producing noticeably smaller files
+            {"encoder": "libsvtav1", "options": [("-preset", "8")], "crf": True, "tuning": svtav1_tuning},
+            {"encoder": "libaom-av1", "options": [("-cpu-used", "6"), ("-row-mt", "1"), ("-b:v", "0")], "crf": True, "tuning": libaom_tuning,
+             "constrained_quality": True, "two_pass": "pass", "first_pass_options": [("-cpu-used", "8")]},
+        ],
+    },
+    "rawvideo": {
+        "pixel_format": "yuv420p",
+        "encoders": [
+            {"encoder": "rawvideo", "options": [], "crf": False},
+        ],
+    },
+}
+
+
+def select_encoder(output_codec, capabilities=None):
+    """
+    Picks the encoder to use for an output codec.
+
+    Parameters:
+    - output_codec: The output codec name, e.g. "h265"
+    - capabilities: An FFmpegCapabilities instance, or None if ffmpeg has not been probed. Without
+                    usable capabilities the most preferred encoder is assumed to be available.
+
+    Returns:
+    The encoder entry from `encoder_profiles`, or None if no encoder for the codec is available.
+
+    Raises:
+    - ValueError: If there is no encoder profile for the output codec
+    """
+    profile = encoder_profiles.get(output_codec)
+    if profile is None:
+        raise ValueError(f"No encoder profile for output codec '{output_codec}'")
+    if capabilities is None or not capabilities.available:
+        return profile["encoders"][0]
+    for entry in profile["encoders"]:
+        if capabilities.has_encoder(entry["encoder"]):
+            return entry
+    return None
+
+
+def available_output_codecs(capabilities=None):
+    """
+    Lists the output codecs that have at least one available encoder.
+
+    Parameters:
+    - capabilities: An FFmpegCapabilities instance, or None to list every known output codec
+
+    Returns:
+    A list of output codec names.
+    """
+    return [codec for codec in encoder_profiles if select_encoder(codec, capabilities) is not None]
+
+
+class FilterGraph:
+    """
+    An ordered, de-duplicated chain of ffmpeg video filters.
+
+    Adding a filter that is already in the graph replaces its arguments rather than appending a
+    second instance, so every filter appears at most once in the rendered -vf string.
+
+    Methods:
+    - add(name, args): Adds or replaces a filter.
+    - remove(name): Removes a filter if present.
+    - render(): Returns the filter graph as a single -vf string.
+    """
+    def __init__(self):
+        self.filters = {}
+
+    def add(self, name, args=None):
+        """
+        Adds a filter to the graph, replacing any filter with the same name.
+
+        Parameters:
+        - name: The ffmpeg filter name, e.g. "scale"
+        - args: The filter arguments without the leading "=", or None for a filter without arguments
+
+        Returns:
+        The FilterGraph itself so calls can be chained.
+        """
+        self.filters.pop(name, None)
+        self.filters[name] = args
+        return self
+
+    def remove(self, name):
+        """
+        Removes a filter from the graph. Removing a filter that is not present does nothing.
+
+        Parameters:
+        - name: The ffmpeg filter name
+        """
+        self.filters.pop(name, None)
+
+    def render(self):
+        """
+        Renders the graph in efficiency order. Filters that are not in `filter_order` keep the order
+        they were added in and run after scaling but before the final pixel format conversion.
+
+        Returns:
+        The comma separated filter string, or an empty string if the graph is empty.
+        """
+        format_rank = filter_order.index("format")
+
+        def rank(item):
+            position, name = item
+            if name in filter_order:
+                return (filter_order.index(name), position)
+            return (format_rank - 0.5, position)
+
+        ordered = sorted(enumerate(self.filters), key=rank)
+        parts = []
+        for _, name in ordered:
+            args = self.filters[name]
+            parts.append(name if args in (None, "") else f"{name}={args}")
+        return ",".join(parts)
+
+    def __bool__(self):
+        return bool(self.filters)
+
+
+class FFmpegCommand:
+    """
+    Builds an ffmpeg argument vector from global, input and output options plus a filter graph.
+
+    Every option is stored by flag, so setting the same flag twice replaces the first value and the
+    emitted argv never contains duplicates. Nothing here runs ffmpeg, which keeps the command
+    construction unit-testable.
+
+    Methods:
+    - set_global(flag, value): Sets an option that goes before the input.
+    - set_input(flag, value): Sets an option that applies to the input file.
+    - set_output(flag, value): Sets an option that applies to the output file.
+    - remove_output(flag): Removes an output option.
+    - add_side_output(path, filters, options): Adds an extra output fed from the same decode.
+    - build(): Returns the argv list.
+    """
+    def __init__(self, ffmpeg_path, input_path="", output_path=""):
+        self.ffmpeg_path = str(ffmpeg_path)
+        self.input_path = str(input_path)
+        self.output_path = str(output_path)
+        self.global_options = {}
+        self.input_options = {}
+        self.output_options = {}
+        self.filters = FilterGraph()
+        self.side_outputs = []
+
+    def set_global(self, flag, value=None):
+        self.global_options[flag] = value
+        return self
+
+    def set_input(self, flag, value=None):
+        self.input_options[flag] = value
+        return self
+
+    def set_output(self, flag, value=None):
+        self.output_options[flag] = value
+        return self
+
+    def remove_output(self, flag):
+        self.output_options.pop(flag, None)
+
+    def add_side_output(self, path, filters, options=None):
+        """
+        Adds an extra output, such as a thumbnail, that is fed from the decoded and filtered video of
+        the main output, so it costs no extra decode.
+
+        Parameters:
+        - path: The output file
+        - filters: The filter chain applied to the side output's copy of the video, e.g. "scale=320:-2"
+        - options: Output options for the side output, e.g. {"-frames:v": 1}
+
+        Returns:
+        The FFmpegCommand itself so calls can be chained.
+        """
+        self.side_outputs.append((str(path), filters, dict(options or {})))
+        return self
+
+    def build(self):
+        """
+        Assembles the ffmpeg command.
+
+        Returns:
+        A list of strings suitable for subprocess.Popen without a shell.
+        """
+        cmd = [self.ffmpeg_path]
+        cmd.extend(self._flatten(self.global_options))
+        cmd.extend(self._flatten(self.input_options))
+        cmd.extend(["-i", self.input_path])
+        if self.side_outputs:
+            # The filtered video is split once per output; the main output keeps the first audio stream
+            main_filters = self.filters.render()
+            labels = "".join(f"[side{number}]" for number in range(len(self.side_outputs)))
+            chains = [f"[0:v]{main_filters + ',' if main_filters else ''}split={len(self.side_outputs) + 1}[main]{labels}"]
+            chains.extend(f"[side{number}]{filters}[side{number}out]" for number, (_, filters, _) in enumerate(self.side_outputs))
+            cmd.extend(["-filter_complex", ";".join(chains), "-map", "[main]", "-map", "0:a:0?"])
+        elif self.filters:
+            cmd.extend(["-vf", self.filters.render()])
+        cmd.extend(self._flatten(self.output_options))
+        cmd.append(self.output_path)
+        for number, (path, _, options) in enumerate(self.side_outputs):
+            cmd.extend(["-map", f"[side{number}out]"])
+            cmd.extend(self._flatten(options))
+            cmd.append(path)
+        return cmd
+
+    @staticmethod
+    def _flatten(options):
+        args = []
+        for flag, value in options.items():
+            args.append(flag)
+            if value is not None:
+                args.append(str(value))
+        return args
+
+
+rate_control_modes = ("crf", "capped_crf", "abr", "two_pass")
+
+
+def parse_bitrate(bitrate):
+    """
+    Converts an ffmpeg style bitrate such as "5M" or "800k" to bits per second.
+
+    Parameters:
+    - bitrate: The bitrate string or number
+
+    Returns:
+    The bitrate in bits per second as an int, or 0 if it is empty.
+
+    Raises:
+    - ValueError: If the bitrate cannot be parsed
+    """
+    text = str(bitrate).strip()
+    if not text:
+        return 0
+    multipliers = {"k": 1000, "m": 1000000, "g": 1000000000}
+    suffix = text[-1].lower()
+    if suffix in multipliers:
+        return int(float(text[:-1]) * multipliers[suffix])
+    return int(float(text))
+
+
+def supports_two_pass(output_codec, capabilities=None):
+    """
+    Returns whether the encoder picked for an output codec can run a two-pass encode.
+    """
+    entry = select_encoder(output_codec, capabilities)
+    return bool(entry and entry.get("two_pass"))
+
+
+def apply_rate_control(command, video_settings, entry, pass_number=None, passlog_prefix="passlog"):
+    """
+    Adds the rate control options for `video_settings.rate_control` to a command. Lossless encoders
+    (those without CRF support) ignore rate control entirely.
+
+    Modes:
+    - crf: Constant quality using `video_settings.crf`.
+    - capped_crf: Constant quality with a VBV cap of `max_bitrate` (or `bitrate` if no maximum is set).
+                  Constrained quality encoders take the cap as their -b:v instead.
+    - abr: Average bitrate of `video_settings.bitrate`, capped if `max_bitrate` is set.
+    - two_pass: Like abr, but spread over an analysis pass and an encoding pass.
+
+    Parameters:
+    - command: The FFmpegCommand to update
+    - video_settings: A settings object containing video-related configurations
+    - entry: The encoder entry from `encoder_profiles`
+    - pass_number: 1 or 2 for a two-pass encode, None otherwise
+    - passlog_prefix: The pass log file prefix, relative to ffmpeg's working directory
+
+    Raises:
+    - ValueError: If the rate control mode is unknown or a bitrate cannot be parsed
+    """
+    if not entry["crf"]:
+        return
+    mode = getattr(video_settings, "rate_control", "crf") or "crf"
+    if mode not in rate_control_modes:
+        raise ValueError(f"Unknown rate control mode '{mode}'")
+    if mode == "crf":
+        return
+
+    bitrate = parse_bitrate(getattr(video_settings, "bitrate", ""))
+    max_bitrate = parse_bitrate(getattr(video_settings, "max_bitrate", ""))
+    if mode == "capped_crf":
+        max_bitrate = max_bitrate or bitrate
+        if not max_bitrate:
+            raise ValueError("Capped CRF needs a bitrate or maximum bitrate")
+        if entry.get("constrained_quality"):
+            command.set_output("-b:v", max_bitrate)
+            return
+    else:
+        if not bitrate:
+            raise ValueError(f"{mode} rate control needs a bitrate")
+        command.output_options.pop("-crf", None)
+        command.set_output("-b:v", bitrate)
+
+    if max_bitrate:
+        buffer_size = parse_bitrate(getattr(video_settings, "buffer_size", "")) or 2 * max_bitrate
+        command.set_output("-maxrate", max_bitrate)
+        command.set_output("-bufsize", buffer_size)
+
+    if mode == "two_pass" and pass_number and entry.get("two_pass"):
+        if pass_number == 1:
+            for flag, value in entry.get("first_pass_options", []):
+                command.set_output(flag, value)
+        if entry["two_pass"] == "x265":
+            slow_first_pass = ":slow-firstpass=0" if pass_number == 1 else ""
+            command.set_output("-x265-params", f"pass={pass_number}:stats={passlog_prefix}.log{slow_first_pass}")
+        else:
+            command.set_output("-pass", pass_number)
+            command.set_output("-passlogfile", passlog_prefix)
+
+
+def apply_encoder_profile(command, video_settings, capabilities=None, pass_number=None, passlog_prefix="passlog"):
+    """
+    Adds the encoder, rate control and pixel format options for `video_settings.output_codec` to a command.
+
+    Parameters:
+    - command: The FFmpegCommand to update
+    - video_settings: A settings object containing video-related configurations
+    - capabilities: An FFmpegCapabilities instance used to pick an available encoder
+    - pass_number: 1 or 2 for a two-pass encode, None otherwise
+    - passlog_prefix: The pass log file prefix, relative to ffmpeg's working directory
+
+    Raises:
+    - ValueError: If there is no encoder profile for the output codec, or none of its encoders is available
+    """
+    entry = select_encoder(video_settings.output_codec, capabilities)
+    if entry is None:
+        raise ValueError(f"No encoder available for output codec '{video_settings.output_codec}'")
+
+    command.set_output("-c:v", entry["encoder"])
+    for flag, value in entry["options"]:
+        command.set_output(flag, value)
+    if entry["crf"]:
+        command.set_output("-crf", video_settings.crf)
+    if entry.get("tuning"):
+        for flag, value in entry["tuning"](video_settings):
+            command.set_output(flag, value)
+    apply_rate_control(command, video_settings, entry, pass_number, passlog_prefix)
+
+    pixel_format = video_settings.pixel_format or encoder_profiles[video_settings.output_codec]["pixel_format"]
+    if pixel_format:
+        command.filters.add("format", pixel_format)
+
+
+def apply_filter_settings(command, video_settings):
+    """
+    Adds the crop, deinterlace and scale filters requested by the video settings.
+
+    Parameters:
+    - command: The FFmpegCommand to update
+    - video_settings: A settings object containing video-related configurations
+    """
+    if getattr(video_settings, "crop", ""):
+        command.filters.add("crop", video_settings.crop)
+    if getattr(video_settings, "deinterlace", False):
+        command.filters.add("yadif")
+    if float(video_settings.scale_width) != 1 or float(video_settings.scale_height) != 1:
+        command.filters.add("scale", f"iw*{video_settings.scale_width}:ih*{video_settings.scale_height}")
+
+
+def apply_thumbnail_outputs(command, video_settings, thumbnail_paths, capabilities=None):
+    """
+    Adds a poster frame, a contact sheet and a low resolution preview as side outputs of a command,
+    so they come from the same decode as the conversion. The poster is the frame a tenth of the way
+    in and the contact sheet samples frames evenly, both counted from `video_settings.expected_frames`.
+    The preview is skipped if no h264 encoder is available.
+
+    Parameters:
+    - command: The FFmpegCommand of the conversion
+    - video_settings: A settings object with `expected_frames` set
+    - thumbnail_paths: A dictionary with "poster", "contact_sheet" and "preview" output paths
+    - capabilities: An FFmpegCapabilities instance used to check for the encoders
+    """
+    if capabilities is not None and capabilities.available and not capabilities.has_encoder("png"):
+        return
+    frames = max(int(getattr(video_settings, "expected_frames", 0) or 0), 1)
+    columns, rows = contact_sheet_layout
+    step = max(1, frames // (columns * rows))
+    command.add_side_output(thumbnail_paths["poster"], f"select='eq(n,{frames // 10})',scale={poster_width}:-2",
+                            {"-frames:v": 1, "-update": 1})
+    command.add_side_output(thumbnail_paths["contact_sheet"],
+                            f"select='not(mod(n,{step}))',scale={contact_sheet_tile_width}:-2,tile={columns}x{rows}",
+                            {"-frames:v": 1, "-update": 1})
+    entry = select_encoder("h264", capabilities)
+    if entry is not None:
+        command.add_side_output(thumbnail_paths["preview"], f"scale=-2:{preview_height},format=yuv420p",
+                                {"-c:v": entry["encoder"], "-preset": "veryfast", "-crf": 30, "-an": None})
+
+
+def build_convert_command(ffmpeg_path, video_settings, use_start_stop=False, overwrite_fps=False, capabilities=None,
+                          pass_number=None, passlog_prefix="passlog", output_path=None, input_path=None, thumbnail_paths=None):
+    """
+    Builds the ffmpeg command that converts `video_settings.file_path` to `video_settings.output_path`.
+
+    Parameters:
+    - ffmpeg_path: Path to the ffmpeg executable
+    - video_settings: A settings object containing video-related configurations
+    - use_start_stop: Whether to trim the input to the start and stop times
+    - overwrite_fps: Whether to force the output frame rate to `video_settings.output_frame_rate`
+    - capabilities: An FFmpegCapabilities instance used to pick an available encoder
+    - pass_number: 1 or 2 for a two-pass encode, None otherwise. The first pass only analyses the
+                   video, so it drops audio and writes to the null muxer.
+    - passlog_prefix: The pass log file prefix, relative to ffmpeg's working directory
+    - output_path: Where ffmpeg writes the output, if not `video_settings.output_path` (e.g. scratch storage)
+    - input_path: Where ffmpeg reads the input, if not `video_settings.file_path` (e.g. a local copy or "pipe:0")
+    - thumbnail_paths: Paths for thumbnails made in the same pass (see `apply_thumbnail_outputs`), or
+                       None. They are not made on the analysis pass, nor for trimmed piped inputs,
+                       which are trimmed after the filters.
+
+    Returns:
+    The FFmpegCommand, ready to be built.
+
+    Raises:
+    - ValueError: If no encoder is available for the output codec or the rate control settings are invalid
+    """
+    command = FFmpegCommand(ffmpeg_path, input_path or video_settings.file_path, output_path or video_settings.output_path)
+    command.set_global("-y").set_global("-loglevel", "error").set_global("-stats")
+
+    if use_start_stop:
+        # A pipe cannot seek, so a piped input is trimmed by decoding and dropping frames instead
+        set_trim = command.set_output if input_path == "pipe:0" else command.set_input
+        set_trim("-ss", video_settings.start_time)
+        if str(video_settings.stop_time) != "-1":
+            set_trim("-to", video_settings.stop_time)
+
+    if overwrite_fps:
+        command.filters.add("fps", int(float(video_settings.output_frame_rate)))
+    apply_filter_settings(command, video_settings)
+    apply_encoder_profile(command, video_settings, capabilities, pass_number, passlog_prefix)
+    if pass_number == 1:
+        command.set_output("-an")
+        command.set_output("-f", "null")
+        command.output_path = "-"
+    elif thumbnail_paths and not (use_start_stop and input_path == "pipe:0"):
+        apply_thumbnail_outputs(command, video_settings, thumbnail_paths, capabilities)
+    return command
+
+
+def build_copy_command(ffmpeg_path, video_settings, start_time=None, stop_time=None, output_path=None):
+    """
+    Builds an ffmpeg command that trims `video_settings.file_path` without re-encoding. A stream copy
+    can only start on a keyframe, so pass the time of the keyframe at or before the wanted start (see
+    PacketIndex.keyframe_before) to know exactly where the output begins.
+
+    Parameters:
+    - ffmpeg_path: Path to the ffmpeg executable
+    - video_settings: A settings object containing video-related configurations
+    - start_time: Where the copy starts, in seconds. None copies from the beginning.
+    - stop_time: Where the copy stops, in seconds. None or -1 copies to the end.
+    - output_path: Where ffmpeg writes the output, if not `video_settings.output_path`
+
+    Returns:
+    The FFmpegCommand, ready to be built.
+    """
+    command = FFmpegCommand(ffmpeg_path, video_settings.file_path, output_path or video_settings.output_path)
+    command.set_global("-y").set_global("-loglevel", "error").set_global("-stats")
+    if start_time:
+        command.set_input("-ss", start_time)
+    if stop_time is not None and str(stop_time) != "-1":
+        command.set_input("-to", stop_time)
+    command.set_output("-c", "copy")
+    command.set_output("-avoid_negative_ts", "make_zero")  # Start the output's timestamps at zero
+    return command
+
+
+def build_tiff_command(ffmpeg_path, list_file_path, video_settings, capabilities=None, output_path=None, thumbnail_paths=None):
+    """
+    Builds the ffmpeg command that joins the TIFF images listed in a concat list file into a video.
+
+    Parameters:
+    - ffmpeg_path: Path to the ffmpeg executable
+    - list_file_path: Path to an ffmpeg concat demuxer list file
+    - video_settings: A settings object containing video-related configurations
+    - capabilities: An FFmpegCapabilities instance used to pick an available encoder
+    - output_path: Where ffmpeg writes the output, if not `video_settings.output_path` (e.g. scratch storage)
+    - thumbnail_paths: Paths for thumbnails made in the same pass (see `apply_thumbnail_outputs`), or None
+
+    Returns:
+    The FFmpegCommand, ready to be built.
+
+    Raises:
+    - ValueError: If no encoder is available for the output codec or the rate control settings are invalid
+    """
+    command = FFmpegCommand(ffmpeg_path, list_file_path, output_path or video_settings.output_path)
+    command.set_global("-y").set_global("-loglevel", "error").set_global("-stats")
+    command.set_input("-f", "concat").set_input("-safe", "0")
+    command.set_input("-r", video_settings.output_frame_rate)
+
+    apply_filter_settings(command, video_settings)
+    apply_encoder_profile(command, video_settings, capabilities)
+    # TIFFs are usually RGB, which most players cannot decode once it is encoded as h264/h265
+    if video_settings.output_codec in ("h264", "h265") and "format" not in command.filters.filters:
+        command.filters.add("format", "yuv420p")
+    if thumbnail_paths:
+        apply_thumbnail_outputs(command, video_settings, thumbnail_paths, capabilities)
+    return command
+
+
+def output_path_for(file_path, output_ext):
+    """
+    Derives the output path for an input file: "<name>_out<ext>" next to the input.
+
+    Parameters:
+    - file_path: The path to the input file
+    - output_ext: The output file extension, including the dot
+
+    Returns:
+    The normalized output path.
+    """
+    base_name, _ = os.path.splitext(os.path.basename(file_path))
+    return os.path.normpath(os.path.join(os.path.dirname(file_path), f"{base_name}_out{output_ext}"))
@@ -1,13 +1,21 @@
 # gui.py
+import copy
 import json
 import tkinter as tk
-from tkinter import ttk, filedialog
-from modules.video_settings.video_settings import video_settings
-from modules.processing.processing import VideoProcessor
+from tkinter import ttk, filedialog, messagebox
+from modules.video_settings.video_settings import VideoSettings
 from modules.settings.settings import Settings
+from modules.capabilities.capabilities import FFmpegCapabilities
+from modules.log_store.log_store import LogStore
+from modules.log_view.log_view import PagedLogView
+from modules.thumbnails.thumbnails import ThumbnailCache
+from modules.command_builder.command_builder import available_output_codecs, rate_control_modes
+from modules.planner.planner import action_labels, format_seconds, format_size, plan_batch, resolve_conflicts, summarise
+from modules.scheduler.scheduler import AdaptiveBatchRunner, ConcurrencyController
 import os
 import subprocess
 import threading
+import time
 
 
 
@@ -36,10 +44,11 @@ class VideoConverterApp:
 
         # UI related variables
         self.root = root
-        self.root.title(self.config['window']['title'])
-        self.video_processor = VideoProcessor()  # Pass the selected codec name
         self.settings = Settings()
-        self.config = self.load_config(config_file_path)
+        self.video_settings = VideoSettings()
+        self.video_settings.bind_tk_vars()
+        self.root.title(self.config['window']['title'])
+        self._video_processor = None  # Created on first use, see the video_processor property
 
         # Create and place GUI elements using grid
         ttk.Button(self.root, text="Select Files", command=self.select_files).grid(row=0, column=0, padx=5, pady=0, sticky="w")
@@ -53,14 +62,14 @@ class VideoConverterApp:
         scale_width_x_box = scale_width_x + 80
         # Scale Width Value
         ttk.Label(self.root, text="Scale Width:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
-        self.scale_width_entry = ttk.Entry(self.root,textvariable=video_settings.scale_width_var, width=3)
+        self.scale_width_entry = ttk.Entry(self.root,textvariable=self.video_settings.scale_width_var, width=3)
         self.scale_width_entry.grid(row=3, column=0, padx=scale_width_x_box, pady=5, sticky="w")
 
         scale_height_x = scale_width_x_box + 20
         scale_height_x_box = scale_height_x + 80
         # Scale Height Value
         ttk.Label(self.root, text="Scale Height:").grid(row=3, column=0, padx=scale_height_x, pady=5, sticky="w")
-        self.scale_height_entry = ttk.Entry(self.root,textvariable=video_settings.scale_height_var, width=3)
+        self.scale_height_entry = ttk.Entry(self.root,textvariable=self.video_settings.scale_height_var, width=3)
         self.scale_height_entry.grid(row=3, column=0,padx=scale_height_x_box, pady=5, sticky="w")
 
         
@@ -69,7 +78,7 @@ class VideoConverterApp:
         ttk.Label(self.root, text="CRF:").grid(row=1, column=0, padx=(crf_x,0), pady=0, sticky="w")
         
         crf_entry_width = 2  # Adjust the width as needed
-        self.crf_entry = ttk.Entry(self.root, textvariable=video_settings.crf_var, width=crf_entry_width)
+        self.crf_entry = ttk.Entry(self.root, textvariable=self.video_settings.crf_var, width=crf_entry_width)
         self.crf_entry.grid(row=1, column=0, padx=(crf_x+30,2), pady=0, sticky="w")
 
         # Start Time Value
@@ -77,7 +86,7 @@ class VideoConverterApp:
         ttk.Label(self.root, text="Start Time:").grid(row=1, column=0, padx=(start_time_x,0), pady=0, sticky="w")
         
         start_time_entry_width = 5  # Adjust the width as needed
-        self.crf_entry = ttk.Entry(self.root, textvariable=video_settings.start_time_var, width=start_time_entry_width)
+        self.crf_entry = ttk.Entry(self.root, textvariable=self.video_settings.start_time_var, width=start_time_entry_width)
         self.crf_entry.grid(row=1, column=0, padx=(start_time_x+60,2), pady=0, sticky="w")
 
         # Stop Time Value
@@ -85,7 +94,7 @@ class VideoConverterApp:
         ttk.Label(self.root, text="Stop Time:").grid(row=1, column=0, padx=(stop_time_x,0), pady=0, sticky="w")
         
         stop_time_entry_width = 5  # Adjust the width as needed
-        self.crf_entry = ttk.Entry(self.root, textvariable=video_settings.stop_time_var, width=stop_time_entry_width)
+        self.crf_entry = ttk.Entry(self.root, textvariable=self.video_settings.stop_time_var, width=stop_time_entry_width)
         self.crf_entry.grid(row=1, column=0, padx=(stop_time_x+60,2), pady=0, sticky="w")
 
          # Frame Rate Value
@@ -93,9 +102,25 @@ class VideoConverterApp:
         ttk.Label(self.root, text="Frame Rate:").grid(row=1, column=0, padx=(frame_rate_x,0), pady=0, sticky="w")
         
         frame_rate_entry_width = 4  # Adjust the width as needed
-        self.frame_rate = ttk.Entry(self.root, textvariable=video_settings.frame_rate_var, width=frame_rate_entry_width)
+        self.frame_rate = ttk.Entry(self.root, textvariable=self.video_settings.frame_rate_var, width=frame_rate_entry_width)
         self.frame_rate.grid(row=1, column=0, padx=(frame_rate_x+65,2), pady=0, sticky="w")
         
+        # Rate Control Mode
+        ttk.Label(self.root, text="Rate Control:").grid(row=2, column=0, padx=5, pady=0, sticky="w")
+        self.rate_control_dropdown = ttk.Combobox(self.root, textvariable=self.video_settings.rate_control_var, values=rate_control_modes, width=10)
+        self.rate_control_dropdown.grid(row=2, column=0, padx=(85,0), pady=0, sticky="w")
+
+        # Target and Maximum Bitrate Values
+        bitrate_x = 190
+        ttk.Label(self.root, text="Bitrate:").grid(row=2, column=0, padx=(bitrate_x,0), pady=0, sticky="w")
+        self.bitrate_entry = ttk.Entry(self.root, textvariable=self.video_settings.bitrate_var, width=6)
+        self.bitrate_entry.grid(row=2, column=0, padx=(bitrate_x+50,2), pady=0, sticky="w")
+
+        max_bitrate_x = 300
+        ttk.Label(self.root, text="Max Bitrate:").grid(row=2, column=0, padx=(max_bitrate_x,0), pady=0, sticky="w")
+        self.max_bitrate_entry = ttk.Entry(self.root, textvariable=self.video_settings.max_bitrate_var, width=6)
+        self.max_bitrate_entry.grid(row=2, column=0, padx=(max_bitrate_x+75,2), pady=0, sticky="w")
+
         # Create a button to start processing
         self.start_processing_button = ttk.Button(self.root, text="Start Processing", command=self.start_processing)
         self.start_processing_button.grid(row=1, column=0, columnspan=3, padx=5, pady=0, sticky="w")
@@ -108,10 +133,11 @@ class VideoConverterApp:
         self.codec_label = tk.Label(self.root, text="Output Codec:", width = 10)
         self.codec_label.grid(row=1, column=0, padx=(110,5), pady=0, sticky="w")
 
-        # Create a dropdown box for selecting the codec
-        codec_options = ["ffv1", "rawvideo", "h264", "h265"]
-        codec_dropdown = ttk.Combobox(self.root, textvariable=video_settings.output_codec_var, values=codec_options, width=8)
-        codec_dropdown.grid(row=1, column=0, padx=(200,0), pady=0, sticky="w")
+        # Create a dropdown box for selecting the codec. Every known codec is offered until the
+        # background capability probe reports which encoders this ffmpeg build actually has.
+        codec_options = available_output_codecs()
+        self.codec_dropdown = ttk.Combobox(self.root, textvariable=self.video_settings.output_codec_var, values=codec_options, width=8)
+        self.codec_dropdown.grid(row=1, column=0, padx=(200,0), pady=0, sticky="w")
 
         # Create a check box for moving the file after processing into it's own folder
         self.remove_input_var =  tk.BooleanVar(value=False)
@@ -135,6 +161,29 @@ class VideoConverterApp:
         self.overwrite_fps_checkbox = ttk.Checkbutton(root, text="Use Start/Stop Time", variable=self.use_start_stop, width=20)
         self.overwrite_fps_checkbox.grid(row=0, column=0, padx=(use_start_stop_x,0), pady=0, sticky="w")
 
+        # Count frames exactly from each input's packet timestamps, for variable frame rate footage
+        exact_frames_x = 240
+        self.exact_frames = tk.BooleanVar(value=self.settings.packet_index)
+        self.exact_frames_checkbox = ttk.Checkbutton(root, text="Exact Frame Count", variable=self.exact_frames, width=18,
+                                                     command=lambda: setattr(self.settings, "packet_index", self.exact_frames.get()))
+        self.exact_frames_checkbox.grid(row=3, column=0, padx=(exact_frames_x,0), pady=5, sticky="w")
+
+        # Make a poster frame, contact sheet and preview in the same pass as each conversion
+        thumbnails_x = 380
+        self.thumbnails_var = tk.BooleanVar(value=self.settings.thumbnails)
+        self.thumbnails_checkbox = ttk.Checkbutton(root, text="Thumbnails", variable=self.thumbnails_var, width=12,
+                                                   command=self.toggle_thumbnails)
+        self.thumbnails_checkbox.grid(row=3, column=0, padx=(thumbnails_x,0), pady=5, sticky="w")
+
+        # Distribute jobs to worker nodes through the job broker, if one is configured
+        distribute_x = 520
+        self.distribute_var = tk.BooleanVar(value=False)
+        self.broker = None  # Opened on first submit, so startup never waits on shared storage
+        self.broker_polling = False
+        if self.settings.broker_path:
+            self.distribute_checkbox = ttk.Checkbutton(root, text="Distribute", variable=self.distribute_var, width=12)
+            self.distribute_checkbox.grid(row=0, column=0, padx=(distribute_x,0), pady=0, sticky="w")
+
         # Open Output Directory
         self.open_output_button = ttk.Button(self.root, text="Open Output Directory", command=self.open_output_directory)
         self.open_output_button.grid(row=7, column=0, columnspan=2, padx=0, pady=0, sticky="w")
@@ -154,29 +203,68 @@ class VideoConverterApp:
 
         ttk.Label(self.root, text="Log Entries:").grid(row=5, column=0, columnspan=3, padx=5, pady=0, sticky="w")
 
+        # The log view only holds the visible rows and pages through the log database as it scrolls
+        self.log_store = LogStore(self.settings.log_database)
+        self.thumbnail_cache = ThumbnailCache(self.settings.cache_folder)
+        self.log_view = PagedLogView(self.root, self.log_store, self.config['columns'],
+                                     thumbnail_for=lambda entry: self.thumbnail_cache.get(os.path.join(entry["Directory"] or "", entry["File Name"] or "")))
+        self.log_view.show_thumbnails(self.settings.thumbnails)
+        self.log_view.filter_frame.grid(row=5, column=0, columnspan=2, padx=(90,0), pady=0, sticky="w")
+        self.log_view.frame.grid(row=6, column=0, columnspan=3, padx=5, pady=0, sticky="w")
+        self.log_tree = self.log_view.tree
+        self.log_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.log_tree.bind("<Double-1>", self.show_contact_sheet)
 
-        # Extract columns configuration
-        columns_config = self.config['columns']
-
-        ttk.Label(self.root, text="Log Entries:").grid(row=5, column=0, columnspan=3, padx=5, pady=0, sticky="w")
-
-        column_names = [col['name'] for col in columns_config]
+        # The log history and the encoder capabilities are loaded in the background once the window
+        # is up, so neither a large log file nor a slow ffmpeg probe delays the first frame.
+        self.capabilities = FFmpegCapabilities(self.settings.ffmpeg_path, self.settings.cache_folder)
+        self.root.after_idle(self.load_in_background)
 
-        self.log_tree = ttk.Treeview(self.root, columns=column_names, show="headings")
+    def load_in_background(self):
+        """
+        Starts loading the conversion log history and the ffmpeg capabilities on worker threads. The 
+        results are handed back to the Tk thread with `root.after`, as Tk widgets may only be updated 
+        from the thread that created them.
 
-        for col_config in columns_config:
-            col_name = col_config['name']
-            width = col_config['width']
-            anchor = col_config['alignment']
+        Returns:
+        None
+        """
+        threading.Thread(target=self.load_last_log_entries, daemon=True).start()
+        self.capabilities.load_async(lambda capabilities: self.root.after(0, self.on_capabilities_loaded, capabilities))
 
-            self.log_tree.heading(col_name, text=col_name)
-            self.log_tree.column(col_name, width=width, anchor=anchor)
+    @property
+    def video_processor(self):
+        """
+        The VideoProcessor, created the first time it is needed rather than at startup.
+        """
+        if self._video_processor is None:
+            from modules.processing.processing import VideoProcessor
+            self._video_processor = VideoProcessor(self.settings)
+            if self.capabilities.available:
+                self._video_processor.capabilities = self.capabilities
+        return self._video_processor
+
+    def on_capabilities_loaded(self, capabilities):
+        """
+        Restricts the codec dropdown to the codecs the installed ffmpeg can encode and hands the 
+        capabilities to the video processor so it can fall back to an available encoder.
 
-        self.log_tree.grid(row=6, column=0, columnspan=3, padx=5, pady=0, sticky="w")
-        self.log_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        Parameters:
+        - capabilities: The loaded FFmpegCapabilities instance.
 
-        # Load the log file if it exists
-        self.load_last_log_entries()
+        Returns:
+        None
+        """
+        if self._video_processor is not None:
+            self._video_processor.capabilities = capabilities
+        if not capabilities.available:
+            self.status_var.set(f"ffmpeg not found at {capabilities.ffmpeg_path}")
+            return
+
+        codec_options = available_output_codecs(capabilities)
+        self.codec_dropdown.config(values=codec_options)
+        if codec_options and self.video_settings.output_codec_var.get() not in codec_options:
+            self.video_settings.output_codec_var.set(codec_options[0])
     def select_files(self):
         """
         Opens a file dialog to select a video file to convert.
@@ -188,53 +276,26 @@ class VideoConverterApp:
             ("Video Files", "*.mp4;*.avi;*.m4v;*.mkv;*.3gp;*.mov;*.wmv"),
             ("Image Files", "*.tif;*.tiff"),
         ])
-    def update_log(self):
+    def update_log(self, log_entry=None):
         """
-        Updates the log file with the current video conversion settings and adds a new entry to the log treeview.
+        Adds an entry for the current video conversion to the log database and updates the log view. 
+        This is a single insert, so it takes the same time however long the history is.
+
+        Parameters:
+        - log_entry: The entry to add, e.g. a result reported by a remote worker. Defaults to the 
+                     entry for the file that was just converted locally.
 
         Returns:
         None
         """
         # Create a new entry dictionary
-        self.log_entry = {
-            "Directory":        video_settings.file_directory,
-            "File Name":        video_settings.file_name,
-            "Input Codec":      video_settings.input_codec,
-            "Output Codec":     video_settings.output_codec,
-            "Input Size":       video_settings.input_size,
-            "Output Size":      video_settings.output_size,
-            "Relative Size":    video_settings.relative_size
-        }
+        self.log_entry = log_entry or self.video_settings.to_log_entry()
 
-        try:
-            # Read the existing log entries or initialize as empty list if log file doesn't exist
-            with open(self.settings.log_file, 'r+') as log_file:
-                log_data_list = json.load(log_file)
-                log_data_list.reverse()
-                # Append the new log data
-                log_data_list.append(self.log_entry)
-                
-                # Go back to the start of the file
-                log_file.seek(0)
-                
-                # Write the updated log data
-                json.dump(log_data_list, log_file, indent=4)
-                
-                # Truncate the file to the current position (this will remove any data beyond this point)
-                log_file.truncate()
-
-        except FileNotFoundError:
-            log_data_list = []
+        with self.video_processor.instrumentation.stage("log_write", file=self.log_entry.get("File Name")):
+            self.log_store.append(self.log_entry)
 
-        # Add the new entry to the list of log entries
-        log_data_list.append(self.log_entry)
-
-        # Write the updated log entries back to the file
-        with open(self.settings.log_file, "w") as f:
-            json.dump(log_data_list, f, indent=4)
-
-        # Insert the new entry into the treeview
-        self.log_tree.insert("", tk.END, values=(video_settings.file_directory,video_settings.file_name, video_settings.input_codec, video_settings.output_codec, video_settings.input_size, video_settings.output_size, video_settings.relative_size))
+        # Tk widgets may only be updated from the Tk thread, and this runs on the processing thread
+        self.root.after(0, self.log_view.entry_added)
     
     def process_files(self):
         """
@@ -245,32 +306,237 @@ class VideoConverterApp:
         """
         self.update_conversion_vars()  # Populate video conversion settings from gui
         try:
-            video_settings.output_frame_rate = int(self.frame_rate.get())
+            self.video_settings.output_frame_rate = int(self.frame_rate.get())
             # Check if all files have the .tif or .tiff extension
             if all(fp.lower().endswith(('.tif', '.tiff')) for fp in self.file_paths):
                 # Process all TIFFs as one video
-                video_settings.file_path = self.file_paths[0]
-                self.update_current_file_label(video_settings.file_path)
-                result = self.video_processor.process_tiffs_to_video(self.file_paths, self.settings.ffmpeg_path, video_settings, self)
+                self.video_settings.file_path = self.file_paths[0]
+                self.update_current_file_label(self.video_settings.file_path)
+                result = self.video_processor.process_tiffs_to_video(self.file_paths, self.settings.ffmpeg_path, self.video_settings, self)
                 if result == "SKIPPED":
-                    print(f"Skipped conversion for {video_settings.file_name}")
+                    print(f"Skipped conversion for {self.video_settings.file_name}")
                 else:
                     self.update_log()
+            elif self.distribute_var.get():
+                # Hand the files to the worker nodes; results arrive through poll_broker
+                self.submit_to_broker(self.file_paths)
+                return
             else:
-                for video_settings.file_path in self.file_paths:
-                    self.update_current_file_label(video_settings.file_path)
-                    result = self.video_processor.convert_video(video_settings,self)
-
-                    if result == "SKIPPED":
-                        print(f"Skipped conversion for {video_settings.file_name}")
-                    else:
-                        self.update_log()
-
-                    if self.remove_input_var.get():
-                        self.move_input_file(video_settings.file_path)  # Call the function to move the input file
+                # Every file is probed and planned before anything runs, so conflicts are resolved 
+                # once for the whole batch instead of interrupting it file by file
+                self.status_var.set(f"Planning {len(self.file_paths)} file(s)")
+                plan = plan_batch(self.video_processor, self.file_paths, self.video_settings, self.overwrite_file.get(),
+                                  self.use_start_stop.get(), self.overwrite_fps.get(),
+                                  on_progress=lambda done, total: self.progress_var.set(int(done / total * 100)))
+                self.root.after(0, self.show_plan, plan)
+                return
+
+            self.finish_batch()
         except FileNotFoundError:
             self.status_var.set('Select a File for Conversion')
 
+    def show_plan(self, plan):
+        """
+        Shows the batch plan: what will happen to each file, where its output goes and the estimated 
+        run time and output size. Conflicts can be resolved for all files at once, then the batch is 
+        started or cancelled. Runs on the Tk thread.
+
+        Parameters:
+        - plan: A list of PlanItems from `plan_batch`
+
+        Returns:
+        None
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch Plan")
+        columns = (("File", 220), ("Action", 150), ("Output", 220), ("Est. Time", 70), ("Est. Size", 80))
+        plan_tree = ttk.Treeview(dialog, columns=[name for name, _ in columns], show="headings", height=min(max(len(plan), 1), 15))
+        for name, width in columns:
+            plan_tree.heading(name, text=name)
+            plan_tree.column(name, width=width)
+        plan_tree.grid(row=0, column=0, columnspan=6, padx=5, pady=5)
+        summary_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=summary_var).grid(row=1, column=0, columnspan=6, padx=5, pady=0, sticky="w")
+
+        def show():
+            plan_tree.delete(*plan_tree.get_children())
+            for item in plan:
+                action = action_labels[item.action] + (f": {item.reason}" if item.reason else "")
+                plan_tree.insert("", "end", values=(os.path.basename(item.file_path), action, os.path.basename(item.output_path),
+                                                    format_seconds(item.estimated_seconds) if item.runs else "",
+                                                    format_size(item.estimated_size) if item.runs else ""))
+            summary = summarise(plan)
+            counts = ", ".join(f"{count} {action_labels[action].lower()}" for action, count in summary["counts"].items() if count)
+            estimate = f"about {format_seconds(summary['estimated_seconds'])}"
+            if summary["unestimated"]:
+                estimate += f" plus {summary['unestimated']} file(s) without throughput history"
+            summary_var.set(f"{counts}. Output {format_size(summary['estimated_size'])}, {estimate}.")
+            start_button.config(state="disabled" if summary["counts"]["conflict"] else "normal")
+
+        def resolve(resolution):
+            resolve_conflicts(plan, resolution)
+            show()
+
+        def start():
+            dialog.destroy()
+            threading.Thread(target=self.run_plan, args=(plan,)).start()
+
+        ttk.Button(dialog, text="Overwrite All", command=lambda: resolve("overwrite")).grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        ttk.Button(dialog, text="Skip All", command=lambda: resolve("skip")).grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        ttk.Button(dialog, text="Rename All", command=lambda: resolve("rename")).grid(row=2, column=2, padx=5, pady=5, sticky="w")
+        start_button = ttk.Button(dialog, text="Start", command=start)
+        start_button.grid(row=2, column=4, padx=5, pady=5, sticky="e")
+        ttk.Button(dialog, text="Cancel", command=dialog.destroy).grid(row=2, column=5, padx=5, pady=5, sticky="e")
+        show()
+        self.progress_var.set(0)
+        self.status_var.set("Review the plan and press Start")
+
+    def run_plan(self, plan):
+        """
+        Runs a batch plan on the calling (processing) thread, adding each converted file to the log. 
+        Several files are converted at once when the machine has room for them: an 
+        AdaptiveBatchRunner adds and removes job slots from the CPU load, I/O wait and the jobs' 
+        combined fps, up to `settings.max_jobs`. Each job has its own copy of the video settings.
+
+        Parameters:
+        - plan: A list of PlanItems with every conflict resolved
+
+        Returns:
+        None
+        """
+        from modules.processing.processing import HeadlessApp  # Already loaded by video_processor
+        options = {
+            "overwrite_file": self.overwrite_file.get(),
+            "overwrite_fps": self.overwrite_fps.get(),
+            "use_start_stop": self.use_start_stop.get(),
+        }
+        remove_input = self.remove_input_var.get()
+        jobs = []
+        for item in plan:
+            job_settings = copy.copy(self.video_settings)
+            job_settings.file_path = item.file_path
+            job_settings.file_name = os.path.basename(item.file_path)
+            job_settings.encode_fps = 0.0
+            jobs.append((item, job_settings))
+        progress = {}
+        running_names = []
+        batch_start = time.perf_counter()
+
+        def show_progress():
+            self.progress_var.set(int(sum(progress.values()) / max(len(jobs), 1)))
+            self.root.after(0, lambda: self.current_file_label.config(text="Processing: " + ", ".join(running_names)))
+
+        def run_job(job):
+            item, job_settings = job
+            running_names.append(job_settings.file_name)
+            self.video_processor.instrumentation.record("queue_wait", file=job_settings.file_name,
+                                                        wall_seconds=time.perf_counter() - batch_start)
+
+            def on_progress(value):
+                progress[id(job)] = value
+                show_progress()
+
+            app = HeadlessApp(on_progress=on_progress, on_status=self.status_var.set, **options)
+            try:
+                result = self.video_processor.convert_video(job_settings, app, item)
+                if result == "SKIPPED":
+                    print(f"Skipped conversion for {job_settings.file_name}")
+                else:
+                    self.update_log(job_settings.to_log_entry())
+                if remove_input:
+                    self.move_input_file(item.file_path)  # Call the function to move the input file
+            finally:
+                running_names.remove(job_settings.file_name)
+                progress[id(job)] = 100
+                show_progress()
+
+        max_jobs = self.settings.max_jobs or os.cpu_count() or 1
+        runner = AdaptiveBatchRunner(run_job, lambda job: job[1].encode_fps, ConcurrencyController(max_slots=max_jobs))
+        peak_jobs = runner.run(jobs)
+        if self.settings.debug:
+            print(f"Batch of {len(jobs)} file(s) ran up to {peak_jobs} conversions at once")
+        self.root.after(0, lambda: self.open_output_button.config(state="normal"))
+        self.finish_batch()
+
+    def finish_batch(self):
+        """
+        Waits for outputs written to scratch storage to be moved to their final paths and exports the 
+        batch's metrics.
+
+        Returns:
+        None
+        """
+        move_errors = self.video_processor.output_mover.wait()
+        if move_errors:
+            self.status_var.set(f"Failed to move {len(move_errors)} output(s): {move_errors[0][1]}")
+        self.video_processor.instrumentation.export()
+
+    def submit_to_broker(self, file_paths):
+        """
+        Submits one job per file to the job broker so worker nodes convert them, and starts polling 
+        the broker for results.
+
+        Parameters:
+        - file_paths: Paths of the files to convert. They must be on storage the workers can reach.
+
+        Returns:
+        None
+        """
+        options = {
+            "overwrite_file": self.overwrite_file.get(),
+            "overwrite_fps": self.overwrite_fps.get(),
+            "use_start_stop": self.use_start_stop.get(),
+        }
+        if self.broker is None:
+            from modules.broker.broker import JobBroker
+            self.broker = JobBroker(self.settings.broker_path)
+        for file_path in file_paths:
+            self.video_settings.file_path = os.path.abspath(file_path)
+            self.broker.submit({"settings": self.video_settings.to_job_spec(), "options": options})
+        self.status_var.set(f"Submitted {len(file_paths)} job(s) to {self.settings.broker_path}")
+        if not self.broker_polling:
+            self.broker_polling = True
+            self.root.after(0, self.poll_broker)
+
+    def poll_broker(self):
+        """
+        Adds results reported by worker nodes to the conversion log and shows the queue state. Keeps 
+        polling every two seconds while jobs are queued or running.
+
+        Returns:
+        None
+        """
+        results = self.broker.fetch_results()
+        for job in results:
+            if job["state"] == "done":
+                self.update_log(job["result"])
+            else:
+                self.status_var.set(f"Job for {os.path.basename(job['spec']['settings']['file_path'])} failed on "
+                                    f"{job['worker']}: {job['result']['error']}")
+        if results:
+            self.video_processor.instrumentation.export()
+
+        counts = self.broker.counts()
+        outstanding = counts.get("queued", 0) + counts.get("running", 0)
+        if outstanding:
+            self.current_file_label.config(text=f"Remote jobs: {counts.get('running', 0)} running, {counts.get('queued', 0)} queued")
+            self.root.after(2000, self.poll_broker)
+        else:
+            self.current_file_label.config(text="Remote jobs: all finished")
+            self.broker_polling = False
+
+    def ask_overwrite(self, output_name):
+        """
+        Asks the user whether an existing output file should be overwritten.
+
+        Parameters:
+        - output_name: The name of the existing output file.
+
+        Returns:
+        True if the file should be overwritten.
+        """
+        return messagebox.askyesno("File Exists", f"The output file '{output_name}' already exists. Do you want to overwrite it?")
+
     def update_current_file_label(self, file_path):
         """
         Updates the current file label with the name of the current file being processed.
@@ -281,8 +547,8 @@ class VideoConverterApp:
         Returns:
         None
         """        
-        video_settings.file_name = os.path.basename(file_path)
-        self.current_file_label.config(text=f"Current File: {video_settings.file_name}")
+        self.video_settings.file_name = os.path.basename(file_path)
+        self.current_file_label.config(text=f"Current File: {self.video_settings.file_name}")
 
     # Read in all conversion variables from the gui
     def update_conversion_vars(self):
@@ -292,13 +558,16 @@ class VideoConverterApp:
         Returns:
         None
         """
-        video_settings.crf = video_settings.crf_var.get()
-        video_settings.scale_width = video_settings.scale_width_var.get()
-        video_settings.scale_height = video_settings.scale_height_var.get()
-        video_settings.frame_rate = video_settings.frame_rate_var.get()
-        video_settings.output_codec = video_settings.output_codec_var.get()
-        video_settings.start_time = video_settings.start_time_var.get()
-        video_settings.stop_time = video_settings.stop_time_var.get()
+        self.video_settings.crf = self.video_settings.crf_var.get()
+        self.video_settings.scale_width = self.video_settings.scale_width_var.get()
+        self.video_settings.scale_height = self.video_settings.scale_height_var.get()
+        self.video_settings.frame_rate = self.video_settings.frame_rate_var.get()
+        self.video_settings.output_codec = self.video_settings.output_codec_var.get()
+        self.video_settings.start_time = self.video_settings.start_time_var.get()
+        self.video_settings.stop_time = self.video_settings.stop_time_var.get()
+        self.video_settings.rate_control = self.video_settings.rate_control_var.get()
+        self.video_settings.bitrate = self.video_settings.bitrate_var.get()
+        self.video_settings.max_bitrate = self.video_settings.max_bitrate_var.get()
     
     def on_tree_select(self,event): 
         """
@@ -317,6 +586,46 @@ class VideoConverterApp:
                 self.settings.explorer_directory = os.path.normpath(values[0])
                 self.open_output_button.config(state="normal")
 
+    def toggle_thumbnails(self):
+        """
+        Turns thumbnail generation on or off for the next conversions and shows or hides the posters 
+        in the log view.
+
+        Returns:
+        None
+        """
+        self.settings.thumbnails = self.thumbnails_var.get()
+        self.log_view.show_thumbnails(self.settings.thumbnails)
+
+    def show_contact_sheet(self, event):
+        """
+        Shows the contact sheet of the double-clicked log entry, so the output can be checked without 
+        opening the video. The low resolution preview is next to it in the thumbnail cache.
+
+        Parameters:
+        - event: The event object containing information about the double click.
+
+        Returns:
+        None
+        """
+        row = self.log_tree.identify_row(event.y)
+        if not row:
+            return
+        values = self.log_tree.item(row, 'values')
+        names = self.log_view.column_names
+        file_path = os.path.join(values[names.index("Directory")], values[names.index("File Name")])
+        contact_sheet = self.thumbnail_cache.get(file_path, "contact_sheet")
+        if contact_sheet is None:
+            self.status_var.set(f"No thumbnails for {os.path.basename(file_path)}")
+            return
+        window = tk.Toplevel(self.root)
+        window.title(os.path.basename(file_path))
+        window.image = tk.PhotoImage(file=contact_sheet)  # Keep a reference, or Tk drops the image
+        ttk.Label(window, image=window.image).pack()
+        preview = self.thumbnail_cache.get(file_path, "preview")
+        if preview:
+            ttk.Label(window, text=f"Preview: {preview}").pack(anchor="w", padx=5, pady=2)
+
     def move_input_file(self,input_path):
         """
         Moves the specified input file to a subdirectory called 'inputFiles' within the directory 
@@ -360,52 +669,32 @@ class VideoConverterApp:
 
     def load_last_log_entries(self):
         """
-        Loads the last 15 entries from the log file (or all entries if there are fewer than 15). 
-        Each log entry contains details about file processing. The details are extracted and inserted 
-        into the `log_tree` attribute, which is presumably a treeview widget.
-
-        In case the log file does not exist, the function silently continues without any action.
+        Imports the JSON log written by earlier versions into the log database the first time it is
+        seen, then shows the newest entries. The import runs on the calling thread, which is a 
+        background thread at startup, and the view is refreshed on the Tk thread.
 
         Returns:
         None
         """
-        try:
-            with open(self.settings.log_file, "r") as f:
-                log_data_list = json.load(f)
-
-            # Get the last 5 entries or all entries if there are less than 5
-            last_entries = log_data_list[-15:]
-
-            for entry in last_entries:
-                # Extract relevant values and insert into the treeview
-                file_directory =     entry.get("Directory", "Unknown")
-                file_name =         entry.get("File Name", "Unknown")
-                input_codec  =     entry.get("Input Codec", "Unknown")
-                output_codec =     entry.get("Output Codec", "Unknown")
-                input_size =         entry.get("Input Size", "Unknown")
-                output_size =       entry.get("Output Size", "Unknown")
-                relative_size =     entry.get("Relative Size", "Unknown")
-
-                self.log_tree.insert("", tk.END, values=(file_directory,file_name, input_codec, output_codec, input_size, output_size, relative_size))
-
-        except FileNotFoundError:
-            pass  # Handle the case when the log file is not found 
+        imported = self.log_store.import_legacy(self.settings.log_file)
+        if imported:
+            print(f"Imported {imported} entries from {self.settings.log_file}")
+        self.root.after(0, self.log_view.refresh)
     
     def clear_log(self):
 
         """
-        Clears the log file by overwriting it with an empty JSON array. Also updates any related GUI 
-        components to reflect the cleared log, such as a status indicator and a treeview widget.
+        Removes every entry from the log database. Also updates any related GUI components to reflect 
+        the cleared log, such as a status indicator and the log view.
 
         Returns:
         None
         """
-        with open(self.settings.log_file, 'w') as log_file:
-            log_file.write("[]")
+        self.log_store.clear()
 
         # Optionally: Notify the user
         self.status_var.set("Log cleared successfully!")
-        self.log_tree.delete(*self.log_tree.get_children())
+        self.log_view.refresh()
     
     def load_config(self,config_file_path):        
         """
@@ -0,0 +1,271 @@
+# input_stage.py
+import os
+import re
+import sys
+import queue
+import shutil
+import struct
+import tempfile
+import threading
+import time
+
+# Filesystem types (as listed in /proc/mounts) where ffmpeg's small seeks and reads each cost a
+# network round trip
+remote_filesystems = {"cifs", "smb3", "smbfs", "nfs", "nfs4", "fuse.sshfs", "9p", "afs", "fuse.rclone", "davfs", "ncpfs"}
+
+# Containers ffmpeg can demux from a pipe, i.e. without seeking back. MP4/MOV only qualify when the
+# index (moov atom) comes before the media data, which `is_streamable` checks.
+streamable_extensions = {".ts", ".m2ts", ".mts", ".mkv", ".webm", ".mpg", ".mpeg", ".vob", ".flv", ".y4m"}
+mp4_extensions = {".mp4", ".m4v", ".mov", ".3gp"}
+
+input_modes = ("auto", "direct", "pipe", "stage")
+
+mounts_path = "/proc/mounts"
+
+octal_escape_pattern = re.compile(r"\\([0-7]{3})")
+
+
+def filesystem_type(path):
+    """
+    Returns the type of the filesystem a path is on, e.g. "ext4" or "nfs4".
+
+    On Linux this is the longest matching mount point in /proc/mounts. On Windows, UNC paths and
+    mapped network drives return "remote". Elsewhere, or if the type cannot be determined, an empty
+    string is returned.
+    """
+    path = os.path.realpath(path)
+    if sys.platform == "win32":
+        if path.startswith("\\\\"):
+            return "remote"
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + "\\"
+            return "remote" if ctypes.windll.kernel32.GetDriveTypeW(drive) == 4 else "local"  # 4 is DRIVE_REMOTE
+        except (ImportError, AttributeError, OSError):
+            return ""
+
+    best_mount, best_type = "", ""
+    try:
+        with open(mounts_path, "r") as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces and other special characters in mount points are octal escaped
+                mount_point = octal_escape_pattern.sub(lambda match: chr(int(match.group(1), 8)), fields[1])
+                if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) >= len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return ""
+    return best_type
+
+
+def is_remote_path(path):
+    """
+    Returns whether a path is on a network filesystem.
+    """
+    fs_type = filesystem_type(path)
+    return fs_type == "remote" or fs_type in remote_filesystems
+
+
+def is_streamable(path):
+    """
+    Returns whether ffmpeg can read the file from a pipe. For MP4 and MOV files the top-level atoms
+    are read to check that the moov atom comes before mdat ("fast start").
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in streamable_extensions:
+        return True
+    if ext not in mp4_extensions:
+        return False
+    try:
+        with open(path, "rb") as video_file:
+            for _ in range(32):
+                header = video_file.read(8)
+                if len(header) < 8:
+                    return False
+                size, atom = struct.unpack(">I4s", header)
+                if atom == b"moov":
+                    return True
+                if atom == b"mdat":
+                    return False
+                if size == 1:
+                    size = struct.unpack(">Q", video_file.read(8))[0] - 8
+                elif size == 0:
+                    return False
+                video_file.seek(size - 8, os.SEEK_CUR)
+    except (OSError, struct.error):
+        pass
+    return False
+
+
+def choose_input_mode(file_path, mode="auto", two_pass=False):
+    """
+    Decides how ffmpeg should read an input.
+
+    - direct: ffmpeg opens the file itself. Used for local files.
+    - pipe: A ReadAhead thread streams the file into ffmpeg's stdin with large sequential reads.
+    - stage: The file is first copied to local disk with large sequential reads.
+
+    Two-pass encodes read the input twice, so they are staged rather than piped.
+
+    Parameters:
+    - file_path (str): The input file.
+    - mode (str): One of `input_modes`. "auto" pipes or stages files on network filesystems.
+    - two_pass (bool): Whether the input will be read more than once.
+
+    Returns:
+    "direct", "pipe" or "stage".
+    """
+    if mode not in input_modes:
+        raise ValueError(f"Unknown input mode '{mode}'")
+    if mode == "direct" or (mode == "auto" and not is_remote_path(file_path)):
+        return "direct"
+    if mode == "stage" or two_pass or not is_streamable(file_path):
+        return "stage"
+    return "pipe"
+
+
+def advise_sequential(file_object):
+    # Lets the kernel read further ahead than it would for random access
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(file_object.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def stage_copy(file_path, staging_directory="", chunk_size=8 * 1024 * 1024):
+    """
+    Copies an input to local disk with large sequential reads.
+
+    Parameters:
+    - file_path (str): The input file.
+    - staging_directory (str): Local directory for the copy. Defaults to the system temp directory.
+    - chunk_size (int): Bytes per read.
+
+    Returns:
+    The path of the local copy. The caller removes it when the job is done.
+
+    Raises:
+    - OSError: If the file cannot be read or the copy cannot be written
+    """
+    staging_directory = staging_directory or tempfile.gettempdir()
+    os.makedirs(staging_directory, exist_ok=True)
+    base_name, ext = os.path.splitext(os.path.basename(file_path))
+    handle, staged_path = tempfile.mkstemp(prefix=f"{base_name}_", suffix=ext, dir=staging_directory)
+    try:
+        with open(file_path, "rb") as source, os.fdopen(handle, "wb") as destination:
+            advise_sequential(source)
+            shutil.copyfileobj(source, destination, chunk_size)
+    except OSError:
+        os.remove(staged_path)
+        raise
+    return staged_path
+
+
+class ReadAhead:
+    """
+    Streams a file into a pipe through a bounded buffer. A reader thread issues large sequential reads
+    and a writer thread feeds the pipe, so slow network reads overlap with encoding and the buffer
+    never holds more than `max_chunks * chunk_size` bytes.
+
+    Methods:
+    - start(): Creates the pipe and starts the threads. Returns the file descriptor to use as stdin.
+    - join(): Waits for the threads and returns their statistics.
+    """
+    def __init__(self, file_path, chunk_size=8 * 1024 * 1024, max_chunks=8):
+        """
+        Parameters:
+        - file_path (str): The file to stream.
+        - chunk_size (int): Bytes per read.
+        - max_chunks (int): Number of chunks buffered between the reader and the writer.
+        """
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.buffer = queue.Queue(maxsize=max_chunks)
+        self.stopped = threading.Event()
+        self.threads = []
+        self.bytes_read = 0
+        self.input_wait_seconds = 0.0  # Time the writer waited on the reader, i.e. ffmpeg starved of input
+        self.error = None
+
+    def start(self):
+        """
+        Creates the pipe and starts the reader and writer threads.
+
+        Returns:
+        The read end of the pipe, to pass to subprocess.Popen as stdin. The caller closes it once the
+        child has been started.
+        """
+        read_fd, write_fd = os.pipe()
+        self.threads = [
+            threading.Thread(target=self._read, daemon=True),
+            threading.Thread(target=self._write, args=(write_fd,), daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return read_fd
+
+    def stop(self):
+        self.stopped.set()
+
+    def join(self):
+        """
+        Waits for the threads to finish.
+
+        Returns:
+        A dictionary with "bytes_read" and "input_wait_seconds", plus "input_error" if reading failed.
+        """
+        for thread in self.threads:
+            thread.join()
+        stats = {"bytes_read": self.bytes_read, "input_wait_seconds": round(self.input_wait_seconds, 3)}
+        if self.error:
+            stats["input_error"] = self.error
+        return stats
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self):
+        try:
+            with open(self.file_path, "rb") as source:
+                advise_sequential(source)
+                while not self.stopped.is_set():
+                    chunk = source.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    self.bytes_read += len(chunk)
+                    if not self._put(chunk):
+                        return
+        except OSError as e:
+            self.error = str(e)
+        self._put(None)
+
+    def _write(self, write_fd):
+        try:
+            with open(write_fd, "wb") as pipe:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        chunk = self.buffer.get(timeout=0.5)
+                    except queue.Empty:
+                        # The reader gives up without an end marker once stopped, so check here too
+                        if self.stopped.is_set():
+                            break
+                        continue
+                    finally:
+                        self.input_wait_seconds += time.perf_counter() - start
+                    if chunk is None:
+                        break
+                    pipe.write(chunk)
+        except OSError:
+            pass  # ffmpeg stopped reading, e.g. after the stop time of a trim
+        finally:
+            self.stop()
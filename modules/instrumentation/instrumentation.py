@@ -0,0 +1,205 @@
+# instrumentation.py
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource  # Not available on Windows, where child CPU time and peak RSS are not recorded
+except ImportError:
+    resource = None
+
+# Fields that are summed per stage for the Prometheus export, with their metric names and help text
+summed_fields = {
+    "wall_seconds": ("videoconversion_stage_wall_seconds_total", "Wall clock time spent in each stage."),
+    "child_cpu_seconds": ("videoconversion_stage_child_cpu_seconds_total", "CPU time used by ffmpeg/ffprobe children in each stage."),
+    "bytes_read": ("videoconversion_stage_bytes_read_total", "Bytes read by each stage."),
+    "bytes_written": ("videoconversion_stage_bytes_written_total", "Bytes written by each stage."),
+    "disk_bytes_read": ("videoconversion_stage_disk_bytes_read_total", "Bytes each stage read from storage rather than the page cache."),
+    "frames": ("videoconversion_stage_frames_total", "Frames processed by each stage."),
+}
+
+
+def children_cpu_seconds():
+    """
+    Returns the user plus system CPU time of all waited-for child processes, or None on platforms
+    without the resource module. This is process wide, so with several jobs running at once a
+    stage's delta also includes other jobs' children that finished meanwhile.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def read_process_io(pid):
+    """
+    Returns the I/O counters of a process from /proc/<pid>/io, or an empty dictionary where they
+    are not available (e.g. Windows and macOS). They stay readable until the process is reaped.
+    """
+    try:
+        with open(f"/proc/{pid}/io", "r") as io_file:
+            counters = dict(line.split(":", 1) for line in io_file if ":" in line)
+        return {name.strip(): int(value) for name, value in counters.items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def wait_for_process(process):
+    """
+    Waits for a subprocess.Popen child and collects its own resource usage with os.wait4 where
+    available, so the numbers belong to this child only. Where the platform supports it, the child's
+    I/O counters are read after it exits but before it is reaped.
+
+    Parameters:
+    - process: The subprocess.Popen instance to wait for
+
+    Returns:
+    A dictionary with "child_cpu_seconds" and "peak_rss_bytes" keys, plus "bytes_read" (bytes the
+    child read, including from the page cache and pipes) and "disk_bytes_read" (bytes it read from
+    storage) where /proc is available. Empty if the platform cannot report per-child usage. The
+    process' returncode is set either way.
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return {}
+    stats = {}
+    try:
+        if hasattr(os, "waitid"):
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            io = read_process_io(process.pid)
+            if "rchar" in io:
+                stats["bytes_read"] = io["rchar"]
+            if "read_bytes" in io:
+                stats["disk_bytes_read"] = io["read_bytes"]
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        process.wait()  # Already reaped elsewhere
+        return {}
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = usage.ru_maxrss if os.uname().sysname == "Darwin" else usage.ru_maxrss * 1024
+    stats.update({"child_cpu_seconds": usage.ru_utime + usage.ru_stime, "peak_rss_bytes": peak_rss})
+    return stats
+
+
+class Instrumentation:
+    """
+    Records structured measurements for each conversion stage (probe, queue wait, encode, move and
+    log write) and exports them as JSON lines and in the Prometheus text format. Comparing the wall
+    time, child CPU time and bytes moved per stage shows whether a machine is probe-, I/O- or
+    encoder-bound.
+
+    Methods:
+    - stage(name, **fields): Context manager that times a stage.
+    - record(name, **fields): Records a stage that was measured elsewhere.
+    - export(): Appends new records to the JSON lines file and rewrites the Prometheus file.
+    - prometheus_text(): Returns the aggregated metrics in the Prometheus text format.
+    """
+    def __init__(self, metrics_folder="logs", jsonl_name="metrics.jsonl", prometheus_name="metrics.prom"):
+        """
+        Parameters:
+        - metrics_folder (str): Directory the metrics files are written to.
+        - jsonl_name (str): File name for the JSON lines records.
+        - prometheus_name (str): File name for the Prometheus text export, e.g. for node_exporter's
+                                 textfile collector.
+        """
+        self.jsonl_path = os.path.join(metrics_folder, jsonl_name)
+        self.prometheus_path = os.path.join(metrics_folder, prometheus_name)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.totals = {}
+        self.peak_rss_bytes = 0
+        self.last_encode_fps = None
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """
+        Times the enclosed block as one stage. The yielded dictionary is the record, so the block can
+        add fields such as bytes_written or frames; fields it sets itself take precedence.
+
+        Parameters:
+        - name (str): The stage name, e.g. "probe" or "encode".
+        - fields: Extra fields stored with the record, e.g. the file name.
+        """
+        record = dict(fields)
+        cpu_before = children_cpu_seconds()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.setdefault("wall_seconds", time.perf_counter() - start)
+            cpu_after = children_cpu_seconds()
+            if cpu_before is not None and cpu_after is not None:
+                record.setdefault("child_cpu_seconds", cpu_after - cpu_before)
+            self.record(name, **record)
+
+    def record(self, name, **fields):
+        """
+        Records a stage measurement.
+
+        Parameters:
+        - name (str): The stage name.
+        - fields: The measured values, e.g. wall_seconds=1.5.
+        """
+        record = {"stage": name, "timestamp": time.time(), **fields}
+        if record.get("frames") and record.get("wall_seconds"):
+            record.setdefault("fps", round(record["frames"] / record["wall_seconds"], 2))
+        with self.lock:
+            self.pending.append(record)
+            totals = self.totals.setdefault(name, {"count": 0})
+            totals["count"] += 1
+            for field in summed_fields:
+                if isinstance(record.get(field), (int, float)):
+                    totals[field] = totals.get(field, 0) + record[field]
+            self.peak_rss_bytes = max(self.peak_rss_bytes, record.get("peak_rss_bytes") or 0)
+            if name == "encode" and record.get("fps"):
+                self.last_encode_fps = record["fps"]
+
+    def export(self):
+        """
+        Appends the records made since the last export to the JSON lines file and rewrites the
+        Prometheus file with the totals so far. Errors are printed rather than raised, so a full or
+        read-only disk never fails a conversion.
+        """
+        with self.lock:
+            records, self.pending = self.pending, []
+            prometheus_text = self._prometheus_text()
+        try:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+            with open(self.jsonl_path, "a") as jsonl_file:
+                for record in records:
+                    jsonl_file.write(json.dumps(record, default=str) + "\n")
+            temporary_path = self.prometheus_path + ".tmp"
+            with open(temporary_path, "w") as prometheus_file:
+                prometheus_file.write(prometheus_text)
+            os.replace(temporary_path, self.prometheus_path)  # Atomic, so scrapers never see half a file
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def prometheus_text(self):
+        with self.lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self):
+        lines = [
+            "# HELP videoconversion_stage_runs_total Number of times each stage ran.",
+            "# TYPE videoconversion_stage_runs_total counter",
+        ]
+        for name, totals in sorted(self.totals.items()):
+            lines.append(f'videoconversion_stage_runs_total{{stage="{name}"}} {totals["count"]}')
+        for field, (metric, help_text) in summed_fields.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, totals in sorted(self.totals.items()):
+                if field in totals:
+                    lines.append(f'{metric}{{stage="{name}"}} {round(totals[field], 6)}')
+        lines.append("# HELP videoconversion_child_peak_rss_bytes Largest peak resident set size of an ffmpeg child.")
+        lines.append("# TYPE videoconversion_child_peak_rss_bytes gauge")
+        lines.append(f"videoconversion_child_peak_rss_bytes {self.peak_rss_bytes}")
+        if self.last_encode_fps is not None:
+            lines.append("# HELP videoconversion_encode_fps Frames per second of the most recent encode.")
+            lines.append("# TYPE videoconversion_encode_fps gauge")
+            lines.append(f"videoconversion_encode_fps {self.last_encode_fps}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,260 @@
+# log_store.py
+import os
+import json
+import time
+import sqlite3
+
+# Log entry keys mapped to their database columns, in display order
+entry_columns = {
+    "Directory": "directory",
+    "File Name": "file_name",
+    "Input Codec": "input_codec",
+    "Output Codec": "output_codec",
+    "Input Size": "input_size",
+    "Output Size": "output_size",
+    "Relative Size": "relative_size",
+}
+numeric_columns = ("input_size", "output_size", "relative_size")
+
+class LogStore:
+    """
+    The conversion log, stored in an SQLite database so the history can grow to hundreds of thousands
+    of entries. Appending is a single insert, and the log view reads one page at a time through
+    indexed queries instead of loading the whole history. Every sortable column has an index ending
+    in the id, so a page can continue after the last entry of the previous one (keyset paging)
+    without SQLite stepping over the entries before it.
+
+    Methods:
+    - import_legacy(json_path): Imports the entries of an old JSON log file once.
+    - append(log_entry): Adds an entry and returns its id.
+    - count(filters): Returns the number of entries matching the filters.
+    - page(offset, limit, sort_key, descending, filters, after): Returns a page of entries.
+    - distinct(key): Returns the distinct values of a column, e.g. for a filter dropdown.
+    - clear(): Removes every entry.
+    """
+    def __init__(self, db_path):
+        """
+        Opens the log database, creating it if needed.
+
+        Parameters:
+        - db_path (str): Path to the SQLite database file.
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer; the log is always local
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    directory TEXT,
+                    file_name TEXT,
+                    input_codec TEXT,
+                    output_codec TEXT,
+                    input_size INTEGER,
+                    output_size INTEGER,
+                    relative_size REAL,
+                    created REAL NOT NULL
+                )""")
+            connection.execute("CREATE TABLE IF NOT EXISTS imports (path TEXT PRIMARY KEY, mtime REAL, entries INTEGER)")
+            for column in entry_columns.values():
+                connection.execute(f"CREATE INDEX IF NOT EXISTS entries_{column} ON entries ({column}, id)")
+            # Serves the common "one codec, sorted by how well it compressed" view
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_codec_ratio ON entries (output_codec, relative_size, id)")
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    @staticmethod
+    def _row_values(log_entry):
+        values = []
+        for key, column in entry_columns.items():
+            value = log_entry.get(key)
+            if column in numeric_columns and not isinstance(value, (int, float)):
+                value = None  # e.g. "Unknown" in old logs; NULL keeps numeric sorting and ranges correct
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _to_entry(row):
+        return {"id": row["id"], **{key: row[column] for key, column in entry_columns.items()}}
+
+    def import_legacy(self, json_path):
+        """
+        Imports the entries of a JSON log file written by earlier versions. Each file is only imported
+        once; the file itself is left in place.
+
+        Parameters:
+        - json_path (str): Path to the JSON log file.
+
+        Returns:
+        The number of entries imported, 0 if the file does not exist or was imported before.
+        """
+        try:
+            mtime = os.path.getmtime(json_path)
+        except OSError:
+            return 0
+        path = os.path.abspath(json_path)
+        connection = self._connect()
+        try:
+            if connection.execute("SELECT 1 FROM imports WHERE path = ?", (path,)).fetchone():
+                return 0
+            try:
+                with open(json_path, "r") as log_file:
+                    entries = json.load(log_file)
+            except (OSError, ValueError) as e:
+                print(f"Error reading legacy log {json_path}: {e}")
+                return 0
+            entries = [entry for entry in entries if isinstance(entry, dict)]
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                f"INSERT INTO entries ({', '.join(entry_columns.values())}, created) VALUES ({', '.join('?' * len(entry_columns))}, ?)",
+                (self._row_values(entry) + [now] for entry in entries))
+            connection.execute("INSERT INTO imports (path, mtime, entries) VALUES (?, ?, ?)", (path, mtime, len(entries)))
+            connection.execute("COMMIT")
+            return len(entries)
+        finally:
+            connection.close()
+
+    def append(self, log_entry):
+        """
+        Adds a log entry.
+
+        Parameters:
+        - log_entry (dict): An entry as returned by `VideoSettings.to_log_entry`.
+
+        Returns:
+        The id of the new entry.
+        """
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                f"INSERT INTO entries ({', '.join(entry_columns.values())}, created) VALUES ({', '.join('?' * len(entry_columns))}, ?)",
+                self._row_values(log_entry) + [time.time()])
+            return cursor.lastrowid
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _where(filters):
+        """
+        Builds the WHERE clause for a filters dictionary with the optional keys "directory" (prefix
+        match), "codec" (output codec), "min_ratio" and "max_ratio" (relative size range).
+        """
+        clauses, parameters = [], []
+        filters = filters or {}
+        if filters.get("directory"):
+            # A range rather than LIKE, so the directory index is used and case is respected
+            clauses.append("directory >= ? AND directory < ?")
+            parameters += [filters["directory"], filters["directory"] + "\uffff"]
+        if filters.get("codec"):
+            clauses.append("output_codec = ?")
+            parameters.append(filters["codec"])
+        if filters.get("min_ratio") not in (None, ""):
+            clauses.append("relative_size >= ?")
+            parameters.append(float(filters["min_ratio"]))
+        if filters.get("max_ratio") not in (None, ""):
+            clauses.append("relative_size <= ?")
+            parameters.append(float(filters["max_ratio"]))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), parameters
+
+    def count(self, filters=None):
+        """
+        Returns the number of entries matching the filters (see `page`).
+        """
+        where, parameters = self._where(filters)
+        connection = self._connect()
+        try:
+            return connection.execute(f"SELECT COUNT(*) FROM entries{where}", parameters).fetchone()[0]
+        finally:
+            connection.close()
+
+    def page(self, offset=0, limit=100, sort_key=None, descending=True, filters=None, after=None):
+        """
+        Returns a page of entries.
+
+        Skipping entries with `offset` makes SQLite step over every one of them, so pages after the
+        first should be read with `after` set to the last entry of the previous page. Reading with
+        the opposite `descending` and reversing the result pages backwards, e.g. from the end.
+
+        Parameters:
+        - offset (int): Number of matching entries to skip. Ignored when `after` is given.
+        - limit (int): Maximum number of entries to return.
+        - sort_key (str): Log entry key to sort by, e.g. "Relative Size". Defaults to insertion order.
+        - descending (bool): Whether to sort in descending order, newest first by default.
+        - filters (dict): Optional "directory", "codec", "min_ratio" and "max_ratio" values.
+        - after (dict): An entry returned by an earlier call; the page starts right after it.
+
+        Returns:
+        A list of log entry dictionaries, each with an extra "id" key.
+
+        Raises:
+        - ValueError: If the sort key is not a log entry key, or a ratio is not a number
+        """
+        if sort_key is not None and sort_key not in entry_columns:
+            raise ValueError(f"Cannot sort the log by '{sort_key}'")
+        order = "DESC" if descending else "ASC"
+        order_by = f"{entry_columns[sort_key]} {order}, id {order}" if sort_key else f"id {order}"
+        where, parameters = self._where(filters)
+        if after is None:
+            segments, offset = [("", [])], int(offset)
+        else:
+            segments, offset = self._after(entry_columns.get(sort_key), descending, after), 0
+        rows = []
+        connection = self._connect()
+        try:
+            for clause, clause_parameters in segments:
+                condition = (where + " AND " if where else " WHERE ") + clause if clause else where
+                rows += connection.execute(f"SELECT * FROM entries{condition} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                                           parameters + clause_parameters + [int(limit) - len(rows), offset]).fetchall()
+                if len(rows) >= limit:
+                    break
+            return [self._to_entry(row) for row in rows]
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _after(column, descending, entry):
+        """
+        Returns the conditions that select the entries sorted after `entry`, as (clause, parameters)
+        pairs that are queried in turn. SQLite sorts NULL before every value, and a row value
+        comparison with NULL matches nothing, so the NULL entries are read by a separate condition.
+        Each condition is a range on the sort column's index.
+        """
+        if column is None:
+            return [(f"id {'<' if descending else '>'} ?", [entry["id"]])]
+        value = next(entry[key] for key, name in entry_columns.items() if name == column)
+        if descending:
+            if value is None:
+                return [(f"{column} IS NULL AND id < ?", [entry["id"]])]
+            return [(f"({column}, id) < (?, ?)", [value, entry["id"]]), (f"{column} IS NULL", [])]
+        if value is None:
+            return [(f"{column} IS NULL AND id > ?", [entry["id"]]), (f"{column} IS NOT NULL", [])]
+        return [(f"({column}, id) > (?, ?)", [value, entry["id"]])]
+
+    def distinct(self, key):
+        """
+        Returns the sorted distinct values of a log entry key, e.g. "Output Codec".
+        """
+        column = entry_columns[key]
+        connection = self._connect()
+        try:
+            rows = connection.execute(f"SELECT DISTINCT {column} FROM entries WHERE {column} IS NOT NULL ORDER BY {column}")
+            return [row[0] for row in rows]
+        finally:
+            connection.close()
+
+    def clear(self):
+        """
+        Removes every entry. Imported legacy files stay marked as imported.
+        """
+        connection = self._connect()
+        try:
+            connection.execute("DELETE FROM entries")
+        finally:
+            connection.close()
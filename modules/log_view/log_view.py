@@ -0,0 +1,246 @@
+# log_view.py
+import os
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+class PagedLogView:
+    """
+    A virtualized view of the conversion log. The treeview only ever holds the rows that are visible;
+    the scrollbar is driven by the number of matching entries in the LogStore, and rows are fetched
+    a page at a time as the user scrolls. Clicking a column heading sorts by that column, and the
+    filter bar narrows the log by directory, output codec and relative size through indexed queries.
+
+    Methods:
+    - refresh(): Recounts the matching entries and redraws the visible rows.
+    - entry_added(): Updates the view after an entry was appended to the store.
+    - apply_filters(): Reads the filter bar and shows the matching entries.
+    - show_thumbnails(enabled): Shows or hides each entry's poster frame in the first column.
+    """
+    max_cached_pages = 8
+    thumbnail_width = 64
+
+    def __init__(self, parent, store, columns_config, visible_rows=15, page_size=200, thumbnail_for=None):
+        """
+        Parameters:
+        - parent: The Tk widget the view is placed in.
+        - store: The LogStore to show.
+        - columns_config (list): Column dictionaries with "name", "width" and "alignment" keys, as in
+                                 gui_config.json.
+        - visible_rows (int): Number of rows shown at once.
+        - page_size (int): Number of entries fetched from the store per query.
+        - thumbnail_for: Function called with an entry that returns the path of its poster frame
+                         PNG, or None. Used while thumbnails are shown.
+        """
+        self.store = store
+        self.visible_rows = visible_rows
+        self.page_size = page_size
+        self.column_names = [column["name"] for column in columns_config]
+        self.total = 0
+        self.top = 0
+        self.sort_key = None  # None shows the newest entries first
+        self.descending = True
+        self.filters = {}
+        self.pages = OrderedDict()
+        self.thumbnail_for = thumbnail_for
+        self.thumbnails_shown = False
+        self.images = OrderedDict()  # Scaled posters of recently shown rows; Tk drops images nobody references
+
+        self.filter_frame = ttk.Frame(parent)
+        self.directory_var = tk.StringVar()
+        self.codec_var = tk.StringVar()
+        self.min_ratio_var = tk.StringVar()
+        self.max_ratio_var = tk.StringVar()
+        ttk.Label(self.filter_frame, text="Directory:").pack(side="left")
+        directory_entry = ttk.Entry(self.filter_frame, textvariable=self.directory_var, width=20)
+        directory_entry.pack(side="left", padx=(2, 8))
+        ttk.Label(self.filter_frame, text="Codec:").pack(side="left")
+        self.codec_filter = ttk.Combobox(self.filter_frame, textvariable=self.codec_var, width=7,
+                                         postcommand=self.update_codec_choices)
+        self.codec_filter.pack(side="left", padx=(2, 8))
+        ttk.Label(self.filter_frame, text="Relative Size:").pack(side="left")
+        min_ratio_entry = ttk.Entry(self.filter_frame, textvariable=self.min_ratio_var, width=5)
+        min_ratio_entry.pack(side="left", padx=2)
+        ttk.Label(self.filter_frame, text="to").pack(side="left")
+        max_ratio_entry = ttk.Entry(self.filter_frame, textvariable=self.max_ratio_var, width=5)
+        max_ratio_entry.pack(side="left", padx=2)
+        ttk.Button(self.filter_frame, text="Filter", command=self.apply_filters, width=6).pack(side="left", padx=(8, 0))
+        for widget in (directory_entry, self.codec_filter, min_ratio_entry, max_ratio_entry):
+            widget.bind("<Return>", lambda event: self.apply_filters())
+        self.codec_filter.bind("<<ComboboxSelected>>", lambda event: self.apply_filters())
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=self.column_names, show="headings", height=visible_rows)
+        self.tree.column("#0", width=self.thumbnail_width + 8, stretch=False)
+        for column in columns_config:
+            self.tree.heading(column["name"], text=column["name"], command=lambda name=column["name"]: self.sort_by(name))
+            self.tree.column(column["name"], width=column["width"], anchor=column["alignment"])
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.top - 3))  # X11 wheel up
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.top + 3))  # X11 wheel down
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.top - self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.top + self.visible_rows))
+
+    def refresh(self):
+        """
+        Recounts the matching entries, drops the cached pages and redraws the visible rows.
+        """
+        self.pages.clear()
+        self.total = self.store.count(self.filters)
+        self.scroll_to(self.top)
+
+    def show_thumbnails(self, enabled):
+        """
+        Shows or hides the poster frames. Rows are made tall enough for a 16:9 poster while shown.
+        """
+        self.thumbnails_shown = bool(enabled and self.thumbnail_for)
+        style = ttk.Style(self.tree)
+        if self.thumbnails_shown:
+            style.configure("Thumbnails.Treeview", rowheight=self.thumbnail_width * 9 // 16 + 4)
+            self.tree.config(show="tree headings", style="Thumbnails.Treeview")
+        else:
+            self.tree.config(show="headings", style="Treeview")
+            self.images.clear()
+        self.scroll_to(self.top)
+
+    def thumbnail(self, entry):
+        """
+        Returns the scaled poster frame of an entry as a PhotoImage, or an empty string if it has none.
+        """
+        path = self.thumbnail_for(entry)
+        if not path:
+            return ""
+        try:
+            key = (path, os.path.getmtime(path))  # A converted-again file gets a new poster
+        except OSError:
+            return ""
+        if key in self.images:
+            self.images.move_to_end(key)
+            return self.images[key]
+        try:
+            image = tk.PhotoImage(file=path)
+        except tk.TclError:
+            return ""
+        factor = max(1, -(-image.width() // self.thumbnail_width))  # Round up so the poster fits the column
+        if factor > 1:
+            image = image.subsample(factor)
+        self.images[key] = image
+        if len(self.images) > 4 * self.visible_rows:
+            self.images.popitem(last=False)
+        return image
+
+    def entry_added(self):
+        """
+        Updates the view after an entry was appended. Only the count changes and, if the new entry
+        can be on screen, the first page is fetched again, so this stays cheap however long the log is.
+        """
+        if self.filters:
+            self.total = self.store.count(self.filters)
+        else:
+            self.total += 1
+        self.pages.clear()
+        self.scroll_to(self.top)
+
+    def apply_filters(self):
+        """
+        Reads the filter bar and shows the matching entries from the top. Relative size bounds that
+        are not numbers are ignored.
+        """
+        filters = {"directory": self.directory_var.get().strip(), "codec": self.codec_var.get().strip()}
+        for key, var in (("min_ratio", self.min_ratio_var), ("max_ratio", self.max_ratio_var)):
+            try:
+                filters[key] = float(var.get())
+            except ValueError:
+                if var.get().strip():
+                    self.tree.bell()
+        self.filters = {key: value for key, value in filters.items() if value not in ("", None)}
+        self.top = 0
+        self.refresh()
+
+    def update_codec_choices(self):
+        self.codec_filter.config(values=[""] + self.store.distinct("Output Codec"))
+
+    def sort_by(self, column_name):
+        """
+        Sorts by a column, toggling the direction when the column is already the sort column.
+        """
+        if self.sort_key == column_name:
+            self.descending = not self.descending
+        else:
+            self.sort_key, self.descending = column_name, False
+        for name in self.column_names:
+            arrow = (" ▼" if self.descending else " ▲") if name == self.sort_key else ""
+            self.tree.heading(name, text=name + arrow)
+        self.top = 0
+        self.refresh()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.top + int(amount) * step)
+
+    def on_mouse_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self.top - 3 * notches)
+
+    def scroll_to(self, top):
+        """
+        Shows the rows starting at position `top` of the matching entries.
+        """
+        self.top = max(0, min(top, self.total - self.visible_rows))
+        rows = self.rows(self.top, self.visible_rows)
+        self.tree.delete(*self.tree.get_children())
+        for entry in rows:
+            self.tree.insert("", tk.END, iid=str(entry["id"]), image=self.thumbnail(entry) if self.thumbnails_shown else "",
+                             values=tuple("Unknown" if entry.get(name) is None else entry[name] for name in self.column_names))
+        if self.total > self.visible_rows:
+            self.scrollbar.set(self.top / self.total, (self.top + len(rows)) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def rows(self, start, count):
+        """
+        Returns `count` entries starting at position `start`, fetching the pages that are not cached.
+        """
+        rows = []
+        position = start
+        while position < min(start + count, self.total):
+            index = position // self.page_size
+            page = self.page(index)
+            if not page:
+                break
+            offset = position - index * self.page_size
+            rows.extend(page[offset:offset + start + count - position])
+            position = (index + 1) * self.page_size
+        return rows[:count]
+
+    def page(self, index):
+        """
+        Returns page `index`. Next to a cached page it continues from that page's first or last entry
+        (keyset paging), so scrolling stays cheap deep into the log. Otherwise it counts from whichever
+        end of the log is nearer, which makes jumping to the end as cheap as showing the start.
+        """
+        if index in self.pages:
+            self.pages.move_to_end(index)
+            return self.pages[index]
+        start = index * self.page_size
+        size = max(0, min(self.page_size, self.total - start))
+        if self.pages.get(index - 1):
+            page = self.store.page(0, self.page_size, self.sort_key, self.descending, self.filters, after=self.pages[index - 1][-1])
+        elif self.pages.get(index + 1):
+            page = self.store.page(0, self.page_size, self.sort_key, not self.descending, self.filters, after=self.pages[index + 1][0])[::-1]
+        elif start <= self.total - start - size:
+            page = self.store.page(start, self.page_size, self.sort_key, self.descending, self.filters)
+        else:
+            page = self.store.page(self.total - start - size, size, self.sort_key, not self.descending, self.filters)[::-1]
+        self.pages[index] = page
+        if len(self.pages) > self.max_cached_pages:
+            self.pages.popitem(last=False)
+        return page
@@ -0,0 +1,226 @@
+# packet_index.py
+import os
+import sys
+import json
+import bisect
+import hashlib
+import tempfile
+import subprocess
+from array import array
+
+class PacketIndex:
+    """
+    The presentation timestamps and keyframes of a video stream, read from packet headers only, so
+    building it costs a fraction of a decode. Timestamps are in seconds from the first frame, which is
+    how ffmpeg's -ss and -to count, and are kept in a compact array('d') sorted in presentation order.
+
+    Attributes:
+    - timestamps (array): Presentation time of every frame, in seconds from the first frame.
+    - keyframes (array): Indices into `timestamps` of the keyframes.
+    - start_time (float): Presentation time of the first frame in the stream's own timeline.
+
+    Methods:
+    - probe(ffprobe_path, file_path): Builds the index with ffprobe.
+    - frame_count: The exact number of frames.
+    - end_time: Time just after the last frame is shown.
+    - frame_at(seconds): Index of the frame shown at a time.
+    - frames_between(start, stop): Number of frames shown between two times.
+    - keyframe_before(seconds): Time of the last keyframe at or before a time.
+    - keyframe_times(): Times of all keyframes.
+    - save(path) and load(path): Store the index in the compact cache format.
+    """
+    def __init__(self, timestamps=None, keyframes=None, start_time=0.0):
+        self.timestamps = timestamps if timestamps is not None else array("d")
+        self.keyframes = keyframes if keyframes is not None else array("q")
+        self.start_time = start_time
+
+    @classmethod
+    def probe(cls, ffprobe_path, file_path):
+        """
+        Reads the packet headers of the first video stream with ffprobe.
+
+        Parameters:
+        - ffprobe_path: Path to the ffprobe executable
+        - file_path: The video file
+
+        Returns:
+        The PacketIndex.
+
+        Raises:
+        - OSError: If ffprobe cannot be run
+        - subprocess.CalledProcessError: If ffprobe fails
+        """
+        cmd = [str(ffprobe_path), "-v", "error", "-select_streams", "v:0",
+               "-show_entries", "packet=pts_time,dts_time,flags", "-of", "csv=p=0", str(file_path)]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        packets = []
+        for line in result.stdout.splitlines():
+            fields = line.strip().split(",")
+            if len(fields) < 2:
+                continue
+            # Packets come in decode order; streams without B-frames may lack a pts, so fall back to the dts
+            time_field = fields[0] if fields[0] not in ("", "N/A") else fields[1]
+            try:
+                packets.append((float(time_field), "K" in fields[-1]))
+            except ValueError:
+                continue
+
+        packets.sort()
+        start_time = packets[0][0] if packets else 0.0
+        timestamps = array("d", (time - start_time for time, _ in packets))
+        keyframes = array("q", (index for index, (_, keyframe) in enumerate(packets) if keyframe))
+        return cls(timestamps, keyframes, start_time)
+
+    @property
+    def frame_count(self):
+        return len(self.timestamps)
+
+    @property
+    def end_time(self):
+        """
+        The time just after the last frame is shown, assuming it lasts as long as the one before it.
+        """
+        if len(self.timestamps) < 2:
+            return self.timestamps[0] if self.timestamps else 0.0
+        return 2 * self.timestamps[-1] - self.timestamps[-2]
+
+    def frame_at(self, seconds):
+        """
+        Returns the index of the frame shown at `seconds`, or 0 before the first frame.
+        """
+        return max(0, bisect.bisect_right(self.timestamps, seconds) - 1)
+
+    def frames_between(self, start=0.0, stop=None):
+        """
+        Returns the number of frames with a timestamp in [start, stop). A stop of None or a negative
+        stop means the end of the stream.
+        """
+        first = bisect.bisect_left(self.timestamps, start)
+        last = len(self.timestamps) if stop is None or stop < 0 else bisect.bisect_left(self.timestamps, stop)
+        return max(0, last - first)
+
+    def keyframe_before(self, seconds):
+        """
+        Returns the time of the last keyframe at or before `seconds`, where a stream copy can start
+        without re-encoding. Returns 0.0 if there is no keyframe that early.
+        """
+        position = bisect.bisect_right(self.keyframes, self.frame_at(seconds)) - 1
+        return self.timestamps[self.keyframes[position]] if position >= 0 else 0.0
+
+    def keyframe_times(self):
+        return [self.timestamps[index] for index in self.keyframes]
+
+    def save(self, path, identity=None):
+        """
+        Writes the index as a JSON header line followed by the raw arrays.
+
+        Parameters:
+        - path (str): The file to write. It is replaced atomically.
+        - identity (dict): Values stored in the header to validate the cache entry later.
+        """
+        header = {
+            **(identity or {}),
+            "start_time": self.start_time,
+            "frames": len(self.timestamps),
+            "keyframes": len(self.keyframes),
+            "byteorder": sys.byteorder,
+        }
+        directory = os.path.dirname(path) or "."
+        handle, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as index_file:
+                index_file.write(json.dumps(header).encode() + b"\n")
+                self.timestamps.tofile(index_file)
+                self.keyframes.tofile(index_file)
+            os.replace(temporary_path, path)
+        except OSError:
+            os.remove(temporary_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index written by `save`.
+
+        Returns:
+        A tuple of the PacketIndex and its header dictionary.
+
+        Raises:
+        - OSError: If the file cannot be read
+        - ValueError: If the file is damaged
+        """
+        with open(path, "rb") as index_file:
+            header = json.loads(index_file.readline())
+            timestamps, keyframes = array("d"), array("q")
+            try:
+                timestamps.fromfile(index_file, header["frames"])
+                keyframes.fromfile(index_file, header["keyframes"])
+            except EOFError as e:
+                raise ValueError(f"Truncated packet index {path}") from e
+        if header.get("byteorder") != sys.byteorder:
+            timestamps.byteswap()
+            keyframes.byteswap()
+        return cls(timestamps, keyframes, header.get("start_time", 0.0)), header
+
+
+class PacketIndexCache:
+    """
+    Keeps packet indexes in the metadata cache, keyed by the file's path, size and modification time,
+    so each file is only indexed once.
+
+    Methods:
+    - get(ffprobe_path, file_path): Returns the cached index, building it if needed.
+    """
+    def __init__(self, cache_folder="cache", max_entries=500):
+        """
+        Parameters:
+        - cache_folder (str): The application cache directory. Indexes are kept in a "packet_index"
+                              subdirectory.
+        - max_entries (int): How many indexes to keep before the least recently used are removed.
+        """
+        self.cache_folder = os.path.join(cache_folder, "packet_index")
+        self.max_entries = max_entries
+
+    def get(self, ffprobe_path, file_path):
+        """
+        Returns the packet index of a file, from the cache if the file has not changed.
+
+        Returns:
+        The PacketIndex, or None if the file cannot be read or ffprobe fails.
+        """
+        file_path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        identity = {"file_path": file_path, "size": stat.st_size, "mtime": stat.st_mtime}
+        cache_path = os.path.join(self.cache_folder, hashlib.sha1(file_path.encode()).hexdigest() + ".idx")
+
+        try:
+            index, header = PacketIndex.load(cache_path)
+            if all(header.get(key) == value for key, value in identity.items()):
+                os.utime(cache_path)  # Mark as recently used so pruning keeps it
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            index = PacketIndex.probe(ffprobe_path, file_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error indexing packets of {file_path}: {e}")
+            return None
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            index.save(cache_path, identity)
+            self._prune()
+        except OSError as e:
+            print(f"Error writing packet index cache: {e}")
+        return index
+
+    def _prune(self):
+        entries = [os.path.join(self.cache_folder, name) for name in os.listdir(self.cache_folder) if name.endswith(".idx")]
+        for path in sorted(entries, key=os.path.getmtime, reverse=True)[self.max_entries:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,115 @@
+# passlog.py
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+# The target bitrate only matters to the second pass, so it is left out of the first pass cache key
+bitrate_flags = ("-b:v",)
+
+class PassLogStore:
+    """
+    Manages the statistics files written by the first pass of a two-pass encode.
+
+    Every job gets its own temporary directory, so concurrent two-pass jobs never share a pass log.
+    Finished first-pass statistics are copied into a cache keyed by the source file and everything
+    that changes what the encoder sees or decides (encoder options, filters, trim), so re-encoding the
+    same source at another bitrate can skip the analysis pass.
+
+    Methods:
+    - create_job_directory(): Creates a private working directory for one job.
+    - cache_key(video_settings, command): Returns the cache key for a first pass.
+    - restore(key, job_directory): Copies cached statistics into a job directory.
+    - store(key, job_directory): Caches the statistics written to a job directory.
+    - remove_job_directory(job_directory): Deletes a job directory.
+    """
+    prefix = "passlog"
+
+    def __init__(self, cache_folder="cache", max_entries=20):
+        """
+        Parameters:
+        - cache_folder (str): The application cache directory. Pass logs are kept in a "passlogs"
+                              subdirectory.
+        - max_entries (int): How many cached first passes to keep before the oldest are removed.
+        """
+        self.cache_folder = os.path.join(cache_folder, "passlogs")
+        self.max_entries = max_entries
+
+    def create_job_directory(self):
+        return tempfile.mkdtemp(prefix="videoConversion_pass_")
+
+    def remove_job_directory(self, job_directory):
+        shutil.rmtree(job_directory, ignore_errors=True)
+
+    def cache_key(self, video_settings, command):
+        """
+        Builds a key that identifies a first pass independent of the target bitrate. Every other
+        output option (preset, pixel format, encoder parameters, GOP length, ...) is part of the key,
+        as the statistics depend on the frame type decisions those options lead to.
+
+        Parameters:
+        - video_settings: A settings object containing video-related configurations
+        - command: The first pass FFmpegCommand
+
+        Returns:
+        A hex digest string, or None if the source file cannot be read.
+        """
+        try:
+            stat = os.stat(video_settings.file_path)
+        except OSError:
+            return None
+        identity = {
+            "file_path": os.path.abspath(video_settings.file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "output_options": {flag: value for flag, value in command.output_options.items() if flag not in bitrate_flags},
+            "filters": command.filters.render(),
+            "input_options": command.input_options,
+        }
+        return hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+
+    def restore(self, key, job_directory):
+        """
+        Copies cached first-pass statistics into a job directory.
+
+        Returns:
+        True if statistics were restored and the first pass can be skipped.
+        """
+        cached_directory = os.path.join(self.cache_folder, key or "")
+        if not key or not os.path.isdir(cached_directory):
+            return False
+        for name in os.listdir(cached_directory):
+            shutil.copy2(os.path.join(cached_directory, name), job_directory)
+        os.utime(cached_directory)  # Mark as recently used so pruning keeps it
+        return True
+
+    def store(self, key, job_directory):
+        """
+        Caches the statistics files a first pass wrote into a job directory.
+        """
+        if not key:
+            return
+        stats_files = [name for name in os.listdir(job_directory) if name.startswith(self.prefix)]
+        if not stats_files:
+            return
+        cached_directory = os.path.join(self.cache_folder, key)
+        # Copy into a temporary sibling first so a concurrent restore never sees half the files
+        staging_directory = tempfile.mkdtemp(prefix=f"{key}_", dir=self._ensure_cache_folder())
+        for name in stats_files:
+            shutil.copy2(os.path.join(job_directory, name), staging_directory)
+        try:
+            os.replace(staging_directory, cached_directory)
+        except OSError:
+            shutil.rmtree(staging_directory, ignore_errors=True)  # Another job cached it first
+        self._prune()
+
+    def _ensure_cache_folder(self):
+        os.makedirs(self.cache_folder, exist_ok=True)
+        return self.cache_folder
+
+    def _prune(self):
+        entries = [os.path.join(self.cache_folder, name) for name in os.listdir(self.cache_folder)]
+        entries = sorted((path for path in entries if os.path.isdir(path)), key=os.path.getmtime, reverse=True)
+        for path in entries[self.max_entries:]:
+            shutil.rmtree(path, ignore_errors=True)
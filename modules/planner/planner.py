@@ -0,0 +1,293 @@
+# planner.py
+import os
+import copy
+import json
+import statistics
+from modules.command_builder.command_builder import FFmpegCommand, apply_filter_settings, output_path_for, select_encoder
+from modules.storage.storage import estimate_output_size
+
+# What happens to each file of a batch
+actions = ("encode", "copy", "skip_same_codec", "skip_existing", "skip_unreadable", "conflict")
+# How a conflict (an existing output, or two inputs with the same output) can be resolved
+conflict_resolutions = ("overwrite", "skip", "rename")
+# How each action is shown in the plan
+action_labels = {
+    "encode": "Encode",
+    "copy": "Copy (trim only)",
+    "skip_same_codec": "Skip (same codec)",
+    "skip_existing": "Skip",
+    "skip_unreadable": "Skip (unreadable)",
+    "conflict": "Conflict",
+}
+
+class PlanItem:
+    """
+    The planned action for one input file.
+
+    Attributes:
+    - file_path (str): The input file.
+    - action (str): One of `actions`.
+    - output_path (str): Where the output will be written.
+    - reason (str): Why the file is skipped or in conflict, for display.
+    - input_codec (str): The probed input codec.
+    - input_size (int): The input size in bytes.
+    - total_frames (int): Frames in the input, corrected by the packet index if it is enabled.
+    - expected_frames (int): Frames the job will write.
+    - estimated_seconds (float): Estimated run time, or None without historical throughput.
+    - estimated_size (int): Estimated output size in bytes.
+    - copy_start (float): For copies, the keyframe time the copy starts at, or None.
+    - copy_action (str): The action a conflict turns into when it is overwritten or renamed.
+    """
+    def __init__(self, file_path, action, output_path, reason=""):
+        self.file_path = file_path
+        self.action = action
+        self.output_path = output_path
+        self.reason = reason
+        self.input_codec = ""
+        self.input_size = 0
+        self.total_frames = 0
+        self.expected_frames = 0
+        self.estimated_seconds = None
+        self.estimated_size = 0
+        self.copy_start = None
+        self.copy_action = "encode"
+
+    @property
+    def runs(self):
+        return self.action in ("encode", "copy")
+
+
+class ThroughputHistory:
+    """
+    The encode speed achieved by earlier jobs, read from the JSON lines metrics file written by
+    Instrumentation. Only the end of the file is read, so recent jobs on this machine count and a
+    long history costs nothing extra.
+
+    Methods:
+    - fps(encoder): Median frames per second of successful jobs with an encoder.
+    """
+    def __init__(self, metrics_path, max_bytes=4 * 1024 * 1024):
+        """
+        Parameters:
+        - metrics_path (str): Path to the metrics JSON lines file.
+        - max_bytes (int): How much of the end of the file to read.
+        """
+        self.samples = {}
+        try:
+            with open(metrics_path, "rb") as metrics_file:
+                metrics_file.seek(0, os.SEEK_END)
+                size = metrics_file.tell()
+                metrics_file.seek(max(0, size - max_bytes))
+                if size > max_bytes:
+                    metrics_file.readline()  # Skip the partial first line
+                for line in metrics_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("stage") == "encode" and record.get("returncode") == 0 and record.get("fps"):
+                        self.samples.setdefault(record.get("encoder"), []).append(record["fps"])
+        except OSError:
+            pass
+
+    def fps(self, encoder):
+        samples = self.samples.get(encoder)
+        return statistics.median(samples[-50:]) if samples else None
+
+
+def unique_output_path(output_path, taken):
+    """
+    Returns `output_path`, or the first of `<name>_1<ext>`, `<name>_2<ext>`, ... that neither exists
+    nor is in `taken`.
+    """
+    base, ext = os.path.splitext(output_path)
+    candidate, number = output_path, 0
+    while os.path.exists(candidate) or candidate in taken:
+        number += 1
+        candidate = f"{base}_{number}{ext}"
+    return candidate
+
+
+def needs_filters(video_settings, overwrite_fps=False):
+    """
+    Returns whether the job changes the picture (scaling, cropping, a forced frame rate), which a
+    stream copy cannot do.
+    """
+    command = FFmpegCommand("ffmpeg")
+    apply_filter_settings(command, video_settings)
+    return overwrite_fps or bool(command.filters)
+
+
+def plan_file(processor, video_settings, overwrite_file=False, use_start_stop=False, overwrite_fps=False, history=None, taken=()):
+    """
+    Decides what to do with one probed input file (see VideoProcessor.probe_input).
+
+    - skip_same_codec: The input already has the output codec and no trim is requested.
+    - copy: The input already has the output codec and is only trimmed, so the streams are copied.
+    - conflict: The output already exists, or another file in the batch has the same output path.
+    - encode: Everything else.
+
+    With `overwrite_file`, existing outputs are overwritten and same-codec inputs are re-encoded.
+
+    Parameters:
+    - processor: The VideoProcessor, used for frame counts and the packet index
+    - video_settings: A settings object with the probed input information and the job settings
+    - overwrite_file, use_start_stop, overwrite_fps: The job options
+    - history: Optional ThroughputHistory used to estimate the run time
+    - taken: Output paths already claimed by earlier files of the batch
+
+    Returns:
+    The PlanItem.
+    """
+    output_ext = processor.map_codec(video_settings.output_codec, video_settings.output_ext_map)
+    output_path = output_path_for(video_settings.file_path, output_ext)
+    item = PlanItem(video_settings.file_path, "encode", output_path)
+    item.input_codec, item.input_size = video_settings.input_codec, video_settings.input_size
+
+    if video_settings.input_codec == video_settings.output_codec and not overwrite_file:
+        if not use_start_stop:
+            item.action, item.reason = "skip_same_codec", f"already {video_settings.output_codec}"
+            return item
+        if not needs_filters(video_settings, overwrite_fps):
+            item.action = item.copy_action = "copy"
+
+    if overwrite_fps and item.action == "encode":
+        video_settings.output_frame_rate = video_settings.input_frame_rate
+    index = processor.count_expected_frames(video_settings, use_start_stop, overwrite_fps and item.action == "encode")
+    item.total_frames, item.expected_frames = video_settings.total_frames, video_settings.expected_frames
+    if item.action == "copy":
+        start = float(video_settings.start_time or 0)
+        item.copy_start = index.keyframe_before(start) if index else None
+        item.estimated_size = int(item.input_size * min(1.0, item.expected_frames / max(video_settings.total_frames, 1)))
+    else:
+        item.estimated_size = estimate_output_size(video_settings, use_start_stop)
+
+    encoder = "copy" if item.action == "copy" else None
+    if encoder is None:
+        try:
+            entry = select_encoder(video_settings.output_codec, processor.capabilities)
+            encoder = entry["encoder"] if entry else None
+        except ValueError:
+            encoder = None
+    fps = history.fps(encoder) if history and encoder else None
+    if fps:
+        item.estimated_seconds = item.expected_frames / fps
+
+    if output_path in taken:
+        item.action, item.reason = "conflict", "another file in the batch has the same output"
+    elif os.path.exists(output_path) and not overwrite_file:
+        item.action, item.reason = "conflict", "output exists"
+    return item
+
+
+def apply_plan(item, video_settings, overwrite_fps=False):
+    """
+    Sets the frame counts and output frame rate a planned file runs with on its settings, so a file
+    planned on a copy of the settings (see plan_batch) can be converted without planning it again.
+    """
+    video_settings.total_frames, video_settings.expected_frames = item.total_frames, item.expected_frames
+    if overwrite_fps and item.action == "encode":
+        video_settings.output_frame_rate = video_settings.input_frame_rate
+
+
+def plan_batch(processor, file_paths, video_settings, overwrite_file=False, use_start_stop=False, overwrite_fps=False, on_progress=None):
+    """
+    Plans a batch: probes every file once (the probes are cached for the conversion) and decides its
+    action, output path, estimated run time and estimated output size.
+
+    Parameters:
+    - processor: The VideoProcessor
+    - file_paths: The selected input files
+    - video_settings: The job settings. Each file is planned on a copy, so this is not modified.
+    - overwrite_file, use_start_stop, overwrite_fps: The job options
+    - on_progress: Optional function called with (files planned, total files)
+
+    Returns:
+    A list of PlanItems in input order.
+    """
+    history = ThroughputHistory(processor.instrumentation.jsonl_path)
+    plan = []
+    taken = set()
+    for number, file_path in enumerate(file_paths, 1):
+        file_settings = copy.copy(video_settings)
+        file_settings.file_path = file_path
+        if processor.probe_input(file_settings):
+            item = plan_file(processor, file_settings, overwrite_file, use_start_stop, overwrite_fps, history, taken)
+        else:
+            item = PlanItem(os.path.abspath(file_path), "skip_unreadable", "", "could not be probed")
+        if item.action != "skip_same_codec" and item.output_path:
+            taken.add(item.output_path)
+        plan.append(item)
+        if on_progress:
+            on_progress(number, len(file_paths))
+    return plan
+
+
+def resolve_conflicts(plan, resolution):
+    """
+    Resolves every conflict in a plan the same way.
+
+    Parameters:
+    - plan: A list of PlanItems
+    - resolution: "overwrite" to replace the existing output, "skip" to leave it, or "rename" to
+                  write to the next free `<name>_N` path instead
+
+    Raises:
+    - ValueError: If the resolution is unknown
+    """
+    if resolution not in conflict_resolutions:
+        raise ValueError(f"Unknown conflict resolution '{resolution}'")
+    taken = {item.output_path for item in plan if item.runs}
+    for item in plan:
+        if item.action != "conflict":
+            continue
+        if resolution == "skip":
+            item.action, item.reason = "skip_existing", "output exists"
+        elif resolution == "rename":
+            item.output_path = unique_output_path(item.output_path, taken)
+            item.action, item.reason = item.copy_action, ""
+        elif item.output_path in taken:
+            # Overwriting another output of the same batch would lose it, so that one is renamed
+            item.output_path = unique_output_path(item.output_path, taken)
+            item.action, item.reason = item.copy_action, ""
+        else:
+            item.action, item.reason = item.copy_action, ""
+        if item.runs:
+            taken.add(item.output_path)
+
+
+def format_seconds(seconds):
+    """
+    Formats an estimated run time as "1:02:03" or "2:03", or "?" if it is unknown.
+    """
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def format_size(size):
+    """
+    Formats a size in bytes as megabytes, or gigabytes from 10 GB.
+    """
+    if size >= 10 * 1024 ** 3:
+        return f"{size / 1024 ** 3:.1f} GB"
+    return f"{size / 1024 ** 2:.1f} MB"
+
+
+def summarise(plan):
+    """
+    Returns the number of files per action and the estimated total run time and output size of the
+    files that will run. The time only counts files with a throughput history.
+    """
+    counts = {action: 0 for action in actions}
+    for item in plan:
+        counts[item.action] += 1
+    running = [item for item in plan if item.runs]
+    return {
+        "counts": counts,
+        "estimated_seconds": sum(item.estimated_seconds or 0 for item in running),
+        "unestimated": sum(1 for item in running if item.estimated_seconds is None),
+        "estimated_size": sum(item.estimated_size for item in running),
+    }
@@ -3,12 +3,41 @@ import os
 import subprocess
 import json
 import re
-import tkinter as tk
-from tkinter import messagebox
+import threading
 from modules.settings.settings import Settings
+from modules.command_builder.command_builder import build_convert_command, build_copy_command, build_tiff_command, output_path_for, supports_two_pass
+from modules.passlog.passlog import PassLogStore
+from modules.storage.storage import OutputMover, SpaceReservations, estimate_output_size, has_free_space, scratch_output_path
+from modules.instrumentation.instrumentation import Instrumentation, wait_for_process
+from modules.input_stage.input_stage import ReadAhead, choose_input_mode, stage_copy
+from modules.packet_index.packet_index import PacketIndexCache
+from modules.thumbnails.thumbnails import ThumbnailCache
+from modules.planner.planner import apply_plan, plan_file, resolve_conflicts
 import tempfile
 
 progress_pattern = re.compile(r"frame=\s*(\d+)")
+fps_pattern = re.compile(r"fps=\s*([\d.]+)")
+read_ahead_chunk_size = 8 * 1024 * 1024
+
+
+def written_bytes(path):
+    """
+    Returns the size of a file, or the total size of the files in a directory, or 0 if it is missing.
+    """
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+def terminate_when_set(process, cancelled, poll_seconds=0.5):
+    """
+    Terminates a running ffmpeg process once `cancelled` is set. Returns when either happens.
+    """
+    while process.poll() is None:
+        if cancelled.wait(poll_seconds):
+            process.terminate()
+            return
+
 
 class VideoProcessor:
     """
@@ -16,13 +45,23 @@ class VideoProcessor:
 
     Methods:
     - get_video_info(file_path): Returns a dictionary containing information about the video file at the given path.
+    - probe_input(video_settings): Fills in the probed input information of a settings object.
     - map_codec(output_codec, codec_map): Maps the output codec to the corresponding ffmpeg codec.
     """    
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, settings=None):
+        self.settings = settings or Settings()
+        self.capabilities = None  # Set by the GUI once the ffmpeg capability probe has finished
+        self.pass_logs = PassLogStore(self.settings.cache_folder)
+        self.instrumentation = Instrumentation(self.settings.logs_folder)
+        self.output_mover = OutputMover(self.instrumentation)
+        self.space_reservations = SpaceReservations()
+        self.packet_indexes = PacketIndexCache(self.settings.cache_folder)
+        self.thumbnails = ThumbnailCache(self.settings.cache_folder)
+        self.probe_cache = {}  # (path, size, mtime) -> get_video_info result, so planning and converting probe once
     def get_video_info(self, file_path):
         """
-        Returns a dictionary containing information about the video file at the given path.
+        Returns a dictionary containing information about the video file at the given path. Results 
+        are cached until the file changes, so a file planned before a batch is only probed once.
 
         Parameters:
         - file_path: The path to the video file
@@ -33,22 +72,34 @@ class VideoProcessor:
         - input_size: The size of the input video file in bytes
         - total_frames: The total number of frames in the input video
         - frame_rate: The frame rate of the input video in frames per second
+        - width: The width of the input video in pixels
+        - height: The height of the input video in pixels
 
         Raises:
         - subprocess.CalledProcessError: If there's an error executing the ffprobe command
         """
+        try:
+            stat = os.stat(file_path)
+            cache_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime)
+        except OSError:
+            cache_key = None
+        if cache_key in self.probe_cache:
+            return self.probe_cache[cache_key]
+
         ffprobe_command = (
-            f'{self.settings.ffprobe_path} -v error -show_entries format:stream=codec_name,format:stream=codec_type,format:stream=r_frame_rate -of json "{file_path}"'
+            f'{self.settings.ffprobe_path} -v error -show_entries format:stream=codec_name,format:stream=codec_type,format:stream=r_frame_rate,format:stream=width,format:stream=height -of json "{file_path}"'
         )
 
         try:
-            result = subprocess.run(ffprobe_command, shell=True, capture_output=True, check=True)
+            with self.instrumentation.stage("probe", file=os.path.basename(file_path)):
+                result = subprocess.run(ffprobe_command, shell=True, capture_output=True, check=True)
             
             ffprobe_output = json.loads(result.stdout)
             if self.settings.debug:
                 print(ffprobe_output)
             input_codec = "Unknown"
             frame_rate = 1
+            width = height = 0
 
             if "streams" in ffprobe_output:
                 streams = ffprobe_output["streams"]
@@ -58,6 +109,8 @@ class VideoProcessor:
                         frame_rate_str = stream.get("r_frame_rate", "30/1")  # Default to 30 FPS
                         frame_rate_parts = frame_rate_str.split('/')
                         frame_rate = int(frame_rate_parts[0]) / int(frame_rate_parts[1]) if (frame_rate_parts[1]) != 0 else 1
+                        width = stream.get("width", 0)
+                        height = stream.get("height", 0)
             
             if "format" in ffprobe_output:
                 formats = ffprobe_output["format"]
@@ -67,7 +120,10 @@ class VideoProcessor:
 
             input_size = os.path.getsize(file_path)  # Get actual file size on disk
 
-            return input_codec, input_size, total_frames, frame_rate
+            info = input_codec, input_size, total_frames, frame_rate, width, height
+            if cache_key:
+                self.probe_cache[cache_key] = info
+            return info
         except subprocess.CalledProcessError as e:
             print(f"Error executing command: {e}")
             print(e.output.decode())  # print the actual output of the command for more information
@@ -88,13 +144,39 @@ class VideoProcessor:
         else:
             return codec
 
-    def convert_video(self,video_settings, app):
+    def probe_input(self, video_settings):
+        """
+        Probes `video_settings.file_path` and fills in the input codec, size, frame count, frame rate,
+        dimensions, directory and name.
+
+        Parameters:
+        - video_settings: A settings object with `file_path` set
+
+        Returns:
+        True, or False if the file could not be probed.
+        """
+        video_settings.file_path = os.path.abspath(video_settings.file_path)
+        video_settings.file_directory = os.path.dirname(video_settings.file_path)
+        video_settings.file_name = os.path.basename(video_settings.file_path)
+        info = self.get_video_info(video_settings.file_path)
+        if info is None:
+            return False
+        (video_settings.input_codec, video_settings.input_size, video_settings.total_frames,
+         video_settings.input_frame_rate, video_settings.input_width, video_settings.input_height) = info
+        video_settings.input_codec = self.map_codec(video_settings.input_codec, video_settings.codec_map)
+        return True
+
+    def convert_video(self,video_settings, app, plan_item=None):
         """
         Converts a video file to a different codec using ffmpeg.
 
         Parameters:
         - video_settings: A settings object containing video-related configurations
         - app: The main application or GUI object to update progress
+        - plan_item: The file's PlanItem from a batch plan (see planner.plan_batch), used as approved 
+                     there: its action, output path, frame counts and size estimate are not worked 
+                     out again. Without one the file is planned on its own and the user is asked 
+                     about an existing output.
 
         Returns:
         - "SKIPPED" if the input file is already in the desired output codec and overwrite_file is False
@@ -104,122 +186,328 @@ class VideoProcessor:
         - Exception: If there's an error during conversion
         """        
         # Gather input video information
-        video_settings.input_codec, video_settings.input_size, video_settings.total_frames, video_settings.input_frame_rate = self.get_video_info(video_settings.file_path)
-        video_settings.input_codec = self.map_codec(video_settings.input_codec, video_settings.codec_map)
-        video_settings.file_directory = os.path.dirname(video_settings.file_path)
-        video_settings.file_name = os.path.basename(video_settings.file_path)
-        base_name, ext = os.path.splitext(video_settings.file_name)
-    
-        # Create ouput video path path information
-        output_ext = self.map_codec(video_settings.output_codec,video_settings.output_ext_map)
-        video_settings.output_name = f"{base_name}_out{output_ext}"
-        video_settings.output_path = os.path.normpath(os.path.join(video_settings.file_directory, video_settings.output_name))
-        # Check if the input file codec matches the desired output codec
-        if (self.map_codec(video_settings.input_codec,video_settings.codec_map) == video_settings.output_codec) and not app.overwrite_file.get():  # Check if input codec matches selected codec
+        if not self.probe_input(video_settings):
+            app.status_var.set(f"Skipped conversion: could not read {video_settings.file_name}")
+            return "SKIPPED"
+
+        # Decide what to do with the file and where the output goes
+        use_start_stop = app.use_start_stop.get()
+        if plan_item is not None:
+            item = plan_item
+            apply_plan(item, video_settings, app.overwrite_fps.get())
+        else:
+            item = plan_file(self, video_settings, app.overwrite_file.get(), use_start_stop, app.overwrite_fps.get())
+            if item.action == "conflict":
+                resolve_conflicts([item], "overwrite" if app.ask_overwrite(os.path.basename(item.output_path)) else "skip")
+        video_settings.output_path = item.output_path
+        video_settings.output_name = os.path.basename(video_settings.output_path)
+        if item.action == "skip_same_codec":
             app.status_var.set(f"Input file is already in {video_settings.output_codec} format, skipping conversion")
             return "SKIPPED"
-        
-        # Check if a converted version of the output file exists
-        if os.path.exists(video_settings.output_path) and not app.overwrite_file.get():
-            response = messagebox.askyesno("File Exists", f"The output file '{video_settings.output_name}' already exists. Do you want to overwrite it?")
-            if not response:
-                app.status_var.set("Skipped conversion due to existing output file")
-                return "SKIPPED"
-        
-        # Check if we want to overwrite the frame rate
-        if app.overwrite_fps.get():
-            video_settings.output_frame_rate = video_settings.input_frame_rate
+        if not item.runs:
+            app.status_var.set("Skipped conversion due to existing output file")
+            return "SKIPPED"
+
+        # Make sure the output fits before starting, and write it to scratch storage if configured
+        encode_path = self.reserve_output(video_settings, app, use_start_stop, item.estimated_size)
+        if encode_path is None:
+            return "SKIPPED"
 
         # Create our FFMPEG function call
-        video_settings.ffmpeg_codec = self.map_codec(video_settings.output_codec,video_settings.ffmpeg_codec_map)
-        # Build the base command with common options
-        cmd = [
-            f'{self.settings.ffmpeg_path}',
-            "-y",
-            "-loglevel", "error", "-stats",
-        ]
-        if app.use_start_stop.get():
-            cmd.extend([
-                "-ss", video_settings.start_time
-            ])
-            if video_settings.stop_time != "-1":
-                cmd.extend([
-                "-to", video_settings.stop_time
-            ])
-        cmd.extend([
-            "-i", str(video_settings.file_path),
-        ])
-        if app.overwrite_fps.get():
-            cmd.extend(["-r", str(int(video_settings.output_frame_rate))])
-        # Check if video_settings.scale_width or video_settings.scale_height are not equal to one
-        if video_settings.scale_width != 1 or video_settings.scale_height != 1:
-            cmd.append("-vf")
-            cmd.append(
-                f"scale=iw*{video_settings.scale_width}:ih*{video_settings.scale_height}"
-            )
-        # Add codec-specific options based on output_codec
-        if video_settings.output_codec == "ffv1":
-            cmd.extend([
-                "-c:v", "ffv1",
-                "-level", "3", "-coder", "1", "-context", "1",
-            ])
-        elif video_settings.output_codec == "h264":
-            cmd.extend([
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", str(video_settings.crf),
-            ])
-        elif video_settings.output_codec == "h265":
-            cmd.extend([
-                "-c:v", "libx265",
-                "-preset", "medium",
-                "-crf", str(video_settings.crf),
-            ])
-        elif video_settings.output_codec == "rawvideo":
-            cmd.extend([
-                "-c:v", "rawvideo",
-                "-pix_fmt", "yuv420p",
-            ])
-            
-        
-        # Add common options for audio and output file
-        cmd.extend([
-            #"-c:a", "copy", # this sometimes causes an error during conversion... might just let ffmpeg determine the audio codec
-            video_settings.output_path,
-        ])
-
-        # Create a pipe to capture the output
-        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True)
-
-        # Update the progress and output in real-time
-        for line in process.stdout:
-            match = progress_pattern.search(line)
-            if self.settings.debug:
-                print(line)
-            if match:
-                frame_num = int(match.group(1))
-                progress = min(int((frame_num / video_settings.total_frames) * 100), 100)
-                app.progress_var.set(progress)
-                app.status_var.set("Converting: " + line.strip())  # Update status with FFmpeg output
-                app.current_file_label.config(text="Processing: " + video_settings.file_name)  # Update current file label
-                app.root.update_idletasks()  # Update the GUI
-
-        # Capture the error message if the process fails
-        _, stderr = process.communicate()
-
-        if process.returncode == 0:
+        build_options = {
+            "use_start_stop": use_start_stop,
+            "overwrite_fps": app.overwrite_fps.get(),
+            "capabilities": self.capabilities,
+            "output_path": encode_path,
+        }
+        # Thumbnails come from the same decode, so a stream copy (which does not decode) gets none
+        thumbnail_paths = None
+        if self.settings.thumbnails and item.action == "encode":
+            thumbnail_paths = build_options["thumbnail_paths"] = self.thumbnails.reserve(video_settings.file_path)
+        thumbnail_file = video_settings.file_path if thumbnail_paths else None
+        try:
+            if item.action == "copy":
+                # The input already has the output codec, so the trim is cut without re-encoding. A
+                # copy reads the input once from start to end, so it is not piped or staged.
+                two_pass, input_mode = False, "direct"
+                start_time = item.copy_start if item.copy_start is not None else video_settings.start_time
+                command = build_copy_command(self.settings.ffmpeg_path, video_settings, start_time, video_settings.stop_time, encode_path)
+            else:
+                two_pass = video_settings.rate_control == "two_pass" and supports_two_pass(video_settings.output_codec, self.capabilities)
+                input_mode = choose_input_mode(video_settings.file_path, self.settings.input_mode, two_pass)
+                if input_mode == "pipe":
+                    build_options["input_path"] = "pipe:0"
+                command = build_convert_command(self.settings.ffmpeg_path, video_settings, pass_number=2 if two_pass else None, **build_options)
+        except ValueError as e:
+            self.discard_output(encode_path, video_settings, thumbnail_file)
+            app.status_var.set(f"Skipped conversion: {e}")
+            return "SKIPPED"
+        video_settings.ffmpeg_codec = command.output_options.get("-c:v", "copy")
+
+        # Inputs on network storage are read with large sequential reads instead of ffmpeg's small ones
+        staged_path = self.stage_input(video_settings, app) if input_mode == "stage" else None
+        if staged_path:
+            command.input_path = build_options["input_path"] = staged_path
+        cmd = command.build()
+
+        try:
+            if two_pass:
+                returncode, error = self.run_two_pass(video_settings, app, build_options)
+            else:
+                returncode, error = self.run_ffmpeg(cmd, video_settings, app, stdin_path=video_settings.file_path if input_mode == "pipe" else None,
+                                                    output_path=encode_path)
+        except Exception:
+            self.discard_output(encode_path, video_settings, thumbnail_file)
+            raise
+        finally:
+            if staged_path:
+                os.remove(staged_path)
+
+        if returncode == 0:
             app.status_var.set("Conversion complete")
             app.open_output_button.config(state="normal")  # Enable "Open Output Directory" button
-            video_settings.output_size = os.path.getsize(video_settings.output_path)
+            video_settings.output_size = os.path.getsize(encode_path)
             video_settings.relative_size = round(video_settings.output_size/video_settings.input_size,3)
+            self.finish_output(encode_path, video_settings)
 
         else:
+            self.discard_output(encode_path, video_settings, thumbnail_file)
             video_settings.cmd = ' '.join(cmd)
-            video_settings.error = stderr
-            app.status_var.set(f"Conversion failed: {stderr}")
+            video_settings.error = error
+            app.status_var.set(f"Conversion failed: {error}")
 
         app.root.after(100, lambda: app.root.update())  # Update the GUI every 200 ms
         app.progress_var.set(100)
+
+    def count_expected_frames(self, video_settings, use_start_stop=False, overwrite_fps=False):
+        """
+        Sets `video_settings.expected_frames`, the number of frames ffmpeg will write, which the 
+        progress bar counts towards. With the packet index enabled, the input's exact frame count and 
+        timestamps are used, which keeps progress right for variable frame rate inputs and files with 
+        bad duration metadata; `total_frames` is corrected too. Otherwise the count is estimated from 
+        the probed duration and frame rate.
+
+        Parameters:
+        - video_settings: A settings object containing probed input information
+        - use_start_stop: Whether the input is trimmed to the start and stop times
+        - overwrite_fps: Whether the output is resampled to `video_settings.output_frame_rate`
+
+        Returns:
+        The PacketIndex, or None if the index is disabled or could not be built.
+        """
+        start, stop = 0.0, None
+        if use_start_stop:
+            try:
+                start, stop = float(video_settings.start_time), float(video_settings.stop_time)
+            except (TypeError, ValueError):
+                pass
+            stop = None if stop is not None and stop < 0 else stop
+
+        index = None
+        if self.settings.packet_index:
+            with self.instrumentation.stage("packet_index", file=video_settings.file_name):
+                index = self.packet_indexes.get(self.settings.ffprobe_path, video_settings.file_path)
+        if index and index.frame_count:
+            video_settings.total_frames = index.frame_count
+            frames = index.frames_between(start, stop)
+            duration = max(0.0, min(stop if stop is not None else index.end_time, index.end_time) - start)
+        else:
+            frame_rate = float(video_settings.input_frame_rate or 0) or 30.0
+            duration = video_settings.total_frames / frame_rate
+            duration = max(0.0, min(stop if stop is not None else duration, duration) - start)
+            frames = int(round(duration * frame_rate))
+        if overwrite_fps:
+            frames = int(round(duration * float(video_settings.output_frame_rate)))
+        video_settings.expected_frames = max(frames, 1)
+        return index
+
+    def reserve_output(self, video_settings, app, use_start_stop=False, estimated_size=None):
+        """
+        Estimates the output size and reserves room for it on the output disk, counting the outputs 
+        other jobs are writing or still moving there. If a scratch directory is configured and has 
+        room, a file is reserved there for ffmpeg to write to instead. The reservations are given back 
+        by `finish_output` or `discard_output`.
+
+        Parameters:
+        - video_settings: A settings object containing probed input information and video-related configurations
+        - app: The main application or GUI object to update progress
+        - use_start_stop: Whether the input is trimmed to the start and stop times
+        - estimated_size: The output size in bytes if already estimated, e.g. by the planner
+
+        Returns:
+        The path ffmpeg should write to, or None if there is not enough free space for the job.
+        """
+        if estimated_size is None:
+            estimated_size = estimate_output_size(video_settings, use_start_stop)
+        video_settings.estimated_size = estimated_size
+        reserve_bytes = self.settings.min_free_space_mb * 1024 * 1024
+        output_directory = os.path.dirname(video_settings.output_path)
+        pending_bytes = self.output_mover.pending_bytes(output_directory)
+        if not self.space_reservations.reserve(video_settings.output_path, estimated_size, reserve_bytes, pending_bytes):
+            app.status_var.set(f"Skipped conversion: not enough free space for '{video_settings.output_name}' "
+                               f"(about {video_settings.estimated_size // (1024 * 1024)} MB needed)")
+            return None
+
+        scratch_directory = self.settings.scratch_directory
+        if not scratch_directory:
+            return video_settings.output_path
+        scratch_path = scratch_output_path(scratch_directory, video_settings.output_path)
+        if not self.space_reservations.reserve(scratch_path, estimated_size, reserve_bytes):
+            os.remove(scratch_path)
+            return video_settings.output_path
+        return scratch_path
+
+    def stage_input(self, video_settings, app):
+        """
+        Copies an input from network storage to the scratch directory (or the system temp directory) 
+        with large sequential reads, so ffmpeg's seeks and small reads hit local disk.
+
+        Parameters:
+        - video_settings: A settings object containing probed input information
+        - app: The main application or GUI object to update progress
+
+        Returns:
+        The path of the local copy, or None if there is no room for it or the copy failed, in which 
+        case ffmpeg reads the original.
+        """
+        staging_directory = self.settings.scratch_directory or tempfile.gettempdir()
+        if not has_free_space(staging_directory, video_settings.input_size, self.settings.min_free_space_mb * 1024 * 1024):
+            return None
+        app.status_var.set(f"Copying {video_settings.file_name} to local storage")
+        with self.instrumentation.stage("stage_input", file=video_settings.file_name) as record:
+            try:
+                staged_path = stage_copy(video_settings.file_path, staging_directory, read_ahead_chunk_size)
+            except OSError as e:
+                print(f"Error staging {video_settings.file_path}, reading it in place: {e}")
+                return None
+            record["bytes_read"] = record["bytes_written"] = video_settings.input_size
+        return staged_path
+
+    def finish_output(self, encode_path, video_settings):
+        """
+        Moves an output written to scratch storage to its final path in the background, and gives 
+        back its space reservations. A queued move keeps counting against the output disk.
+        """
+        if encode_path != video_settings.output_path:
+            self.output_mover.submit(encode_path, video_settings.output_path, video_settings.output_size)
+        self.release_output(encode_path, video_settings)
+
+    def discard_output(self, encode_path, video_settings, thumbnail_file=None):
+        """
+        Removes the scratch file reserved for a job that did not produce an output, and gives back its 
+        space reservations. If the job reserved thumbnails, they are removed too; pass 
+        `thumbnail_file` only then, so thumbnails from an earlier run are kept.
+        """
+        if encode_path != video_settings.output_path and os.path.exists(encode_path):
+            os.remove(encode_path)
+        self.release_output(encode_path, video_settings)
+        if thumbnail_file:
+            self.thumbnails.discard(thumbnail_file)
+
+    def release_output(self, encode_path, video_settings):
+        self.space_reservations.release(encode_path)
+        self.space_reservations.release(video_settings.output_path)
+
+    def run_two_pass(self, video_settings, app, build_options):
+        """
+        Runs a two-pass encode in a private working directory so concurrent jobs cannot overwrite 
+        each other's pass logs. If the same source was analysed before with the same encoder and 
+        filters, the cached first-pass statistics are reused and only the second pass runs.
+
+        Parameters:
+        - video_settings: A settings object containing video-related configurations
+        - app: The main application or GUI object to update progress
+        - build_options: Keyword arguments for `build_convert_command`
+
+        Returns:
+        A tuple of the ffmpeg return code and the last lines of its output, for error reporting.
+        """
+        job_directory = self.pass_logs.create_job_directory()
+        try:
+            first_pass = build_convert_command(self.settings.ffmpeg_path, video_settings, pass_number=1, **build_options)
+            cache_key = self.pass_logs.cache_key(video_settings, first_pass)
+            if self.pass_logs.restore(cache_key, job_directory):
+                app.status_var.set("Reusing first pass statistics")
+            else:
+                returncode, error = self.run_ffmpeg(first_pass.build(), video_settings, app, cwd=job_directory, status_prefix="Analysing (pass 1/2): ",
+                                                    output_path=job_directory)
+                if returncode != 0:
+                    return returncode, error
+                self.pass_logs.store(cache_key, job_directory)
+
+            second_pass = build_convert_command(self.settings.ffmpeg_path, video_settings, pass_number=2, **build_options)
+            return self.run_ffmpeg(second_pass.build(), video_settings, app, cwd=job_directory, status_prefix="Converting (pass 2/2): ",
+                                   output_path=second_pass.output_path)
+        finally:
+            self.pass_logs.remove_job_directory(job_directory)
+
+    def run_ffmpeg(self, cmd, video_settings, app, cwd=None, status_prefix="Converting: ", stdin_path=None, output_path=None):
+        """
+        Runs an ffmpeg command and reports its progress to the application.
+
+        Parameters:
+        - cmd: The ffmpeg argument list
+        - video_settings: A settings object containing video-related configurations
+        - app: The main application or GUI object to update progress
+        - cwd: Working directory for ffmpeg, used for relative pass log paths
+        - status_prefix: Text shown before the ffmpeg progress line in the status bar
+        - stdin_path: File streamed to ffmpeg's stdin through a read-ahead buffer, for commands that
+                      read "pipe:0"
+        - output_path: The main output, whose size is recorded as bytes_written, or a directory whose 
+                       files are counted, e.g. the pass logs written by an analysis pass. Without 
+                       one, bytes_written is recorded as unknown.
+
+        Returns:
+        A tuple of the ffmpeg return code and the last lines of its output, for error reporting.
+        """
+        with self.instrumentation.stage("encode", file=video_settings.file_name, encoder=video_settings.ffmpeg_codec) as record:
+            read_ahead = None
+            stdin = None
+            if stdin_path:
+                read_ahead = ReadAhead(stdin_path, read_ahead_chunk_size, max(1, self.settings.read_ahead_mb * 1024 * 1024 // read_ahead_chunk_size))
+                stdin = read_ahead.start()
+            try:
+                # Create a pipe to capture the output
+                process = subprocess.Popen(cmd, cwd=cwd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True)
+            finally:
+                if stdin is not None:
+                    os.close(stdin)  # ffmpeg has its own copy; closing ours lets the writer see it exit
+
+            cancelled = getattr(app, "cancelled", None)
+            if cancelled is not None:
+                threading.Thread(target=terminate_when_set, args=(process, cancelled), daemon=True).start()
+
+            # Update the progress and output in real-time
+            last_lines = []
+            frame_num = 0
+            for line in process.stdout:
+                match = progress_pattern.search(line)
+                if self.settings.debug:
+                    print(line)
+                if match:
+                    frame_num = int(match.group(1))
+                    fps_match = fps_pattern.search(line)
+                    if fps_match:
+                        video_settings.encode_fps = float(fps_match.group(1))  # Read by the adaptive batch runner
+                    expected_frames = getattr(video_settings, "expected_frames", 0) or video_settings.total_frames
+                    progress = min(int((frame_num / max(expected_frames, 1)) * 100), 100)
+                    app.progress_var.set(progress)
+                    app.status_var.set(status_prefix + line.strip())  # Update status with FFmpeg output
+                    app.current_file_label.config(text="Processing: " + video_settings.file_name)  # Update current file label
+                    app.root.update_idletasks()  # Update the GUI
+                elif line.strip():
+                    last_lines = (last_lines + [line.strip()])[-5:]
+
+            record.update(wait_for_process(process))
+            video_settings.encode_fps = 0.0
+            record["returncode"] = process.returncode
+            record["frames"] = frame_num
+            if read_ahead:
+                read_ahead.stop()
+                record.update(read_ahead.join())
+                record["input_mode"] = "pipe"
+            record["bytes_written"] = written_bytes(output_path) if output_path else None
+        return process.returncode, "\n".join(last_lines)
     
     def process_tiffs_to_video(self, tiff_files, ffmpeg_path, video_settings, app):
         """
@@ -232,7 +520,8 @@ class VideoProcessor:
         - app: The main application or GUI object to update progress
         
         Returns:
-        None
+        - "SKIPPED" if ffmpeg fails to create the video
+        - None if the conversion is successful
         
         Raises:
         - Exception: If there's an error during conversion
@@ -248,89 +537,117 @@ class VideoProcessor:
 
         # Define the output video name based on the first file
         first_file = sorted_files[0]
-        dir_name = os.path.dirname(first_file)
-        output_file = os.path.join(dir_name, os.path.basename(first_file).split('.')[0] + '_output.mp4')
-        
-        # Create our FFMPEG function call
-        video_settings.ffmpeg_codec = self.map_codec(video_settings.output_codec,video_settings.ffmpeg_codec_map)
-        # Build the base command with common options
-
-        f'{ffmpeg_path} -y -f concat -safe 0 -r 30 -i "{temp_filename}" -c:v libx264 -pix_fmt yuv420p "{output_file}"'
-        cmd = [
-            f'{self.settings.ffmpeg_path}',
-            "-y",
-            "-loglevel", "quiet", "-stats",
-            "concat", "-safe 0", "-r",
-            video_settings.output_frame_rate,
-            "-i", video_settings.file_path,
-        ]
-        # Add codec-specific options based on output_codec
-        if video_settings.output_codec == "ffv1":
-            cmd.extend([
-                "-c:v", "ffv1",
-                "-level", "3", "-coder", "1", "-context", "1",
-            ])
-        elif video_settings.output_codec == "h264":
-            cmd.extend([
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", str(video_settings.crf),
-            ])
-        elif video_settings.output_codec == "h265":
-            cmd.extend([
-                "-c:v", "libx265",
-                "-preset", "medium",
-                "-crf", str(video_settings.crf),
-            ])
-        elif video_settings.output_codec == "rawvideo":
-            cmd.extend([
-                "-c:v", "rawvideo",
-                "-pix_fmt", "yuv420p",
-            ])
-            video_settings.output_path = os.path.normpath(os.path.join(video_settings.file_directory, f"{video_settings.output_name}.avi"))
-
-        # Add common options for audio and output file
-        cmd.extend([
-            #"-c:a", "copy",
-            video_settings.output_path,
-        ])
-
-
-        # Construct the ffmpeg command
-        cmd = f'{ffmpeg_path} -y -f concat -safe 0 -r 30 -i "{temp_filename}" -c:v libx264 -pix_fmt yuv420p "{output_file}"'
+        video_settings.file_directory = os.path.dirname(first_file)
+        video_settings.file_name = os.path.basename(first_file)
+        output_ext = self.map_codec(video_settings.output_codec,video_settings.output_ext_map)
+        video_settings.output_path = output_path_for(first_file, output_ext)
+        video_settings.output_name = os.path.basename(video_settings.output_path)
+        video_settings.total_frames = video_settings.expected_frames = len(sorted_files)
+        video_settings.input_frame_rate = float(video_settings.output_frame_rate)
+        video_settings.input_width = video_settings.input_height = 0  # Unknown, so size estimates fall back to the input size
+        video_settings.input_size = os.path.getsize(first_file) * len(sorted_files)  # Multiplying size of first file with total number of files
         
         # Execute the command
         try:
-            process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True)
+            encode_path = self.reserve_output(video_settings, app)
+            if encode_path is None:
+                return "SKIPPED"
 
-            for line in process.stdout:
-                match = progress_pattern.search(line)
-                if match:
-                    frame_num = int(match.group(1))
-                    progress = min(int((frame_num / video_settings.total_frames) * 100), 100)
-                    app.progress_var.set(progress)
-                    app.status_var.set("Converting: " + line.strip())  # Update status with FFmpeg output
-                    app.current_file_label.config(text="Processing: " + video_settings.file_name)  # Update current file label
-                    app.root.update_idletasks()  # Update the GUI
-            
-            process.communicate()
+            # Create our FFMPEG function call
+            thumbnail_paths = self.thumbnails.reserve(first_file) if self.settings.thumbnails else None
+            thumbnail_file = first_file if thumbnail_paths else None
+            try:
+                command = build_tiff_command(ffmpeg_path, temp_filename, video_settings, capabilities=self.capabilities, output_path=encode_path,
+                                             thumbnail_paths=thumbnail_paths)
+            except ValueError as e:
+                self.discard_output(encode_path, video_settings, thumbnail_file)
+                app.status_var.set(f"Skipped conversion: {e}")
+                return "SKIPPED"
+            video_settings.ffmpeg_codec = command.output_options["-c:v"]
+            cmd = command.build()
+
+            try:
+                returncode, error = self.run_ffmpeg(cmd, video_settings, app, output_path=encode_path)
+            except Exception:
+                self.discard_output(encode_path, video_settings, thumbnail_file)
+                raise
 
-            if process.returncode == 0:
-                print(f"Video created successfully: {output_file}")
+            if returncode == 0:
+                print(f"Video created successfully: {video_settings.output_path}")
                 # Create log information
-                video_settings.file_directory = os.path.dirname(video_settings.file_path)
-                video_settings.file_name = os.path.basename(first_file)
-                base_name, ext = os.path.splitext(video_settings.file_name)
-                video_settings.output_name = f"{base_name}_out.mp4"
-                video_settings.output_path = os.path.normpath(os.path.join(video_settings.file_directory, video_settings.output_name))
                 video_settings.input_codec = 'TIFF'
-                video_settings.output_codec = video_settings.output_codec
-                video_settings.input_size = os.path.getsize(first_file) * len(sorted_files)  # Multiplying size of first file with total number of files
-                video_settings.output_size = os.path.getsize(output_file)
-                video_settings.relative_size = round(os.path.getsize(output_file) / (os.path.getsize(first_file) * len(sorted_files)),3)
+                video_settings.output_size = os.path.getsize(encode_path)
+                video_settings.relative_size = round(video_settings.output_size / video_settings.input_size,3)
+                self.finish_output(encode_path, video_settings)
             else:
                 # Handle error
-                print("Error converting TIFFs to video:")
-            # add log file information
+                self.discard_output(encode_path, video_settings, thumbnail_file)
+                print(f"Error converting TIFFs to video: {error}")
+                return "SKIPPED"
         finally:
-            os.remove(temp_filename)  # Clean up the temporary file
\ No newline at end of file
+            os.remove(temp_filename)  # Clean up the temporary file
+
+
+class HeadlessValue:
+    """
+    Stands in for a Tk variable outside the GUI. An optional callback is called with every new value.
+    """
+    def __init__(self, value=None, callback=None):
+        self.value = value
+        self.callback = callback
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        if self.callback:
+            self.callback(value)
+
+
+class HeadlessWidget:
+    """
+    Accepts and ignores the widget and root window calls VideoProcessor makes on the GUI.
+    """
+    def config(self, **kwargs):
+        pass
+
+    def update(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def after(self, delay, callback=None):
+        pass
+
+
+class HeadlessApp:
+    """
+    Provides the attributes VideoProcessor expects from VideoConverterApp so conversions can run 
+    without a display, for example on a remote worker.
+
+    Parameters:
+    - overwrite_file (bool): Convert even if the input already has the output codec, and overwrite 
+                             existing outputs. Without it, existing outputs are skipped, since there 
+                             is nobody to ask.
+    - overwrite_fps (bool): Force the output frame rate.
+    - use_start_stop (bool): Trim the input to the start and stop times.
+    - on_progress: Optional function called with the progress percentage.
+    - on_status: Optional function called with every status message.
+    - cancelled (threading.Event): Optional event that stops the running ffmpeg process when set.
+    """
+    def __init__(self, overwrite_file=False, overwrite_fps=False, use_start_stop=False, on_progress=None, on_status=None, cancelled=None):
+        self.overwrite_file = HeadlessValue(overwrite_file)
+        self.overwrite_fps = HeadlessValue(overwrite_fps)
+        self.use_start_stop = HeadlessValue(use_start_stop)
+        self.progress_var = HeadlessValue(0, on_progress)
+        self.status_var = HeadlessValue("", on_status)
+        self.current_file_label = HeadlessWidget()
+        self.open_output_button = HeadlessWidget()
+        self.root = HeadlessWidget()
+        self.cancelled = cancelled
+
+    def ask_overwrite(self, output_name):
+        self.status_var.set(f"Output file '{output_name}' already exists")
+        return False
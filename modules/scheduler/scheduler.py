@@ -0,0 +1,212 @@
+# scheduler.py
+import os
+import time
+import threading
+
+stat_path = "/proc/stat"
+
+
+def read_cpu_times():
+    """
+    Returns the system-wide (busy, iowait, total) CPU times in clock ticks from /proc/stat, or None
+    where it is not available (e.g. Windows and macOS).
+    """
+    try:
+        with open(stat_path, "r") as stat_file:
+            fields = stat_file.readline().split()
+    except OSError:
+        return None
+    if not fields or fields[0] != "cpu":
+        return None
+    # user nice system idle iowait irq softirq steal; guest time is already counted in user
+    times = [int(value) for value in fields[1:9]]
+    idle, iowait = times[3], times[4] if len(times) > 4 else 0
+    total = sum(times)
+    return total - idle - iowait, iowait, total
+
+
+class LoadSampler:
+    """
+    Measures system load between calls.
+
+    Methods:
+    - sample(): Returns the CPU utilisation, I/O wait and load since the last call.
+    """
+    def __init__(self):
+        self.cpu_count = os.cpu_count() or 1
+        self.last_times = read_cpu_times()
+
+    def sample(self):
+        """
+        Returns:
+        A dictionary with:
+        - cpu: Fraction of CPU time spent busy since the last sample, or None if unknown.
+        - iowait: Fraction of CPU time spent idle waiting for I/O since the last sample, or None.
+        - load: The one-minute load average per CPU, or None if unknown.
+        """
+        times = read_cpu_times()
+        cpu = iowait = None
+        if times and self.last_times:
+            total = times[2] - self.last_times[2]
+            if total > 0:
+                cpu = (times[0] - self.last_times[0]) / total
+                iowait = (times[1] - self.last_times[1]) / total
+        self.last_times = times
+        try:
+            load = os.getloadavg()[0] / self.cpu_count
+        except (AttributeError, OSError):
+            load = None
+        return {"cpu": cpu, "iowait": iowait, "load": load}
+
+
+class ConcurrencyController:
+    """
+    Chooses how many jobs to run at once by hill climbing on the total frames per second. A slot is
+    added while the CPU has headroom and the disks are not the bottleneck, and kept only if the total
+    throughput improved; otherwise it is given back and no slot is added for a while. Slots are
+    removed when the system is overloaded. Every decision is made on the average of several samples
+    taken after the previous change, so one busy moment does not move the slot count.
+
+    Methods:
+    - update(load, fps): Takes a load sample and the current total fps, returns the slot count.
+    """
+    def __init__(self, min_slots=1, max_slots=None, settle_samples=3, cpu_high=0.85, iowait_high=0.25,
+                 load_high=1.5, min_gain=0.05, cooldown_samples=15):
+        """
+        Parameters:
+        - min_slots (int): Fewest jobs to run at once.
+        - max_slots (int): Most jobs to run at once. Defaults to the CPU count.
+        - settle_samples (int): Samples averaged before each decision, starting after the last change.
+        - cpu_high (float): CPU utilisation above which no slot is added.
+        - iowait_high (float): I/O wait above which a slot is removed, as more jobs only queue on the disks.
+        - load_high (float): Load average per CPU above which a slot is removed.
+        - min_gain (float): Relative fps gain an added slot must bring to be kept.
+        - cooldown_samples (int): Samples to wait after a slot did not pay off before trying again.
+        """
+        self.min_slots = max(1, min_slots)
+        self.max_slots = max(self.min_slots, max_slots or os.cpu_count() or 1)
+        self.settle_samples = settle_samples
+        self.cpu_high = cpu_high
+        self.iowait_high = iowait_high
+        self.load_high = load_high
+        self.min_gain = min_gain
+        self.cooldown_samples = cooldown_samples
+        self.slots = self.min_slots
+        self.window = []
+        self.baseline_fps = None  # Throughput before the last added slot
+        self.cooldown = 0
+
+    def update(self, load, fps):
+        """
+        Parameters:
+        - load: A sample from LoadSampler.sample()
+        - fps: The total frames per second of the running jobs
+
+        Returns:
+        The number of jobs that should run.
+        """
+        self.window.append((load, fps))
+        self.cooldown = max(0, self.cooldown - 1)
+        if len(self.window) < self.settle_samples:
+            return self.slots
+
+        def average(key):
+            values = [sample[key] for sample, _ in self.window if sample.get(key) is not None]
+            return sum(values) / len(values) if values else None
+
+        cpu, iowait, load_per_cpu = average("cpu"), average("iowait"), average("load")
+        average_fps = sum(fps for _, fps in self.window) / len(self.window)
+        self.window = []
+
+        overloaded = (iowait is not None and iowait > self.iowait_high) or (load_per_cpu is not None and load_per_cpu > self.load_high)
+        if self.baseline_fps is not None:
+            gained = average_fps > self.baseline_fps * (1 + self.min_gain)
+            self.baseline_fps = None
+            if not gained:
+                # The last slot did not raise the throughput, so give it back and stop climbing for a while
+                self.cooldown = self.cooldown_samples
+                return self._set_slots(self.slots - 1)
+        if overloaded:
+            self.cooldown = self.cooldown_samples
+            return self._set_slots(self.slots - 1)
+        if self.cooldown == 0 and (cpu is None or cpu < self.cpu_high) and self.slots < self.max_slots:
+            self.baseline_fps = average_fps
+            return self._set_slots(self.slots + 1)
+        return self.slots
+
+    def _set_slots(self, slots):
+        self.slots = min(self.max_slots, max(self.min_slots, slots))
+        return self.slots
+
+
+class AdaptiveBatchRunner:
+    """
+    Runs a batch of jobs on worker threads, with the number of jobs running at once set by a
+    ConcurrencyController from the live system load and the jobs' own fps. Running jobs are never
+    interrupted; when the controller removes a slot, the next job waits for one to finish.
+
+    Methods:
+    - run(jobs): Runs every job and returns when all have finished.
+    """
+    def __init__(self, run_job, job_fps, controller=None, sampler=None, interval=2.0):
+        """
+        Parameters:
+        - run_job: Function called with a job on a worker thread. Exceptions are printed and the
+                   batch continues.
+        - job_fps: Function called with a running job that returns its current frames per second.
+        - controller (ConcurrencyController): Decides the slot count. Defaults to one with default limits.
+        - sampler (LoadSampler): Measures the system load.
+        - interval (float): Seconds between load samples.
+        """
+        self.run_job = run_job
+        self.job_fps = job_fps
+        self.controller = controller or ConcurrencyController()
+        self.sampler = sampler or LoadSampler()
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.job_finished = threading.Event()
+        self.running = []
+        self.peak_slots = self.controller.slots
+
+    def run(self, jobs):
+        """
+        Parameters:
+        - jobs: The jobs, started in order.
+
+        Returns:
+        The highest number of jobs that ran at once.
+        """
+        pending = list(jobs)
+        threads = []
+        next_sample = time.monotonic() + self.interval
+        while True:
+            self.job_finished.clear()
+            if time.monotonic() >= next_sample:
+                with self.lock:
+                    fps = sum(self.job_fps(job) or 0 for job in self.running)
+                self.controller.update(self.sampler.sample(), fps)
+                next_sample = time.monotonic() + self.interval
+            with self.lock:
+                if not pending and not self.running:
+                    break
+                while pending and len(self.running) < self.controller.slots:
+                    job = pending.pop(0)
+                    self.running.append(job)
+                    thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+                    thread.start()
+                    threads.append(thread)
+                self.peak_slots = max(self.peak_slots, len(self.running))
+            self.job_finished.wait(max(0.0, next_sample - time.monotonic()))
+        for thread in threads:
+            thread.join()
+        return self.peak_slots
+
+    def _run(self, job):
+        try:
+            self.run_job(job)
+        except Exception as e:
+            print(f"Error running job {job}: {e}")
+        finally:
+            with self.lock:
+                self.running.remove(job)
+            self.job_finished.set()
@@ -1,6 +1,7 @@
 # settings.py
 import os
 import json
+import shutil
 from pathlib import Path
 
 class Settings:
@@ -11,16 +12,33 @@ class Settings:
     the file doesn't exist.
 
     Attributes:
-    - log_file (str): Path to the log file.
+    - log_file (str): Path to the JSON log file written by earlier versions. It is imported into the 
+                      log database once.
+    - log_database (str): Path to the SQLite conversion log.
     - logs_folder (str): Directory path for logs.
     - columns (tuple): Column names to be used for display.
     - ffmpeg_path (Path): Path to the ffmpeg executable.
     - ffprobe_path (Path): Path to the ffprobe executable.
     - debug (bool): Debug mode flag.
     - explorer_directory (str): Directory to be explored.
+    - cache_folder (str): Directory for cached data such as the ffmpeg capability probe.
+    - scratch_directory (str): Fast local directory outputs are written to before being moved to 
+                               their final location. Empty to write outputs in place.
+    - min_free_space_mb (int): Free space to leave on the output disk when scheduling a job.
+    - broker_path (str): SQLite job broker database on shared storage used to distribute jobs to 
+                         worker nodes. Empty to convert everything locally.
+    - input_mode (str): How ffmpeg reads inputs: "auto" streams or stages inputs on network 
+                        filesystems, "direct", "pipe" or "stage" force one way for every input.
+    - read_ahead_mb (int): Size of the buffer between the read-ahead thread and ffmpeg when piping.
+    - packet_index (bool): Index every input's packet timestamps for exact frame counts and progress.
+    - max_jobs (int): Most conversions to run at once. The number running adapts to the CPU and I/O 
+                      load up to this limit; 0 allows up to one per CPU and 1 runs one at a time.
+    - thumbnails (bool): Make a poster frame, contact sheet and low resolution preview of every 
+                         conversion in the same ffmpeg pass, and show the posters in the log.
 
     Methods:
     - load_config(config_path): Loads settings from a given configuration file.
+    - locate_binary(name, configured_path): Finds an executable such as ffmpeg or ffprobe.
     """
     def __init__(self, config_path="settings_config.json"):
         """
@@ -45,27 +63,72 @@ class Settings:
         Parameters:
         - config_path (str): Absolute path to the configuration file to be loaded.
         """
-        parent_dir = Path(__file__).resolve().parents[2]
         if os.path.exists(config_path):
             with open(config_path, "r") as config_file:
                 config_data = json.load(config_file)
             
             # Load values from the config file or set default values
             self.log_file = config_data.get("log_file", "logs/conversion_log.json")
+            self.log_database = config_data.get("log_database", "logs/conversion_log.db")
             self.logs_folder = config_data.get("logs_folder", "logs")
             self.columns = tuple(config_data.get("columns", ("Directory", "File Name", "Input Codec", "Output Codec", "Input Size", "Output Size", "Relative Size")))
-            self.ffmpeg_path = parent_dir / 'bin' / 'ffmpeg.exe'
-            self.ffprobe_path = parent_dir / 'bin' / 'ffprobe.exe'
+            self.ffmpeg_path = self.locate_binary("ffmpeg", config_data.get("ffmpeg_path", ""))
+            self.ffprobe_path = self.locate_binary("ffprobe", config_data.get("ffprobe_path", ""))
             self.debug = config_data.get("debug", False)
             self.explorer_directory = config_data.get("explorer_directory", "")
+            self.cache_folder = config_data.get("cache_folder", "cache")
+            self.scratch_directory = config_data.get("scratch_directory", "")
+            self.min_free_space_mb = config_data.get("min_free_space_mb", 1024)
+            self.broker_path = config_data.get("broker_path", "")
+            self.input_mode = config_data.get("input_mode", "auto")
+            self.read_ahead_mb = config_data.get("read_ahead_mb", 64)
+            self.packet_index = config_data.get("packet_index", False)
+            self.max_jobs = config_data.get("max_jobs", 0)
+            self.thumbnails = config_data.get("thumbnails", False)
             
         else:
             # Default values if config file does not exist
             self.log_file = "logs/conversion_log.json"
+            self.log_database = "logs/conversion_log.db"
             self.logs_folder = "logs"
             self.columns = ("Directory", "File Name", "Input Codec", "Output Codec", "Input Size", "Output Size", "Relative Size")
-            self.ffmpeg_path = parent_dir / 'bin' / 'ffmpeg.exe'
-            self.ffprobe_path = parent_dir / 'bin' / 'ffprobe.exe'
+            self.ffmpeg_path = self.locate_binary("ffmpeg")
+            self.ffprobe_path = self.locate_binary("ffprobe")
             self.debug = False
             self.explorer_directory = ""
+            self.cache_folder = "cache"
+            self.scratch_directory = ""
+            self.min_free_space_mb = 1024
+            self.broker_path = ""
+            self.input_mode = "auto"
+            self.read_ahead_mb = 64
+            self.packet_index = False
+            self.max_jobs = 0
+            self.thumbnails = False
+
+    def locate_binary(self, name, configured_path=""):
+        """
+        Finds an executable such as ffmpeg. The configured path is used if it exists, then the copy
+        bundled in the repository's bin folder, then the first match on the system PATH.
+
+        Parameters:
+        - name (str): Executable name without extension, e.g. "ffmpeg".
+        - configured_path (str): Path from the configuration file, or an empty string.
+
+        Returns:
+        Path: The executable path. If nothing is found, the bundled path is returned so the error
+              reported when running it names the expected location.
+        """
+        if configured_path and os.path.isfile(configured_path):
+            return Path(configured_path)
+
+        parent_dir = Path(__file__).resolve().parents[2]
+        for bundled in (parent_dir / 'bin' / f'{name}.exe', parent_dir / 'bin' / name):
+            if bundled.is_file():
+                return bundled
+
+        on_path = shutil.which(name)
+        if on_path:
+            return Path(on_path)
+        return parent_dir / 'bin' / f'{name}.exe'
 
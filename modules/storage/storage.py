@@ -0,0 +1,236 @@
+# storage.py
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from modules.command_builder.command_builder import output_dimensions, parse_bitrate
+
+# Approximate bits per pixel at CRF 23 for the lossy encoders. Every 6 CRF steps roughly halves or
+# doubles the bitrate, which is how the estimate is scaled to the configured CRF.
+bits_per_pixel_at_crf23 = {
+    "h264": 0.10,
+    "h265": 0.06,
+    "vp9": 0.065,
+    "av1": 0.05,
+}
+
+# Output size relative to the uncompressed yuv420p frames for codecs without a CRF
+uncompressed_ratio = {
+    "rawvideo": 1.0,
+    "ffv1": 0.5,
+}
+
+# Allowance for audio and container overhead, in bytes per second
+audio_bytes_per_second = 192000 // 8
+
+
+def estimate_output_size(video_settings, use_start_stop=False):
+    """
+    Estimates the size of the output file from the probed input and the encoder settings. This is
+    deliberately pessimistic, as it is only used to decide whether a job fits on the target disk.
+
+    Parameters:
+    - video_settings: A settings object containing probed input information and video-related configurations
+    - use_start_stop: Whether the input is trimmed to the start and stop times
+
+    Returns:
+    The estimated output size in bytes.
+    """
+    frame_rate = float(video_settings.input_frame_rate or 0) or float(video_settings.frame_rate or 30)
+    frames = int(video_settings.total_frames or 0)
+    duration = frames / frame_rate if frame_rate > 0 else 0
+
+    try:
+        start_time = float(video_settings.start_time)
+        stop_time = float(video_settings.stop_time)
+    except (TypeError, ValueError):
+        start_time, stop_time = 0.0, -1.0
+    if use_start_stop:
+        end = stop_time if stop_time >= 0 else duration
+        duration = max(0.0, min(end, duration) - start_time)
+        frames = int(duration * frame_rate)
+
+    width, height = output_dimensions(video_settings)
+    if not width or not height:
+        # Without a frame size, assume the output is no larger than the input (or 10x for raw video)
+        return int(video_settings.input_size or 0) * (10 if video_settings.output_codec == "rawvideo" else 1)
+
+    raw_size = width * height * 12 // 8 * frames  # yuv420p is 12 bits per pixel
+    codec = video_settings.output_codec
+    if codec in uncompressed_ratio:
+        return int(raw_size * uncompressed_ratio[codec])
+
+    mode = getattr(video_settings, "rate_control", "crf")
+    if mode in ("abr", "two_pass"):
+        video_bytes = parse_bitrate(video_settings.bitrate) * duration / 8
+    else:
+        bits_per_pixel = bits_per_pixel_at_crf23.get(codec, 0.1) * 2 ** ((23 - float(video_settings.crf)) / 6)
+        video_bytes = raw_size * 8 / 12 * bits_per_pixel
+        max_bitrate = parse_bitrate(getattr(video_settings, "max_bitrate", "")) or (parse_bitrate(video_settings.bitrate) if mode == "capped_crf" else 0)
+        if mode == "capped_crf" and max_bitrate:
+            video_bytes = min(video_bytes, max_bitrate * duration / 8)
+    return int(video_bytes + audio_bytes_per_second * duration)
+
+
+def free_space(directory):
+    """
+    Returns the free space in bytes on the disk holding `directory`, or None if it cannot be read.
+    """
+    try:
+        return shutil.disk_usage(directory).free
+    except OSError:
+        return None
+
+
+def has_free_space(directory, required_bytes, reserve_bytes=0):
+    """
+    Checks whether a file of `required_bytes` fits in `directory` while leaving `reserve_bytes` free.
+    If the free space cannot be determined the check passes, so an unreadable share never blocks a job.
+    """
+    available = free_space(directory)
+    return available is None or available - required_bytes >= reserve_bytes
+
+
+def scratch_output_path(scratch_directory, output_path):
+    """
+    Reserves a unique file in the scratch directory for an output, keeping the output extension so
+    ffmpeg picks the right muxer.
+
+    Returns:
+    The path of the reserved scratch file.
+    """
+    os.makedirs(scratch_directory, exist_ok=True)
+    base_name, ext = os.path.splitext(os.path.basename(output_path))
+    handle, path = tempfile.mkstemp(prefix=f"{base_name}_", suffix=ext, dir=scratch_directory)
+    os.close(handle)
+    return path
+
+
+class SpaceReservations:
+    """
+    Keeps the estimated sizes of the outputs being written, so jobs running at once do not all count
+    the same free space. Only the part of an estimate that has not been written yet is counted, as
+    the rest already shows up in the disk's free space.
+
+    Methods:
+    - reserve(path, size, reserve_bytes, pending_bytes): Reserves room for a file if it fits.
+    - release(path): Gives back the room reserved for a file.
+    - outstanding_bytes(directory): Reserved bytes in a directory that have not been written yet.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sizes = {}
+
+    def reserve(self, path, size, reserve_bytes=0, pending_bytes=0):
+        """
+        Reserves `size` bytes for `path` if they fit next to the other reservations in its directory.
+
+        Parameters:
+        - path (str): The file that will be written.
+        - size (int): The estimated file size in bytes.
+        - reserve_bytes (int): Free space to leave on the disk.
+        - pending_bytes (int): Further bytes on their way to the directory, e.g. queued moves.
+
+        Returns:
+        bool: Whether the room was reserved.
+        """
+        path = os.path.normpath(path)
+        directory = os.path.dirname(path)
+        with self.lock:
+            if not has_free_space(directory, size + pending_bytes + self._outstanding(directory), reserve_bytes):
+                return False
+            self.sizes[path] = size
+            return True
+
+    def release(self, path):
+        with self.lock:
+            self.sizes.pop(os.path.normpath(path), None)
+
+    def outstanding_bytes(self, directory):
+        with self.lock:
+            return self._outstanding(os.path.normpath(directory))
+
+    def _outstanding(self, directory):
+        total = 0
+        for path, size in self.sizes.items():
+            if os.path.dirname(path) != directory:
+                continue
+            try:
+                written = os.path.getsize(path)
+            except OSError:
+                written = 0
+            total += max(0, size - written)
+        return total
+
+
+class OutputMover:
+    """
+    Moves finished outputs from scratch storage to their final location on a background thread, so
+    the copy to slow or remote storage overlaps with the next encode.
+
+    Methods:
+    - submit(source, destination, size): Queues a move.
+    - pending_bytes(destination_directory): Bytes still to be moved into a directory.
+    - wait(): Blocks until every queued move has finished and returns the errors.
+    """
+    def __init__(self, instrumentation=None):
+        """
+        Parameters:
+        - instrumentation: Optional Instrumentation instance that records each move as a "move" stage.
+        """
+        self.instrumentation = instrumentation
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.errors = []
+        self.thread = None
+
+    def submit(self, source, destination, size=0):
+        """
+        Queues a move from `source` to `destination`. `size` is counted against the destination's
+        free space until the move has finished.
+        """
+        with self.lock:
+            self.pending[destination] = size
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.queue.put((source, destination))
+
+    def pending_bytes(self, destination_directory):
+        with self.lock:
+            return sum(size for destination, size in self.pending.items()
+                       if os.path.dirname(destination) == os.path.normpath(destination_directory))
+
+    def wait(self):
+        """
+        Waits for all queued moves to finish.
+
+        Returns:
+        A list of (destination, error message) tuples for the moves that failed. The list is reset
+        after each call.
+        """
+        self.queue.join()
+        with self.lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def _run(self):
+        while True:
+            source, destination = self.queue.get()
+            try:
+                start = time.perf_counter()
+                size = os.path.getsize(source)
+                shutil.move(source, destination)
+                if self.instrumentation:
+                    self.instrumentation.record("move", file=os.path.basename(destination), wall_seconds=time.perf_counter() - start,
+                                               bytes_read=size, bytes_written=size)
+            except OSError as e:
+                with self.lock:
+                    self.errors.append((destination, str(e)))
+            finally:
+                with self.lock:
+                    self.pending.pop(destination, None)
+                self.queue.task_done()
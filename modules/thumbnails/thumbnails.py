@@ -0,0 +1,67 @@
+# thumbnails.py
+import os
+import shutil
+import hashlib
+
+# The thumbnail outputs of a conversion and their file names. PNG is used for the images because
+# Tk can show it without extra libraries.
+thumbnail_files = {"poster": "poster.png", "contact_sheet": "contact_sheet.png", "preview": "preview.mp4"}
+
+
+class ThumbnailCache:
+    """
+    Keeps the poster frame, contact sheet and preview of converted files in the cache folder, one
+    directory per input file, so the log view can show them without opening the videos.
+
+    Methods:
+    - reserve(file_path): Creates the directory for a file's thumbnails and returns their paths.
+    - get(file_path, kind): Returns the path of an existing thumbnail, or None.
+    - discard(file_path): Removes a file's thumbnails, e.g. after a failed conversion.
+    """
+    def __init__(self, cache_folder="cache", max_entries=2000):
+        """
+        Parameters:
+        - cache_folder (str): The application cache directory. Thumbnails are kept in a "thumbnails"
+                              subdirectory.
+        - max_entries (int): How many files' thumbnails to keep before the oldest are removed.
+        """
+        self.cache_folder = os.path.join(cache_folder, "thumbnails")
+        self.max_entries = max_entries
+
+    def directory(self, file_path):
+        return os.path.join(self.cache_folder, hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest())
+
+    def reserve(self, file_path):
+        """
+        Creates the thumbnail directory of an input file, replacing any earlier thumbnails, and removes
+        the oldest directories beyond `max_entries`.
+
+        Returns:
+        A dictionary of thumbnail kind to output path, or None if the directory cannot be created.
+        """
+        directory = self.directory(file_path)
+        try:
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+            self._prune(keep=directory)
+        except OSError as e:
+            print(f"Error creating thumbnail directory: {e}")
+            return None
+        return {kind: os.path.join(directory, name) for kind, name in thumbnail_files.items()}
+
+    def get(self, file_path, kind="poster"):
+        path = os.path.join(self.directory(file_path), thumbnail_files[kind])
+        return path if os.path.isfile(path) else None
+
+    def discard(self, file_path):
+        shutil.rmtree(self.directory(file_path), ignore_errors=True)
+
+    def _prune(self, keep):
+        entries = [entry for entry in os.scandir(self.cache_folder) if entry.is_dir() and entry.path != keep]
+        if len(entries) < self.max_entries:
+            return
+        # The directory just reserved is the newest. Coarse modification times can tie, so the name
+        # decides between entries from the same tick and the choice does not depend on scan order.
+        entries.sort(key=lambda entry: (entry.stat().st_mtime_ns, entry.name), reverse=True)
+        for entry in entries[self.max_entries - 1:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
@@ -1,8 +1,15 @@
 # video_settings.py
-import tkinter as tk
 import os
 import json
 
+# The settings that define a conversion job, as opposed to the per-file information gathered while 
+# the job runs. These are what gets sent to remote workers.
+job_spec_fields = (
+    "file_path", "output_codec", "crf", "rate_control", "bitrate", "max_bitrate", "buffer_size",
+    "scale_width", "scale_height", "start_time", "stop_time", "frame_rate", "output_frame_rate",
+    "crop", "deinterlace", "pixel_format", "threads",
+)
+
 class VideoSettings:    
     """
     A class to handle the settings for video processing. These settings include codec details,
@@ -15,6 +22,10 @@ class VideoSettings:
     Methods:
     - load_config(config_file_path): Loads video settings from a given configuration file.
     - set_defaults(): Sets the default values for the video settings.
+    - bind_tk_vars(): Creates the Tk variables used by the GUI.
+    - to_job_spec(): Returns the job defining settings as a dictionary.
+    - to_log_entry(): Returns the conversion log entry for the last processed file.
+    - apply_job_spec(job_spec): Updates the settings from a job spec dictionary.
     """
     def __init__(self, config_path="video_settings.json"):
         """
@@ -32,7 +43,14 @@ class VideoSettings:
         config_file_path = os.path.join(module_dir,config_path)
 
         self.load_config(config_file_path)
-        
+
+    def bind_tk_vars(self):
+        """
+        Creates the Tk variables the GUI widgets are bound to, initialised from the current settings. 
+        This needs a Tk root window, so it is only called by the GUI; headless workers use the plain 
+        attributes.
+        """
+        import tkinter as tk  # Imported here so headless workers never load Tk
         self.output_codec_var = tk.StringVar(value=self.output_codec)
         self.crf_var = tk.StringVar(value=self.crf)
         self.scale_width_var = tk.DoubleVar(value=self.scale_width)
@@ -40,6 +58,37 @@ class VideoSettings:
         self.start_time_var = tk.StringVar(value=self.start_time)
         self.stop_time_var = tk.StringVar(value=self.stop_time)
         self.frame_rate_var = tk.StringVar(value=self.frame_rate)
+        self.rate_control_var = tk.StringVar(value=self.rate_control)
+        self.bitrate_var = tk.StringVar(value=self.bitrate)
+        self.max_bitrate_var = tk.StringVar(value=self.max_bitrate)
+
+    def to_job_spec(self):
+        """
+        Returns the settings that describe a conversion job as a JSON-serialisable dictionary.
+        """
+        return {field: getattr(self, field) for field in job_spec_fields}
+
+    def to_log_entry(self):
+        """
+        Returns the conversion log entry for the last processed file.
+        """
+        return {
+            "Directory":        self.file_directory,
+            "File Name":        self.file_name,
+            "Input Codec":      self.input_codec,
+            "Output Codec":     self.output_codec,
+            "Input Size":       self.input_size,
+            "Output Size":      self.output_size,
+            "Relative Size":    self.relative_size
+        }
+
+    def apply_job_spec(self, job_spec):
+        """
+        Updates the settings from a dictionary created by `to_job_spec`. Unknown keys are ignored.
+        """
+        for field in job_spec_fields:
+            if field in job_spec:
+                setattr(self, field, job_spec[field])
         
     def load_config(self, config_file_path):
         """
@@ -62,6 +111,10 @@ class VideoSettings:
             self.output_path = config_data.get("output_path", "")
             self.output_codec = config_data.get("output_codec", "h265")
             self.crf = config_data.get("crf", 28)
+            self.rate_control = config_data.get("rate_control", "crf")
+            self.bitrate = config_data.get("bitrate", "5M")
+            self.max_bitrate = config_data.get("max_bitrate", "")
+            self.buffer_size = config_data.get("buffer_size", "")
             self.input_codec = config_data.get("input_codec", "")
             self.input_width = config_data.get("input_width", 0)
             self.input_height = config_data.get("input_height", 0)
@@ -77,6 +130,9 @@ class VideoSettings:
             self.scale_width = config_data.get("scale_width", 1)
             self.scale_height = config_data.get("scale_height", 1)
             self.stop_time = config_data.get("stop_time", -1)
+            self.threads = config_data.get("threads", 0)
+            self.crop = config_data.get("crop", "")
+            self.deinterlace = config_data.get("deinterlace", False)
             self.codec_map = config_data.get("codec_map", {
                 "hevc": "h265",
                 "avc": "h264",
@@ -85,13 +141,17 @@ class VideoSettings:
                 "h265": "libx265",
                 "h264": "libx264",
                 "rawvideo" : "rawvideo",
-                "ffv1": "ffv1"
+                "ffv1": "ffv1",
+                "vp9": "libvpx-vp9",
+                "av1": "libsvtav1"
             })
             self.output_ext_map = config_data.get("output_ext_map", {
                 "h265": ".mp4",
                 "h264": ".mp4",
                 "rawvideo" : ".avi",
-                "ffv1": ".mkv"
+                "ffv1": ".mkv",
+                "vp9": ".webm",
+                "av1": ".mkv"
             })
             self.ffmpeg_codec = config_data.get("ffmpeg_codec", "")
         else:
@@ -110,6 +170,10 @@ class VideoSettings:
         self.output_path = ""
         self.output_codec = "h264"
         self.crf = 28
+        self.rate_control = "crf"
+        self.bitrate = "5M"
+        self.max_bitrate = ""
+        self.buffer_size = ""
         self.frame_rate = 30
         self.output_frame_rate = 30
         self.input_frame_rate = 30
@@ -119,12 +183,16 @@ class VideoSettings:
         self.bit_depth = 8
         self.pixel_format = ""
         self.total_frames = 1
+        self.expected_frames = 0
         self.file_paths = []
         self.input_size = 1
         self.output_size = 1
         self.relative_size = 1
         self.start_time = 0.0
         self.stop_time = -1
+        self.threads = 0
+        self.crop = ""
+        self.deinterlace = False
         self.codec_map = {
             "hevc": "h265",
             "avc": "h264",
@@ -133,14 +201,16 @@ class VideoSettings:
             "h265": "libx265",
             "h264": "libx264",
             "rawvideo" : "rawvideo",
-            "ffv1": "ffv1"
-        },
+            "ffv1": "ffv1",
+            "vp9": "libvpx-vp9",
+            "av1": "libsvtav1"
+        }
         self.output_ext_map = {
                 "h265": ".mp4",
                 "h264": ".mp4",
                 "rawvideo" : ".avi",
-                "ffv1": ".mkv"
-        },
+                "ffv1": ".mkv",
+                "vp9": ".webm",
+                "av1": ".mkv"
+        }
         self.ffmpeg_codec = ""
-
-video_settings = VideoSettings()
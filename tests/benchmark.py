@@ -0,0 +1,226 @@
+# benchmark.py
+#
+# Reproducible performance benchmark for the conversion paths. Generates synthetic inputs with
+# ffmpeg's lavfi sources, runs the real VideoProcessor probe, convert, trim and TIFF-to-video paths,
+# and compares throughput, latency percentiles and output size against a stored baseline.
+#
+# Run from the repository root:
+#   python -m tests.benchmark                     compare against tests/benchmark_baseline.json
+#   python -m tests.benchmark --quick             smallest matrix, for a fast sanity check
+#   python -m tests.benchmark --update-baseline   store this run as the new baseline
+#
+# Baselines are only comparable on the same machine and ffmpeg build, so each one records both.
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.processing.processing import VideoProcessor, HeadlessApp
+from modules.video_settings.video_settings import VideoSettings
+from modules.capabilities.capabilities import FFmpegCapabilities
+from modules.command_builder.command_builder import available_output_codecs
+from tests.synthetic_media import generate_video, generate_tiff_sequence, ffmpeg_available
+
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarise(name, latencies, frames, output_size):
+    return {
+        "case": name,
+        "runs": len(latencies),
+        "p50_seconds": round(percentile(latencies, 0.50), 4),
+        "p90_seconds": round(percentile(latencies, 0.90), 4),
+        "max_seconds": round(max(latencies), 4),
+        "fps": round(frames / percentile(latencies, 0.50), 2) if frames else None,
+        "output_size": output_size,
+    }
+
+
+class Benchmark:
+    """
+    Runs the benchmark matrix against the real VideoProcessor.
+
+    Methods:
+    - run(): Runs every case and returns the list of results.
+    """
+    def __init__(self, media_directory, sources, resolutions, seconds, codecs, repeats):
+        self.processor = VideoProcessor()
+        self.capabilities = FFmpegCapabilities(self.processor.settings.ffmpeg_path, self.processor.settings.cache_folder).load()
+        self.processor.capabilities = self.capabilities
+        self.media_directory = media_directory
+        self.sources = sources
+        self.resolutions = resolutions
+        self.seconds = seconds
+        self.codecs = [codec for codec in codecs if codec in available_output_codecs(self.capabilities)]
+        self.repeats = repeats
+
+    def inputs(self):
+        for source in self.sources:
+            for width, height in self.resolutions:
+                for seconds in self.seconds:
+                    name = f"{source}_{width}x{height}_{seconds}s"
+                    path = os.path.join(self.media_directory, name + ".mp4")
+                    generate_video(self.processor.settings.ffmpeg_path, path, source, width, height, seconds, capabilities=self.capabilities)
+                    yield name, path
+
+    def new_settings(self, output_codec):
+        settings = VideoSettings()
+        settings.output_codec = output_codec
+        settings.error = None
+        return settings
+
+    def time_conversion(self, file_path, output_codec, use_start_stop=False, start_time=0.0, stop_time=-1):
+        settings = self.new_settings(output_codec)
+        settings.file_path = file_path
+        settings.start_time, settings.stop_time = start_time, stop_time
+        app = HeadlessApp(overwrite_file=True, use_start_stop=use_start_stop)
+        start = time.perf_counter()
+        result = self.processor.convert_video(settings, app)
+        self.processor.output_mover.wait()
+        elapsed = time.perf_counter() - start
+        if result == "SKIPPED" or settings.error:
+            raise RuntimeError(f"{output_codec} conversion of {file_path} failed: {settings.error or app.status_var.get()}")
+        frames = settings.expected_frames
+        os.remove(settings.output_path)
+        return elapsed, frames, settings.output_size
+
+    def run(self):
+        results = []
+        inputs = list(self.inputs())
+
+        for name, path in inputs:
+            latencies = []
+            for _ in range(self.repeats * 3):  # Probes are fast, so take more samples
+                start = time.perf_counter()
+                self.processor.get_video_info(path)
+                latencies.append(time.perf_counter() - start)
+            results.append(summarise(f"probe/{name}", latencies, 0, None))
+
+        for codec in self.codecs:
+            for name, path in inputs:
+                runs = [self.time_conversion(path, codec) for _ in range(self.repeats)]
+                results.append(summarise(f"convert/{codec}/{name}", [run[0] for run in runs], runs[0][1], runs[0][2]))
+                print(f"  {results[-1]['case']}: {results[-1]['p50_seconds']}s", flush=True)
+
+        # Trim a one second window out of the longest input
+        name, path = max(inputs, key=lambda item: (int(item[0].rsplit("_", 1)[1][:-1]), item[0]))
+        for codec in self.codecs[:1]:
+            runs = [self.time_conversion(path, codec, True, 0.5, 1.5) for _ in range(self.repeats)]
+            results.append(summarise(f"trim/{codec}/{name}", [run[0] for run in runs], runs[0][1], runs[0][2]))
+
+        tiff_files = generate_tiff_sequence(self.processor.settings.ffmpeg_path, os.path.join(self.media_directory, "tiff"))
+        for codec in self.codecs[:1]:
+            latencies = []
+            for _ in range(self.repeats):
+                settings = self.new_settings(codec)
+                settings.file_path = tiff_files[0]
+                start = time.perf_counter()
+                result = self.processor.process_tiffs_to_video(tiff_files, self.processor.settings.ffmpeg_path, settings, HeadlessApp(overwrite_file=True))
+                self.processor.output_mover.wait()
+                latencies.append(time.perf_counter() - start)
+                if result == "SKIPPED":
+                    raise RuntimeError(f"TIFF sequence conversion to {codec} failed")
+                os.remove(settings.output_path)
+            results.append(summarise(f"tiff/{codec}/{len(tiff_files)}frames", latencies, len(tiff_files), settings.output_size))
+        return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the results next to the baseline and returns the cases that regressed: slower median
+    latency or larger output than the baseline allows.
+    """
+    baseline_cases = {result["case"]: result for result in baseline.get("results", [])}
+    regressions = []
+    print(f"{'case':<48} {'p50 s':>9} {'p90 s':>9} {'fps':>9} {'size':>12} {'vs baseline':>14}")
+    for result in results:
+        reference = baseline_cases.get(result["case"])
+        change = ""
+        if reference:
+            latency_change = result["p50_seconds"] / reference["p50_seconds"] - 1 if reference["p50_seconds"] else 0
+            change = f"{latency_change:+.1%}"
+            size_regressed = (reference.get("output_size") and result["output_size"]
+                              and result["output_size"] > reference["output_size"] * (1 + tolerance))
+            if latency_change > tolerance or size_regressed:
+                regressions.append(result["case"])
+                change += " !"
+        print(f"{result['case']:<48} {result['p50_seconds']:>9} {result['p90_seconds']:>9} "
+              f"{result['fps'] if result['fps'] is not None else '-':>9} {result['output_size'] or '-':>12} {change:>14}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the video conversion paths with synthetic media.")
+    parser.add_argument("--quick", action="store_true", help="One small input per source and one repeat")
+    parser.add_argument("--sources", nargs="+", default=["testsrc2", "mandelbrot", "noise"])
+    parser.add_argument("--resolutions", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--seconds", nargs="+", type=int, default=[2, 5])
+    parser.add_argument("--codecs", nargs="+", default=["h264", "h265", "ffv1"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--media-dir", help="Keep generated inputs here between runs (default: a temporary directory)")
+    parser.add_argument("--baseline", default=default_baseline_path)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slow-down or size growth, as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.resolutions, args.seconds, args.repeats = ["640x360"], [2], 1
+
+    processor = VideoProcessor()
+    if not ffmpeg_available(processor.settings.ffmpeg_path, processor.settings.ffprobe_path):
+        print(f"ffmpeg/ffprobe not found ({processor.settings.ffmpeg_path}), cannot run the benchmark")
+        return 2
+
+    media_directory = args.media_dir or tempfile.mkdtemp(prefix="videoConversion_bench_")
+    os.makedirs(media_directory, exist_ok=True)
+    try:
+        resolutions = [tuple(int(part) for part in resolution.split("x")) for resolution in args.resolutions]
+        benchmark = Benchmark(media_directory, args.sources, resolutions, args.seconds, args.codecs, args.repeats)
+        results = benchmark.run()
+    finally:
+        if not args.media_dir:
+            shutil.rmtree(media_directory, ignore_errors=True)
+
+    run = {
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count(), "ffmpeg": benchmark.capabilities.version},
+        "timestamp": time.time(),
+        "results": results,
+    }
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("machine") != run["machine"]:
+            print(f"Warning: baseline was recorded on {baseline.get('machine')}, this is {run['machine']}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if args.update_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(run, baseline_file, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not baseline:
+        print("No baseline yet; run with --update-baseline to store one")
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import os
+import time
+import sqlite3
+import tempfile
+import unittest
+import multiprocessing
+from modules.broker.broker import JobBroker, Worker
+
+def fake_conversion(job_spec, report, **context):
+    report(50, "Converting")
+    time.sleep(0.05)
+    return {"File Name": os.path.basename(job_spec["settings"]["file_path"]), "Worker": os.getpid()}
+
+def run_worker(db_path, worker_id):
+    Worker(JobBroker(db_path), worker_id, lease_seconds=5, run_job=fake_conversion).run(idle_exit=True)
+
+class TestJobBroker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "broker.db")
+        self.broker = JobBroker(self.db_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def submit(self, count):
+        for index in range(count):
+            self.broker.submit({"settings": {"file_path": f"/share/clip{index}.mov"}, "options": {}})
+
+    def test_local_worker_processes_share_the_queue(self):
+        self.submit(12)
+        workers = [multiprocessing.Process(target=run_worker, args=(self.db_path, f"worker{index}")) for index in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+
+        results = self.broker.fetch_results()
+        self.assertEqual(sorted(job["result"]["File Name"] for job in results), sorted(f"clip{index}.mov" for index in range(12)))
+        self.assertTrue(all(job["state"] == "done" for job in results))
+        self.assertEqual(self.broker.fetch_results(), [])
+
+    def test_expired_lease_is_requeued(self):
+        self.submit(1)
+        job_id, _, _ = self.broker.claim("dead-worker", lease_seconds=0.05)
+        time.sleep(0.1)
+        self.assertEqual(self.broker.claim("live-worker")[0], job_id)
+        self.assertFalse(self.broker.complete(job_id, "dead-worker", {}))
+        self.assertTrue(self.broker.complete(job_id, "live-worker", {"File Name": "clip0.mov"}))
+
+    def test_worker_reports_queue_wait(self):
+        self.submit(1)
+        time.sleep(0.1)
+        waits = []
+        def conversion(job_spec, report, queued_seconds, **context):
+            waits.append(queued_seconds)
+            return {}
+
+        Worker(self.broker, "worker", run_job=conversion).run(idle_exit=True)
+        self.assertGreaterEqual(waits[0], 0.1)
+
+    def test_job_fails_after_max_attempts(self):
+        self.submit(1)
+        for attempt in range(self.broker.max_attempts):
+            self.broker.claim(f"worker{attempt}", lease_seconds=0)
+            time.sleep(0.01)
+        self.broker.requeue_expired()
+        self.assertEqual(self.broker.counts(), {"failed": 1})
+
+    def test_failed_job_is_reported(self):
+        self.submit(1)
+        Worker(self.broker, "worker", run_job=lambda spec, report, **context: 1 / 0).run(idle_exit=True)
+        job = self.broker.fetch_results()[0]
+        self.assertEqual(job["state"], "failed")
+        self.assertIn("division", job["result"]["error"])
+
+    def test_lost_lease_cancels_job(self):
+        class LostLeaseBroker(JobBroker):
+            def heartbeat(self, *args, **kwargs):
+                return False
+
+        self.submit(1)
+        outcomes = []
+        def long_conversion(job_spec, report, cancelled, **context):
+            outcomes.append("cancelled" if cancelled.wait(10) else "finished")
+            return {}
+
+        started = time.monotonic()
+        Worker(LostLeaseBroker(self.db_path), "worker", lease_seconds=0.3, run_job=long_conversion).run(idle_exit=True)
+        self.assertEqual(outcomes, ["cancelled"])
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_heartbeat_errors_are_retried(self):
+        class FlakyBroker(JobBroker):
+            heartbeats = 0
+
+            def heartbeat(self, *args, **kwargs):
+                FlakyBroker.heartbeats += 1
+                if FlakyBroker.heartbeats == 1:
+                    raise sqlite3.OperationalError("database is locked")
+                return super().heartbeat(*args, **kwargs)
+
+        self.submit(1)
+        outcomes = []
+        def long_conversion(job_spec, report, cancelled, **context):
+            time.sleep(0.5)
+            outcomes.append("cancelled" if cancelled.is_set() else "finished")
+            return {}
+
+        Worker(FlakyBroker(self.db_path), "worker", lease_seconds=0.3, run_job=long_conversion).run(idle_exit=True)
+        self.assertGreater(FlakyBroker.heartbeats, 1)
+        self.assertEqual(outcomes, ["finished"])
+        self.assertEqual(self.broker.fetch_results()[0]["state"], "done")
+
+    def test_locked_database_error_is_not_hidden(self):
+        class ImpatientBroker(JobBroker):
+            def _connect(self):
+                return sqlite3.connect(self.db_path, timeout=0.1, isolation_level=None)
+
+        broker = ImpatientBroker(self.db_path)
+        blocker = sqlite3.connect(self.db_path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            with self.assertRaisesRegex(sqlite3.OperationalError, "locked"):
+                broker.submit({"settings": {}})
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from modules.capabilities.capabilities import FFmpegCapabilities
+from modules.command_builder.command_builder import available_output_codecs
+
+FAKE_FFMPEG = """#!/bin/sh
+echo "$2" >> "$(dirname "$0")/calls.txt"
+case "$2" in
+  -version) echo "ffmpeg version 6.1.1 Copyright (c) 2000-2023 the FFmpeg developers" ;;
+  -encoders) printf 'Encoders:\\n V..... = Video\\n ------\\n V....D ffv1                 FFmpeg video codec #1\\n V....D libx264              libx264 H.264 / AVC\\n V....D rawvideo             raw video\\n A....D aac                  AAC\\n' ;;
+  -filters) printf 'Filters:\\n  T.. = Timeline support\\n TSC scale             V->V       Scale the input video size.\\n ... tile              V->V       Tile several successive frames together.\\n' ;;
+  -pix_fmts) printf 'Pixel formats:\\nFLAGS NAME NB_COMPONENTS BITS_PER_PIXEL BIT_DEPTHS\\n-----\\nIO... yuv420p                3             12      8-8-8\\nI.... bayer_bggr8            3              8      2-4-2\\n' ;;
+esac
+"""
+
+@unittest.skipIf(sys.platform == "win32", "uses a POSIX shell script in place of ffmpeg")
+class TestCapabilities(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ffmpeg_path = os.path.join(self.temp_dir.name, "ffmpeg")
+        with open(self.ffmpeg_path, "w") as fake:
+            fake.write(FAKE_FFMPEG)
+        os.chmod(self.ffmpeg_path, os.stat(self.ffmpeg_path).st_mode | stat.S_IEXEC)
+        self.cache_folder = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_probe_parses_ffmpeg_output(self):
+        capabilities = FFmpegCapabilities(self.ffmpeg_path, self.cache_folder).load()
+        self.assertTrue(capabilities.available)
+        self.assertEqual(capabilities.version, "6.1.1")
+        self.assertTrue(capabilities.has_encoder("libx264"))
+        self.assertFalse(capabilities.has_encoder("libx265"))
+        self.assertTrue(capabilities.has_filter("tile"))
+        self.assertEqual(capabilities.pixel_formats, ["yuv420p"])
+        self.assertEqual(available_output_codecs(capabilities), ["ffv1", "h264", "rawvideo"])
+
+    def test_results_are_cached_until_binary_changes(self):
+        FFmpegCapabilities(self.ffmpeg_path, self.cache_folder).load()
+        FFmpegCapabilities(self.ffmpeg_path, self.cache_folder).load()
+        with open(os.path.join(self.temp_dir.name, "calls.txt")) as calls:
+            self.assertEqual(len(calls.read().split()), 4)
+
+        os.utime(self.ffmpeg_path, (0, 0))
+        FFmpegCapabilities(self.ffmpeg_path, self.cache_folder).load()
+        with open(os.path.join(self.temp_dir.name, "calls.txt")) as calls:
+            self.assertEqual(len(calls.read().split()), 8)
+
+    def test_missing_binary_is_unavailable(self):
+        capabilities = FFmpegCapabilities(os.path.join(self.temp_dir.name, "missing"), self.cache_folder).load()
+        self.assertFalse(capabilities.available)
+        self.assertEqual(available_output_codecs(capabilities), available_output_codecs())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+from types import SimpleNamespace
+from modules.command_builder.command_builder import FilterGraph, FFmpegCommand, build_convert_command, build_copy_command, build_tiff_command, av1_tile_layout
+from tests.settings_fixtures import make_settings
+
+thumbnail_paths = {"poster": "thumbs/poster.png", "contact_sheet": "thumbs/contact_sheet.png", "preview": "thumbs/preview.mp4"}
+
+class TestCommandBuilder(unittest.TestCase):
+    def test_filters_render_in_efficiency_order(self):
+        graph = FilterGraph().add("format", "yuv420p").add("scale", "iw*0.5:ih*0.5").add("fps", 10).add("crop", "640:480:0:0")
+        self.assertEqual(graph.render(), "crop=640:480:0:0,fps=10,scale=iw*0.5:ih*0.5,format=yuv420p")
+
+    def test_interlaced_input_is_deinterlaced_before_crop(self):
+        settings = make_settings(crop="1920:1077:0:1", deinterlace=True, scale_width=0.5, stop_time="10")
+        cmd = build_convert_command("ffmpeg", settings, use_start_stop=True, overwrite_fps=True).build()
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "yadif,crop=1920:1077:0:1,fps=30,scale=iw*0.5:ih*1")
+
+    def test_filters_are_deduplicated(self):
+        graph = FilterGraph().add("scale", "iw*2:ih*2").add("scale", "iw:ih")
+        self.assertEqual(graph.render(), "scale=iw:ih")
+
+    def test_options_are_deduplicated(self):
+        cmd = FFmpegCommand("ffmpeg", "a.mp4", "b.mp4").set_output("-crf", 20).set_output("-crf", 30).build()
+        self.assertEqual(cmd.count("-crf"), 1)
+        self.assertEqual(cmd[cmd.index("-crf") + 1], "30")
+
+    def test_convert_command(self):
+        cmd = build_convert_command("ffmpeg", make_settings(scale_width=0.5, stop_time="10"), use_start_stop=True, overwrite_fps=True).build()
+        self.assertLess(cmd.index("-ss"), cmd.index("-i"))
+        self.assertEqual(cmd[cmd.index("-to") + 1], "10")
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "fps=30,scale=iw*0.5:ih*1")
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "libx264")
+        self.assertEqual(cmd[-1], "in_out.mp4")
+
+    def test_rawvideo_uses_single_format_filter(self):
+        cmd = build_convert_command("ffmpeg", make_settings(output_codec="rawvideo", pixel_format="gray")).build()
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "format=gray")
+        self.assertNotIn("-pix_fmt", cmd)
+
+    def test_tiff_command(self):
+        cmd = build_tiff_command("ffmpeg", "list.txt", make_settings(output_codec="h265")).build()
+        self.assertEqual(cmd[cmd.index("-f") + 1], "concat")
+        self.assertLess(cmd.index("-r"), cmd.index("-i"))
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "format=yuv420p")
+
+    def test_av1_tile_layout_follows_resolution_and_threads(self):
+        self.assertEqual(av1_tile_layout(1280, 720, 16), (1, 0))
+        self.assertEqual(av1_tile_layout(3840, 2160, 32), (2, 1))
+        self.assertEqual(av1_tile_layout(3840, 2160, 1), (0, 0))
+        self.assertEqual(av1_tile_layout(0, 0, 8), (0, 0))
+
+    def test_svtav1_command(self):
+        cmd = build_convert_command("ffmpeg", make_settings(output_codec="av1", threads=8, scale_width=2, scale_height=2)).build()
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "libsvtav1")
+        self.assertEqual(cmd[cmd.index("-svtav1-params") + 1], "lp=8:tile-columns=2:tile-rows=0")
+
+    def test_av1_falls_back_to_libaom(self):
+        capabilities = SimpleNamespace(available=True, has_encoder=lambda name: name != "libsvtav1")
+        cmd = build_convert_command("ffmpeg", make_settings(output_codec="av1", threads=4), capabilities=capabilities).build()
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "libaom-av1")
+        self.assertEqual(cmd[cmd.index("-tiles") + 1], "2x1")
+        self.assertNotIn("-svtav1-params", cmd)
+
+    def test_piped_input_trims_on_output(self):
+        cmd = build_convert_command("ffmpeg", make_settings(start_time="1.5", stop_time="4"), use_start_stop=True, input_path="pipe:0").build()
+        self.assertEqual(cmd[cmd.index("-i") + 1], "pipe:0")
+        self.assertGreater(cmd.index("-ss"), cmd.index("-i"))
+        self.assertGreater(cmd.index("-to"), cmd.index("-i"))
+
+    def test_capped_crf_adds_vbv(self):
+        cmd = build_convert_command("ffmpeg", make_settings(rate_control="capped_crf", max_bitrate="4M")).build()
+        self.assertEqual(cmd[cmd.index("-crf") + 1], "28")
+        self.assertEqual(cmd[cmd.index("-maxrate") + 1], "4000000")
+        self.assertEqual(cmd[cmd.index("-bufsize") + 1], "8000000")
+
+    def test_capped_crf_uses_constrained_quality_for_vp9(self):
+        cmd = build_convert_command("ffmpeg", make_settings(output_codec="vp9", rate_control="capped_crf", max_bitrate="4M")).build()
+        self.assertEqual(cmd[cmd.index("-crf") + 1], "28")
+        self.assertEqual(cmd[cmd.index("-b:v") + 1], "4000000")
+        self.assertNotIn("-maxrate", cmd)
+
+    def test_abr_replaces_crf(self):
+        cmd = build_convert_command("ffmpeg", make_settings(output_codec="vp9", rate_control="abr", bitrate="800k")).build()
+        self.assertNotIn("-crf", cmd)
+        self.assertEqual(cmd.count("-b:v"), 1)
+        self.assertEqual(cmd[cmd.index("-b:v") + 1], "800000")
+
+    def test_two_pass_commands(self):
+        settings = make_settings(rate_control="two_pass")
+        first = build_convert_command("ffmpeg", settings, pass_number=1).build()
+        second = build_convert_command("ffmpeg", settings, pass_number=2).build()
+        self.assertEqual(first[first.index("-pass") + 1], "1")
+        self.assertEqual(first[-3:], ["-f", "null", "-"])
+        self.assertIn("-an", first)
+        self.assertEqual(second[second.index("-pass") + 1], "2")
+        self.assertEqual(second[-1], "in_out.mp4")
+
+        x265 = build_convert_command("ffmpeg", make_settings(output_codec="h265", rate_control="two_pass"), pass_number=1).build()
+        self.assertEqual(x265[x265.index("-x265-params") + 1], "pass=1:stats=passlog.log:slow-firstpass=0")
+
+    def test_lossless_codecs_ignore_rate_control(self):
+        cmd = build_convert_command("ffmpeg", make_settings(output_codec="ffv1", rate_control="abr")).build()
+        self.assertNotIn("-b:v", cmd)
+
+    def test_copy_command_trims_without_encoding(self):
+        cmd = build_copy_command("ffmpeg", make_settings(), start_time=4.0, stop_time="10").build()
+        self.assertLess(cmd.index("-ss"), cmd.index("-i"))
+        self.assertEqual(cmd[cmd.index("-c") + 1], "copy")
+        self.assertNotIn("-c:v", cmd)
+        self.assertNotIn("-to", build_copy_command("ffmpeg", make_settings(), stop_time="-1").build())
+
+    def test_side_outputs_share_one_decode(self):
+        settings = make_settings(output_codec="h265", scale_width=0.5, scale_height=0.5, expected_frames=1600)
+        cmd = build_convert_command("ffmpeg", settings, thumbnail_paths=thumbnail_paths).build()
+        self.assertEqual(cmd.count("-i"), 1)
+        self.assertNotIn("-vf", cmd)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        self.assertTrue(graph.startswith("[0:v]scale=iw*0.5:ih*0.5,split=4[main]"))
+        self.assertIn("select='eq(n,160)'", graph)
+        self.assertIn("select='not(mod(n,100))'", graph)
+        self.assertIn("tile=4x4", graph)
+        # The main output comes first, so its size and progress are what gets reported
+        self.assertLess(cmd.index("in_out.mp4"), cmd.index(thumbnail_paths["poster"]))
+        self.assertEqual(cmd[-1], thumbnail_paths["preview"])
+
+    def test_no_side_outputs_on_analysis_pass_or_trimmed_pipe(self):
+        first_pass = build_convert_command("ffmpeg", make_settings(rate_control="two_pass"), pass_number=1, thumbnail_paths=thumbnail_paths).build()
+        self.assertNotIn("-filter_complex", first_pass)
+        piped = build_convert_command("ffmpeg", make_settings(), use_start_stop=True, input_path="pipe:0", thumbnail_paths=thumbnail_paths).build()
+        self.assertNotIn("-filter_complex", piped)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import struct
+import threading
+import tempfile
+import unittest
+import subprocess
+from unittest import mock
+from modules.input_stage import input_stage
+from modules.input_stage.input_stage import ReadAhead, choose_input_mode, filesystem_type, is_streamable, stage_copy
+
+def write_atoms(path, *atoms):
+    with open(path, "wb") as video_file:
+        for atom in atoms:
+            video_file.write(struct.pack(">I4s", 16, atom) + b"\0" * 8)
+
+class TestInputStage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, "source.mkv")
+        with open(self.source, "wb") as source:
+            source.write(os.urandom(3 * 1024 * 1024 + 17))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_filesystem_type_uses_longest_mount(self):
+        mounts = os.path.join(self.temp_dir.name, "mounts")
+        with open(mounts, "w") as mounts_file:
+            mounts_file.write("/dev/sda1 / ext4 rw 0 0\n")
+            mounts_file.write("//nas/archive /mnt/archive\\040share cifs rw 0 0\n")
+        with mock.patch.object(input_stage, "mounts_path", mounts), mock.patch("sys.platform", "linux"):
+            self.assertEqual(filesystem_type("/mnt/archive share/clip.mov"), "cifs")
+            self.assertEqual(filesystem_type("/mnt/archive2/clip.mov"), "ext4")
+            self.assertEqual(choose_input_mode("/mnt/archive share/clip.mkv"), "pipe")
+            self.assertEqual(choose_input_mode("/mnt/archive share/clip.mkv", two_pass=True), "stage")
+            self.assertEqual(choose_input_mode("/mnt/archive2/clip.mkv"), "direct")
+
+    def test_mp4_is_streamable_only_with_fast_start(self):
+        fast_start = os.path.join(self.temp_dir.name, "fast.mp4")
+        write_atoms(fast_start, b"ftyp", b"moov", b"mdat")
+        moov_at_end = os.path.join(self.temp_dir.name, "slow.mp4")
+        write_atoms(moov_at_end, b"ftyp", b"mdat", b"moov")
+        self.assertTrue(is_streamable(fast_start))
+        self.assertFalse(is_streamable(moov_at_end))
+        self.assertEqual(choose_input_mode(moov_at_end, "pipe"), "stage")
+        self.assertTrue(is_streamable(self.source))
+
+    def test_stage_copy(self):
+        staged = stage_copy(self.source, os.path.join(self.temp_dir.name, "staging"), chunk_size=1024 * 1024)
+        self.assertTrue(staged.endswith(".mkv"))
+        with open(self.source, "rb") as source, open(staged, "rb") as copy:
+            self.assertEqual(source.read(), copy.read())
+
+    def test_read_ahead_feeds_pipe(self):
+        read_ahead = ReadAhead(self.source, chunk_size=256 * 1024, max_chunks=2)
+        stdin = read_ahead.start()
+        consumer = subprocess.Popen([sys.executable, "-c", "import sys; sys.stdout.buffer.write(sys.stdin.buffer.read())"],
+                                    stdin=stdin, stdout=subprocess.PIPE)
+        os.close(stdin)
+        output, _ = consumer.communicate()
+        stats = read_ahead.join()
+        with open(self.source, "rb") as source:
+            self.assertEqual(output, source.read())
+        self.assertEqual(stats["bytes_read"], len(output))
+
+    def test_read_ahead_stops_when_reader_exits_early(self):
+        read_ahead = ReadAhead(self.source, chunk_size=64 * 1024, max_chunks=2)
+        stdin = read_ahead.start()
+        consumer = subprocess.Popen([sys.executable, "-c", "import sys; sys.stdin.buffer.read(10)"], stdin=stdin)
+        os.close(stdin)
+        consumer.wait()
+        stats = read_ahead.join()  # Must not hang on the full buffer
+        self.assertLess(stats["bytes_read"], os.path.getsize(self.source))
+
+    def test_read_ahead_stops_when_consumer_finishes_before_reader(self):
+        class SlowReadAhead(ReadAhead):
+            def _read(self):
+                time.sleep(0.3)  # A slow network read that is still running when ffmpeg exits
+                super()._read()
+
+        read_ahead = SlowReadAhead(self.source, chunk_size=64 * 1024, max_chunks=2)
+        stdin = read_ahead.start()
+        consumer = subprocess.Popen([sys.executable, "-c", "pass"], stdin=stdin)
+        os.close(stdin)
+        consumer.wait()
+        read_ahead.stop()
+        joined = threading.Thread(target=read_ahead.join, daemon=True)
+        joined.start()
+        joined.join(5)
+        self.assertFalse(joined.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
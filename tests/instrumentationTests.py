@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+from modules.instrumentation.instrumentation import Instrumentation, wait_for_process
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.instrumentation = Instrumentation(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stage_records_child_usage(self):
+        with self.instrumentation.stage("encode", file="clip.mov") as record:
+            process = subprocess.Popen([sys.executable, "-c", "sum(range(2000000))"])
+            record.update(wait_for_process(process))
+            record["frames"] = 50
+        self.assertEqual(process.returncode, 0)
+        self.assertGreater(record["wall_seconds"], 0)
+        self.assertIn("fps", self.instrumentation.pending[0])
+        if hasattr(os, "wait4"):
+            self.assertGreater(record["child_cpu_seconds"], 0)
+            self.assertGreater(record["peak_rss_bytes"], 1024 * 1024)
+
+    @unittest.skipUnless(os.path.exists(f"/proc/{os.getpid()}/io"), "needs /proc/<pid>/io")
+    def test_child_bytes_read_are_measured(self):
+        source = os.path.join(self.temp_dir.name, "input.bin")
+        with open(source, "wb") as source_file:
+            source_file.write(os.urandom(3 * 1024 * 1024))
+        process = subprocess.Popen([sys.executable, "-c", f"open({source!r}, 'rb').read()"])
+        stats = wait_for_process(process)
+        self.assertGreaterEqual(stats["bytes_read"], 3 * 1024 * 1024)
+        self.assertIn("disk_bytes_read", stats)
+
+    def test_export_writes_jsonl_and_prometheus(self):
+        self.instrumentation.record("probe", wall_seconds=0.5)
+        self.instrumentation.record("probe", wall_seconds=0.25)
+        self.instrumentation.record("move", wall_seconds=1, bytes_written=100)
+        self.instrumentation.export()
+        self.instrumentation.export()
+
+        with open(os.path.join(self.temp_dir.name, "metrics.jsonl")) as jsonl_file:
+            records = [json.loads(line) for line in jsonl_file]
+        self.assertEqual([record["stage"] for record in records], ["probe", "probe", "move"])
+
+        with open(os.path.join(self.temp_dir.name, "metrics.prom")) as prometheus_file:
+            text = prometheus_file.read()
+        self.assertIn('videoconversion_stage_runs_total{stage="probe"} 2', text)
+        self.assertIn('videoconversion_stage_wall_seconds_total{stage="probe"} 0.75', text)
+        self.assertIn('videoconversion_stage_bytes_written_total{stage="move"} 100', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import json
+import tempfile
+import unittest
+from collections import OrderedDict
+from types import SimpleNamespace
+from modules.log_store.log_store import LogStore, entry_columns
+from modules.log_view.log_view import PagedLogView
+
+def make_entry(index, codec="h265", ratio=0.5, directory="/videos/a"):
+    return {"Directory": directory, "File Name": f"clip{index}.mp4", "Input Codec": "h264", "Output Codec": codec,
+            "Input Size": 1000, "Output Size": int(1000 * ratio), "Relative Size": ratio}
+
+class TestLogStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = LogStore(os.path.join(self.temp_dir.name, "logs", "conversion_log.db"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pages_newest_first(self):
+        for index in range(25):
+            self.store.append(make_entry(index))
+        self.assertEqual(self.store.count(), 25)
+        page = self.store.page(offset=10, limit=10)
+        self.assertEqual([entry["File Name"] for entry in page[:2]], ["clip14.mp4", "clip13.mp4"])
+        self.assertEqual(len(self.store.page(offset=20, limit=10)), 5)
+
+    def test_sort_and_filter(self):
+        self.store.append(make_entry(0, "h265", 0.4, "/videos/a"))
+        self.store.append(make_entry(1, "ffv1", 0.9, "/videos/b"))
+        self.store.append(make_entry(2, "h265", 0.2, "/videos/b/nested"))
+        self.store.append(make_entry(3, "h265", 0.7, "/other"))
+
+        ratios = [entry["Relative Size"] for entry in self.store.page(sort_key="Relative Size", descending=False)]
+        self.assertEqual(ratios, [0.2, 0.4, 0.7, 0.9])
+        self.assertEqual(self.store.count({"codec": "h265", "max_ratio": 0.5}), 2)
+        self.assertEqual([entry["File Name"] for entry in self.store.page(filters={"directory": "/videos/b"})],
+                         ["clip2.mp4", "clip1.mp4"])
+        self.assertEqual(self.store.distinct("Output Codec"), ["ffv1", "h265"])
+        with self.assertRaises(ValueError):
+            self.store.page(sort_key="created; DROP TABLE entries")
+
+    def test_keyset_pages_match_offset_pages(self):
+        for index in range(23):
+            entry = make_entry(index % 7, ["h265", "vp9"][index % 2], [0.3, 0.5][index % 2])
+            if index % 3 == 0:
+                entry["Relative Size"] = "Unknown"  # Stored as NULL
+            if index % 5 == 0:
+                entry["File Name"] = None
+            self.store.append(entry)
+        for sort_key in [None] + list(entry_columns):
+            for descending in (False, True):
+                expected = [entry["id"] for entry in self.store.page(0, 100, sort_key, descending)]
+                pages = [self.store.page(0, 4, sort_key, descending)]
+                while pages[-1]:
+                    pages.append(self.store.page(0, 4, sort_key, descending, after=pages[-1][-1]))
+                self.assertEqual([entry["id"] for page in pages for entry in page], expected, (sort_key, descending))
+                backwards = self.store.page(0, 4, sort_key, not descending, after=self.store.page(10, 1, sort_key, descending)[0])[::-1]
+                self.assertEqual([entry["id"] for entry in backwards], expected[6:10], (sort_key, descending))
+
+    def test_view_pages_from_either_end(self):
+        for index in range(25):
+            self.store.append(make_entry(index, ratio=index % 4 / 4))
+        expected = [entry["id"] for entry in self.store.page(0, 100, "Relative Size", True)]
+        view = SimpleNamespace(store=self.store, page_size=4, total=25, sort_key="Relative Size", descending=True,
+                               filters={}, pages=OrderedDict(), max_cached_pages=8)
+        for index in (6, 5, 0, 1, 3):  # The last page, the one before it, then the start
+            page = PagedLogView.page(view, index)
+            self.assertEqual([entry["id"] for entry in page], expected[index * 4:index * 4 + 4], index)
+
+    def test_legacy_import_runs_once(self):
+        legacy_path = os.path.join(self.temp_dir.name, "conversion_log.json")
+        entries = [make_entry(index) for index in range(3)] + [{"Directory": "/x", "Relative Size": "Unknown"}]
+        with open(legacy_path, "w") as legacy_file:
+            json.dump(entries, legacy_file)
+
+        self.assertEqual(self.store.import_legacy(legacy_path), 4)
+        self.assertEqual(self.store.import_legacy(legacy_path), 0)
+        self.assertEqual(self.store.count(), 4)
+        self.assertEqual(self.store.count({"min_ratio": 0}), 3)  # "Unknown" is stored as NULL
+
+        self.store.clear()
+        self.assertEqual(self.store.count(), 0)
+        self.assertEqual(self.store.import_legacy(legacy_path), 0)
+
+if __name__ == '__main__':
+    unittest.main()
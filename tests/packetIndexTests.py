@@ -0,0 +1,69 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from modules.packet_index.packet_index import PacketIndex, PacketIndexCache
+
+# Packets in decode order with B-frames: presentation times are out of order, and the stream
+# starts at 1.4 s as in many MPEG-TS files. Frame intervals vary as in phone footage.
+FAKE_FFPROBE = """#!/bin/sh
+echo call >> "$(dirname "$0")/calls.txt"
+printf '1.400000,1.300000,K__\\n1.500000,1.350000,___\\n1.450000,1.400000,___\\n1.600000,1.450000,___\\n1.700000,1.500000,K__\\n1.733000,1.600000,___\\nN/A,1.800000,___\\n'
+"""
+
+@unittest.skipIf(sys.platform == "win32", "uses a POSIX shell script in place of ffprobe")
+class TestPacketIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ffprobe_path = os.path.join(self.temp_dir.name, "ffprobe")
+        with open(self.ffprobe_path, "w") as fake:
+            fake.write(FAKE_FFPROBE)
+        os.chmod(self.ffprobe_path, os.stat(self.ffprobe_path).st_mode | stat.S_IEXEC)
+        self.video = os.path.join(self.temp_dir.name, "clip.ts")
+        with open(self.video, "wb") as video:
+            video.write(b"video")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_probe_sorts_and_rebases_timestamps(self):
+        index = PacketIndex.probe(self.ffprobe_path, self.video)
+        self.assertEqual(index.frame_count, 7)
+        self.assertAlmostEqual(index.start_time, 1.4)
+        self.assertEqual([round(time, 3) for time in index.timestamps], [0.0, 0.05, 0.1, 0.2, 0.3, 0.333, 0.4])
+        self.assertEqual([round(time, 3) for time in index.keyframe_times()], [0.0, 0.3])
+
+    def test_lookups(self):
+        index = PacketIndex.probe(self.ffprobe_path, self.video)
+        self.assertEqual(index.frame_at(0.12), 2)
+        self.assertEqual(index.frame_at(-1), 0)
+        self.assertEqual(index.frames_between(0.1, 0.3), 2)
+        self.assertEqual(index.frames_between(0.1, -1), 5)
+        self.assertAlmostEqual(index.keyframe_before(0.29), 0.0)
+        self.assertAlmostEqual(index.keyframe_before(0.35), 0.3)
+
+    def test_cache_is_reused_until_file_changes(self):
+        cache = PacketIndexCache(os.path.join(self.temp_dir.name, "cache"))
+        first = cache.get(self.ffprobe_path, self.video)
+        second = cache.get(self.ffprobe_path, self.video)
+        self.assertEqual(list(first.timestamps), list(second.timestamps))
+        self.assertEqual(list(first.keyframes), list(second.keyframes))
+        with open(self.video, "ab") as video:
+            video.write(b"more")
+        cache.get(self.ffprobe_path, self.video)
+        with open(os.path.join(self.temp_dir.name, "calls.txt")) as calls:
+            self.assertEqual(len(calls.readlines()), 2)
+
+    def test_expected_frames_for_trim(self):
+        from modules.processing.processing import VideoProcessor
+        processor = VideoProcessor(SimpleNamespace(cache_folder=os.path.join(self.temp_dir.name, "cache"), logs_folder=self.temp_dir.name,
+                                                   packet_index=True, ffprobe_path=self.ffprobe_path))
+        settings = SimpleNamespace(file_path=self.video, file_name="clip.ts", total_frames=3, input_frame_rate=30,
+                                   start_time="0.1", stop_time="0.3", output_frame_rate=30)
+        processor.count_expected_frames(settings, use_start_stop=True)
+        self.assertEqual((settings.total_frames, settings.expected_frames), (7, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from modules.command_builder.command_builder import FFmpegCommand
+from modules.passlog.passlog import PassLogStore
+
+class TestPassLogStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, "source.mov")
+        with open(self.source, "wb") as source:
+            source.write(b"video")
+        self.store = PassLogStore(os.path.join(self.temp_dir.name, "cache"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def command(self, bitrate, scale="iw:ih", preset="medium"):
+        command = FFmpegCommand("ffmpeg", self.source, "-").set_output("-c:v", "libx264").set_output("-preset", preset).set_output("-b:v", bitrate)
+        command.filters.add("scale", scale)
+        return command
+
+    def test_job_directories_are_unique(self):
+        first, second = self.store.create_job_directory(), self.store.create_job_directory()
+        self.assertNotEqual(first, second)
+        self.store.remove_job_directory(first)
+        self.store.remove_job_directory(second)
+        self.assertFalse(os.path.exists(first))
+
+    def test_key_ignores_bitrate_but_not_filters(self):
+        settings = SimpleNamespace(file_path=self.source)
+        key = self.store.cache_key(settings, self.command("1M"))
+        self.assertEqual(key, self.store.cache_key(settings, self.command("4M")))
+        self.assertNotEqual(key, self.store.cache_key(settings, self.command("1M", scale="iw/2:ih/2")))
+
+    def test_key_changes_with_encoder_options(self):
+        settings = SimpleNamespace(file_path=self.source)
+        key = self.store.cache_key(settings, self.command("1M"))
+        self.assertNotEqual(key, self.store.cache_key(settings, self.command("1M", preset="slow")))
+        tuned = self.command("1M").set_output("-g", 48)
+        self.assertNotEqual(key, self.store.cache_key(settings, tuned))
+
+    def test_store_and_restore(self):
+        key = self.store.cache_key(SimpleNamespace(file_path=self.source), self.command("1M"))
+        job_directory = self.store.create_job_directory()
+        with open(os.path.join(job_directory, "passlog-0.log"), "w") as stats:
+            stats.write("stats")
+        self.store.store(key, job_directory)
+        self.store.remove_job_directory(job_directory)
+
+        new_job_directory = self.store.create_job_directory()
+        self.assertTrue(self.store.restore(key, new_job_directory))
+        self.assertTrue(os.path.exists(os.path.join(new_job_directory, "passlog-0.log")))
+        self.assertFalse(self.store.restore("unknown", new_job_directory))
+        self.store.remove_job_directory(new_job_directory)
+
+if __name__ == '__main__':
+    unittest.main()
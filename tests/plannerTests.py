@@ -0,0 +1,95 @@
+import os
+import copy
+import json
+import tempfile
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+from modules.processing.processing import HeadlessApp, VideoProcessor
+from modules.video_settings.video_settings import VideoSettings
+from modules.planner.planner import ThroughputHistory, plan_batch, resolve_conflicts, summarise
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.processor = VideoProcessor(SimpleNamespace(cache_folder=os.path.join(self.temp_dir.name, "cache"), logs_folder=self.temp_dir.name,
+                                                        packet_index=False, ffprobe_path="ffprobe", debug=False))
+        self.video_settings = VideoSettings()
+        self.video_settings.output_codec = "h264"
+        with open(self.processor.instrumentation.jsonl_path, "w") as metrics:
+            for fps in (100, 200, 300):
+                metrics.write(json.dumps({"stage": "encode", "encoder": "libx264", "returncode": 0, "fps": fps}) + "\n")
+            metrics.write(json.dumps({"stage": "encode", "encoder": "libx264", "returncode": 1, "fps": 5}) + "\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def add_video(self, name, codec):
+        # Seeds the probe cache so no ffprobe is needed
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as video:
+            video.write(b"\0" * 1000)
+        stat = os.stat(path)
+        self.processor.probe_cache[(path, stat.st_size, stat.st_mtime)] = (codec, 1000, 600, 30.0, 640, 360)
+        return path
+
+    def test_actions(self):
+        hevc = self.add_video("a.mov", "hevc")
+        already = self.add_video("b.mp4", "h264")
+        existing = self.add_video("c.mov", "hevc")
+        open(os.path.join(self.temp_dir.name, "c_out.mp4"), "w").close()
+        plan = plan_batch(self.processor, [hevc, already, existing, hevc], self.video_settings)
+        self.assertEqual([item.action for item in plan], ["encode", "skip_same_codec", "conflict", "conflict"])
+        self.assertAlmostEqual(plan[0].estimated_seconds, 3.0)  # 600 frames at the median 200 fps
+        self.assertEqual(summarise(plan)["counts"]["conflict"], 2)
+
+        self.video_settings.start_time, self.video_settings.stop_time = "0", "10"
+        copy = plan_batch(self.processor, [already], self.video_settings, use_start_stop=True)[0]
+        self.assertEqual((copy.action, copy.expected_frames, copy.estimated_size), ("copy", 300, 500))
+
+    def test_unreadable_file_is_skipped(self):
+        broken = os.path.join(self.temp_dir.name, "broken.mov")
+        with mock.patch.object(self.processor, "get_video_info", return_value=None):
+            plan = plan_batch(self.processor, [broken], self.video_settings)
+        self.assertEqual((plan[0].action, plan[0].output_path), ("skip_unreadable", ""))
+        self.assertEqual(summarise(plan)["counts"]["skip_unreadable"], 1)
+
+    def test_conversion_uses_the_approved_plan(self):
+        hevc = self.add_video("a.mov", "hevc")
+        item = plan_batch(self.processor, [hevc], self.video_settings)[0]
+        item.estimated_size, item.output_path = 12345, os.path.join(self.temp_dir.name, "renamed.mp4")
+        job_settings = copy.copy(self.video_settings)
+        job_settings.file_path = hevc
+        with mock.patch("modules.processing.processing.plan_file", side_effect=AssertionError("planned again")), \
+             mock.patch.object(self.processor, "reserve_output", return_value=None) as reserve_output:
+            self.assertEqual(self.processor.convert_video(job_settings, HeadlessApp(), item), "SKIPPED")
+        self.assertEqual(reserve_output.call_args[0][3], 12345)
+        self.assertEqual((job_settings.output_path, job_settings.expected_frames), (item.output_path, 600))
+
+    def test_resolve_conflicts(self):
+        hevc = self.add_video("a.mov", "hevc")
+        existing = self.add_video("c.mov", "hevc")
+        open(os.path.join(self.temp_dir.name, "c_out.mp4"), "w").close()
+        files = [hevc, existing, hevc]
+
+        plan = plan_batch(self.processor, files, self.video_settings)
+        resolve_conflicts(plan, "rename")
+        self.assertEqual([os.path.basename(item.output_path) for item in plan], ["a_out.mp4", "c_out_1.mp4", "a_out_1.mp4"])
+        self.assertTrue(all(item.action == "encode" for item in plan))
+
+        plan = plan_batch(self.processor, files, self.video_settings)
+        resolve_conflicts(plan, "overwrite")
+        self.assertEqual([os.path.basename(item.output_path) for item in plan], ["a_out.mp4", "c_out.mp4", "a_out_1.mp4"])
+
+        plan = plan_batch(self.processor, files, self.video_settings)
+        resolve_conflicts(plan, "skip")
+        self.assertEqual([item.action for item in plan], ["encode", "skip_existing", "skip_existing"])
+        self.assertRaises(ValueError, resolve_conflicts, plan, "ask")
+
+    def test_history_reads_only_the_end_of_the_file(self):
+        history = ThroughputHistory(self.processor.instrumentation.jsonl_path, max_bytes=150)
+        self.assertLess(len(history.samples["libx264"]), 3)
+        self.assertIsNone(ThroughputHistory(os.path.join(self.temp_dir.name, "missing.jsonl")).fps("libx264"))
+
+if __name__ == '__main__':
+    unittest.main()
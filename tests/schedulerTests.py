@@ -0,0 +1,66 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from modules.scheduler import scheduler
+from modules.scheduler.scheduler import AdaptiveBatchRunner, ConcurrencyController, LoadSampler
+
+IDLE = {"cpu": 0.3, "iowait": 0.01, "load": 0.3}
+BUSY = {"cpu": 0.98, "iowait": 0.01, "load": 1.0}
+DISK_BOUND = {"cpu": 0.4, "iowait": 0.5, "load": 0.9}
+
+def feed(controller, load, fps, samples):
+    for _ in range(samples):
+        slots = controller.update(load, fps)
+    return slots
+
+class TestScheduler(unittest.TestCase):
+    def test_sampler_reads_proc_stat(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stat = os.path.join(temp_dir, "stat")
+            with mock.patch.object(scheduler, "stat_path", stat):
+                with open(stat, "w") as stat_file:
+                    stat_file.write("cpu  100 0 100 700 100 0 0 0 0 0\ncpu0 1 2 3\n")
+                sampler = LoadSampler()
+                with open(stat, "w") as stat_file:
+                    stat_file.write("cpu  400 0 200 800 200 0 0 0 0 0\n")
+                sample = sampler.sample()
+        self.assertAlmostEqual(sample["cpu"], 400 / 600)
+        self.assertAlmostEqual(sample["iowait"], 100 / 600)
+
+    def test_climbs_while_throughput_grows(self):
+        controller = ConcurrencyController(max_slots=4, settle_samples=2, cooldown_samples=4)
+        self.assertEqual(feed(controller, IDLE, 100, 2), 2)
+        self.assertEqual(feed(controller, IDLE, 180, 2), 3)
+        # The third slot brings nothing, so it is given back and the count holds
+        self.assertEqual(feed(controller, IDLE, 182, 2), 2)
+        self.assertEqual(feed(controller, IDLE, 180, 2), 2)
+
+    def test_backs_off_when_saturated(self):
+        controller = ConcurrencyController(max_slots=4, settle_samples=2)
+        controller.slots = 3
+        self.assertEqual(feed(controller, BUSY, 100, 2), 3)
+        self.assertEqual(feed(controller, DISK_BOUND, 100, 2), 2)
+        self.assertEqual(feed(controller, DISK_BOUND, 100, 20), 1)
+
+    def test_runner_respects_slots(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def run_job(job):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+        controller = ConcurrencyController(min_slots=2, max_slots=2)
+        runner = AdaptiveBatchRunner(run_job, lambda job: 10, controller, LoadSampler(), interval=0.01)
+        self.assertEqual(runner.run(range(7)), 2)
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(active[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+# settings_fixtures.py
+from types import SimpleNamespace
+
+
+def make_settings(**overrides):
+    """
+    Returns a stand-in for VideoSettings with the probed input and job settings the command builder
+    and the size estimate read: a 10 second 1920x1080 input at 25 fps, converted to h264 at CRF 28.
+    """
+    settings = SimpleNamespace(
+        file_path="in.mov", output_path="in_out.mp4", output_codec="h264", crf=28,
+        scale_width=1, scale_height=1, start_time="0", stop_time="-1", output_frame_rate=30,
+        pixel_format="", crop="", deinterlace=False, input_width=1920, input_height=1080, threads=0,
+        rate_control="crf", bitrate="5M", max_bitrate="", buffer_size="",
+        input_frame_rate=25, frame_rate=30, total_frames=250, expected_frames=250, input_size=1000,
+    )
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    return settings
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from modules.storage.storage import OutputMover, SpaceReservations, estimate_output_size, free_space, has_free_space, scratch_output_path
+from tests.settings_fixtures import make_settings
+
+class TestStorage(unittest.TestCase):
+    def test_rawvideo_estimate_is_exact(self):
+        self.assertEqual(estimate_output_size(make_settings(output_codec="rawvideo")), 1920 * 1080 * 3 // 2 * 250)
+
+    def test_estimate_respects_trim_and_bitrate(self):
+        settings = make_settings(output_codec="h264", rate_control="abr", bitrate="8M", start_time="2", stop_time="6")
+        self.assertEqual(estimate_output_size(settings, use_start_stop=True), 4 * (1000000 + 24000))
+
+    def test_estimate_without_dimensions_uses_input_size(self):
+        self.assertEqual(estimate_output_size(make_settings(output_codec="h265", input_width=0)), 1000)
+
+    def test_free_space(self):
+        self.assertTrue(has_free_space(tempfile.gettempdir(), 0))
+        self.assertFalse(has_free_space(tempfile.gettempdir(), 2 ** 62))
+
+    def test_scratch_output_is_moved(self):
+        with tempfile.TemporaryDirectory() as scratch, tempfile.TemporaryDirectory() as final:
+            destination = os.path.join(final, "clip_out.mkv")
+            encode_path = scratch_output_path(scratch, destination)
+            self.assertTrue(encode_path.endswith(".mkv"))
+            mover = OutputMover()
+            mover.submit(encode_path, destination, 10)
+            self.assertEqual(mover.wait(), [])
+            self.assertTrue(os.path.exists(destination))
+            self.assertFalse(os.path.exists(encode_path))
+            self.assertEqual(mover.pending_bytes(final), 0)
+
+    def test_reservations_count_other_jobs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            reservations = SpaceReservations()
+            half = free_space(directory) // 2
+            first, second = os.path.join(directory, "a_out.mkv"), os.path.join(directory, "b_out.mkv")
+            margin = 64 * 1024 * 1024
+            self.assertTrue(reservations.reserve(first, half))
+            self.assertFalse(reservations.reserve(second, half + margin))  # Fits alone, not next to the first
+            with open(first, "wb") as output:
+                output.write(b"\0" * 1000)
+            self.assertEqual(reservations.outstanding_bytes(directory), half - 1000)
+            reservations.release(first)
+            self.assertTrue(reservations.reserve(second, half + margin))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# synthetic_media.py
+import os
+import subprocess
+
+# lavfi sources for synthetic test media. testsrc2 is easy to compress, mandelbrot has fine detail
+# that changes every frame, and noise is close to the worst case for any encoder.
+sources = {
+    "testsrc2": "testsrc2=size={width}x{height}:rate={rate}",
+    "mandelbrot": "mandelbrot=size={width}x{height}:rate={rate}",
+    "noise": "color=c=gray:size={width}x{height}:rate={rate},noise=alls=60:allf=t+u",
+}
+
+
+def pick_encoder(capabilities):
+    """
+    Picks the encoder used to write the synthetic inputs: libx264 if available, otherwise mpeg4,
+    which every ffmpeg build has.
+    """
+    if capabilities is None or not capabilities.available or capabilities.has_encoder("libx264"):
+        return ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "18", "-pix_fmt", "yuv420p"]
+    return ["-c:v", "mpeg4", "-q:v", "3"]
+
+
+def generate_video(ffmpeg_path, output_path, source="testsrc2", width=640, height=360, seconds=2, rate=30, capabilities=None):
+    """
+    Writes a synthetic video with a lavfi source, unless it already exists.
+
+    Parameters:
+    - ffmpeg_path: Path to the ffmpeg executable
+    - output_path: Where to write the video
+    - source: One of the names in `sources`
+    - width, height: Frame size in pixels
+    - seconds: Length of the video
+    - rate: Frame rate
+    - capabilities: Optional FFmpegCapabilities used to pick the encoder
+
+    Returns:
+    The output path.
+
+    Raises:
+    - subprocess.CalledProcessError: If ffmpeg fails
+    """
+    if not os.path.exists(output_path):
+        graph = sources[source].format(width=width, height=height, rate=rate)
+        cmd = [str(ffmpeg_path), "-y", "-loglevel", "error", "-f", "lavfi", "-i", graph, "-t", str(seconds)]
+        cmd.extend(pick_encoder(capabilities))
+        cmd.append(output_path)
+        subprocess.run(cmd, check=True)
+    return output_path
+
+
+def generate_tiff_sequence(ffmpeg_path, output_directory, frames=60, width=640, height=360):
+    """
+    Writes a numbered TIFF sequence (frame_0001.tif, ...) with the testsrc2 source, unless it exists.
+
+    Returns:
+    The sorted list of TIFF paths.
+
+    Raises:
+    - subprocess.CalledProcessError: If ffmpeg fails
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    pattern = os.path.join(output_directory, "frame_%04d.tif")
+    if not os.path.exists(pattern % frames):
+        graph = sources["testsrc2"].format(width=width, height=height, rate=30)
+        subprocess.run([str(ffmpeg_path), "-y", "-loglevel", "error", "-f", "lavfi", "-i", graph,
+                        "-frames:v", str(frames), pattern], check=True)
+    return sorted(os.path.join(output_directory, name) for name in os.listdir(output_directory)
+                  if name.startswith("frame_") and name.endswith(".tif"))
+
+
+def ffmpeg_available(ffmpeg_path, ffprobe_path):
+    """
+    Returns whether both ffmpeg and ffprobe can be run.
+    """
+    for path in (ffmpeg_path, ffprobe_path):
+        try:
+            subprocess.run([str(path), "-version"], capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return False
+    return True
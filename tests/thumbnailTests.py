@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+from modules.processing.processing import VideoProcessor
+from modules.thumbnails.thumbnails import ThumbnailCache
+
+class TestThumbnails(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ThumbnailCache(self.temp_dir.name, max_entries=2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_prune_keeps_the_newest_entry_when_times_tie(self):
+        make_directories = os.makedirs
+        def coarse_makedirs(path, *args, **kwargs):
+            # A filesystem with coarse modification times, where every entry is created in the same tick
+            make_directories(path, *args, **kwargs)
+            os.utime(path, (1000, 1000))
+
+        names = ["a.mov", "b.mov", "c.mov", "d.mov"]
+        for rotation in range(len(names)):
+            cache = ThumbnailCache(os.path.join(self.temp_dir.name, str(rotation)), max_entries=2)
+            with mock.patch("os.makedirs", coarse_makedirs):
+                for name in names[rotation:] + names[:rotation]:
+                    newest = cache.directory(os.path.join(self.temp_dir.name, name))
+                    cache.reserve(os.path.join(self.temp_dir.name, name))
+                    self.assertTrue(os.path.isdir(newest))
+            self.assertEqual(len(os.listdir(cache.cache_folder)), 2)
+
+    def test_cache(self):
+        for name in ("a.mov", "b.mov", "c.mov"):
+            paths = self.cache.reserve(os.path.join(self.temp_dir.name, name))
+            open(paths["poster"], "w").close()
+        self.assertIsNotNone(self.cache.get(os.path.join(self.temp_dir.name, "c.mov")))
+        self.assertIsNone(self.cache.get(os.path.join(self.temp_dir.name, "c.mov"), "preview"))
+        self.assertEqual(len(os.listdir(self.cache.cache_folder)), 2)
+        self.cache.discard(os.path.join(self.temp_dir.name, "c.mov"))
+        self.assertIsNone(self.cache.get(os.path.join(self.temp_dir.name, "c.mov")))
+
+    def test_failed_job_only_discards_its_own_thumbnails(self):
+        processor = VideoProcessor(SimpleNamespace(cache_folder=self.temp_dir.name, logs_folder=self.temp_dir.name))
+        source = os.path.join(self.temp_dir.name, "a.mov")
+        poster = processor.thumbnails.reserve(source)["poster"]
+        open(poster, "w").close()
+        settings = SimpleNamespace(output_path=os.path.join(self.temp_dir.name, "a_out.mp4"))
+        processor.discard_output(settings.output_path, settings)  # A later run without thumbnails fails
+        self.assertEqual(processor.thumbnails.get(source), poster)
+        processor.discard_output(settings.output_path, settings, source)
+        self.assertIsNone(processor.thumbnails.get(source))
+
+if __name__ == '__main__':
+    unittest.main()
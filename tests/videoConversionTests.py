@@ -1,23 +1,50 @@
 import unittest
-from gui import get_video_info, convert_to_h265
 import os
+import shutil
+import tempfile
+from modules.processing.processing import VideoProcessor, HeadlessApp
+from modules.video_settings.video_settings import VideoSettings
+from modules.capabilities.capabilities import FFmpegCapabilities
+from tests.synthetic_media import generate_video, ffmpeg_available
 
 class Testgui(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.processor = VideoProcessor()
+        settings = cls.processor.settings
+        if not ffmpeg_available(settings.ffmpeg_path, settings.ffprobe_path):
+            raise unittest.SkipTest(f"ffmpeg not found at {settings.ffmpeg_path}")
+        cls.capabilities = FFmpegCapabilities(settings.ffmpeg_path, settings.cache_folder).load()
+        cls.processor.capabilities = cls.capabilities
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.test_video = generate_video(settings.ffmpeg_path, os.path.join(cls.temp_dir, "test_video.mp4"), seconds=2, rate=30, capabilities=cls.capabilities)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
     def test_get_video_info(self):
-        input_codec, input_size, total_frames = get_video_info("test_video.mp4")
-        self.assertEqual(input_codec, "h264")
+        input_codec, input_size, total_frames, frame_rate, width, height = self.processor.get_video_info(self.test_video)
+        self.assertIn(input_codec, ("h264", "mpeg4"))
         self.assertGreater(input_size, 0)
-        self.assertGreater(total_frames, 0)
+        self.assertEqual(total_frames, 60)
+        self.assertEqual((width, height), (640, 360))
 
     def test_convert_to_h265(self):
-        # Prepare a test video file
-        test_input_file = "test_input.mp4"
+        if not self.capabilities.has_encoder("libx265"):
+            self.skipTest("ffmpeg was built without libx265")
+        video_settings = VideoSettings()
+        video_settings.file_path = self.test_video
+        video_settings.output_codec = "h265"
+        video_settings.error = None
 
         # Perform the conversion
-        convert_to_h265(test_input_file, remove_input=False)
+        self.processor.convert_video(video_settings, HeadlessApp(overwrite_file=True))
+        self.processor.output_mover.wait()
 
         # Check if the output file was created
-        self.assertTrue(os.path.exists("test_input_h265.mp4"))
+        self.assertIsNone(video_settings.error)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "test_video_out.mp4")))
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()